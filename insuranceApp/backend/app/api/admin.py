@@ -1,13 +1,26 @@
+from pathlib import Path
 from typing import Any, List
+import shutil
+import tempfile
 import traceback
 
-from fastapi import APIRouter, Depends, HTTPException, status
+from fastapi import APIRouter, Depends, File, Form, HTTPException, UploadFile, status
 from sqlalchemy.orm import Session
 
+from app.api.deps import get_current_admin_user
 from app.core.logging_config import log_error
 from app.db.base import get_db
+from app.db.catalog_generations import CatalogGenerationError, get_generation_status, rollback_generation
+from app.db.catalog_reload import CatalogReloadBusyError, catalog_reload_manager
+from app.db.crud.insurance_product import InsuranceProductCRUD
+from app.db.init_db import data_file_names
+from app.db.product_indexes import get_index_usage_report
 from app.models.user import User
-from app.schemas.admin import UserListResponse, UserInfo
+from app.schemas.admin import (
+    UserListResponse, UserInfo, ProductTableIndexReport, ProductIndexReportResponse,
+    ProductCatalogGeneration, ProductCatalogGenerationResponse,
+    CatalogReloadJobInfo, CatalogReloadRequest, CatalogReloadResponse, CatalogReloadListResponse
+)
 
 router = APIRouter()
 
@@ -47,3 +60,217 @@ def get_all_users(
             status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
             detail="获取用户列表失败"
         )
+
+
+@router.get("/product_indexes", response_model=ProductIndexReportResponse)
+def get_product_index_report(current_user: User = Depends(get_current_admin_user)) -> Any:
+    """
+    获取保险产品表索引使用报告（仅限管理员）
+    
+    indexes为导入时创建的索引及其累计扫描次数；filters为本进程收到的搜索过滤条件。
+    candidate_index是按谓词种类与索引方法匹配推断的候选索引，不代表查询计划实际使用，
+    candidate_index_scans为该索引的累计扫描次数，持续为0说明计划器没有选用它
+    """
+    try:
+        tables = get_index_usage_report(InsuranceProductCRUD.get_product_types())
+        
+        return ProductIndexReportResponse(
+            code=200,
+            message="获取索引使用报告成功",
+            tables=[ProductTableIndexReport(**table) for table in tables]
+        )
+        
+    except Exception as e:
+        log_error(
+            message=f"获取索引使用报告失败: {str(e)}",
+            error_type="ADMIN_ERROR",
+            api_endpoint="/api/v1/admin/product_indexes",
+            stack_trace=traceback.format_exc()
+        )
+        raise HTTPException(
+            status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
+            detail="获取索引使用报告失败"
+        )
+
+
+@router.get("/product_catalogs", response_model=ProductCatalogGenerationResponse)
+def get_product_catalogs(current_user: User = Depends(get_current_admin_user)) -> Any:
+    """
+    获取产品目录版本状态（仅限管理员）
+    
+    重新导入时新数据先写入影子表（__next），切换后原表保留为上一代（__prev）；
+    prev_records不为空时可以回滚
+    """
+    try:
+        catalogs = get_generation_status(InsuranceProductCRUD.get_product_types())
+        
+        return ProductCatalogGenerationResponse(
+            code=200,
+            message="获取产品目录状态成功",
+            catalogs=[ProductCatalogGeneration(**catalog) for catalog in catalogs]
+        )
+        
+    except Exception as e:
+        log_error(
+            message=f"获取产品目录状态失败: {str(e)}",
+            error_type="ADMIN_ERROR",
+            api_endpoint="/api/v1/admin/product_catalogs",
+            stack_trace=traceback.format_exc()
+        )
+        raise HTTPException(
+            status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
+            detail="获取产品目录状态失败"
+        )
+
+
+@router.post("/product_catalogs/{product_type}/rollback", response_model=ProductCatalogGenerationResponse)
+def rollback_product_catalog(
+    product_type: str,
+    current_user: User = Depends(get_current_admin_user)
+) -> Any:
+    """
+    回滚产品目录到上一代数据（仅限管理员）
+    
+    交换当前表和上一代表，只需一次改名事务；再次调用即恢复到回滚前的数据。
+    后台导入任务运行时返回409（导入切换时会删除上一代表）
+    """
+    if product_type not in InsuranceProductCRUD.get_product_types():
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail=f"无效的产品类型: {product_type}")
+    
+    try:
+        with catalog_reload_manager.exclusive():
+            rollback_generation(product_type)
+    except (CatalogGenerationError, CatalogReloadBusyError) as e:
+        raise HTTPException(status_code=status.HTTP_409_CONFLICT, detail=str(e))
+    except Exception as e:
+        log_error(
+            message=f"回滚产品目录失败: {str(e)}",
+            error_type="ADMIN_ERROR",
+            api_endpoint=f"/api/v1/admin/product_catalogs/{product_type}/rollback",
+            stack_trace=traceback.format_exc()
+        )
+        raise HTTPException(
+            status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
+            detail="回滚产品目录失败"
+        )
+    
+    return ProductCatalogGenerationResponse(
+        code=200,
+        message="回滚产品目录成功",
+        catalogs=[ProductCatalogGeneration(**catalog) for catalog in get_generation_status([product_type])]
+    )
+
+
+def _validate_reload_files(file_names: List[str]) -> None:
+    """检查文件名是否为可导入的数据文件"""
+    allowed = data_file_names()
+    invalid = [name for name in file_names if name not in allowed]
+    if invalid:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail=f"无效的数据文件: {', '.join(invalid)}，可导入的文件: {', '.join(allowed)}"
+        )
+    if len(set(file_names)) != len(file_names):
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail="数据文件重复")
+
+
+def _start_reload(api_endpoint: str, **kwargs: Any) -> CatalogReloadResponse:
+    """创建后台导入任务，已有任务运行时返回409"""
+    try:
+        job = catalog_reload_manager.start(**kwargs)
+    except CatalogReloadBusyError as e:
+        raise HTTPException(status_code=status.HTTP_409_CONFLICT, detail=str(e))
+    except Exception as e:
+        log_error(
+            message=f"创建导入任务失败: {str(e)}",
+            error_type="ADMIN_ERROR",
+            api_endpoint=api_endpoint,
+            stack_trace=traceback.format_exc()
+        )
+        raise HTTPException(
+            status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
+            detail="创建导入任务失败"
+        )
+    
+    return CatalogReloadResponse(
+        code=202,
+        message="导入任务已创建",
+        job=CatalogReloadJobInfo(**job.to_dict())
+    )
+
+
+@router.post("/catalog_reloads", response_model=CatalogReloadResponse, status_code=status.HTTP_202_ACCEPTED)
+def reload_catalogs(
+    request: CatalogReloadRequest,
+    current_user: User = Depends(get_current_admin_user)
+) -> Any:
+    """
+    从数据目录重新导入数据（仅限管理员）
+    
+    导入在后台执行，接口立即返回任务ID，通过 GET /catalog_reloads/{job_id} 查询进度；
+    files为空时导入全部数据文件，默认跳过源文件未变化的表，force为true时全部重新导入
+    """
+    if request.files is not None:
+        _validate_reload_files(request.files)
+    
+    return _start_reload(
+        "/api/v1/admin/catalog_reloads", file_names=request.files, force=request.force
+    )
+
+
+@router.post("/catalog_reloads/upload", response_model=CatalogReloadResponse, status_code=status.HTTP_202_ACCEPTED)
+def upload_and_reload_catalogs(
+    files: List[UploadFile] = File(...),
+    force: bool = Form(False),
+    current_user: User = Depends(get_current_admin_user)
+) -> Any:
+    """
+    上传数据文件并在后台导入（仅限管理员）
+    
+    文件名必须与数据目录中的数据文件一致（如 定期寿险.xlsx）；
+    导入成功后替换数据目录中的同名文件，导入失败时当前数据和源文件保持不变
+    """
+    file_names = [Path(upload.filename or "").name for upload in files]
+    _validate_reload_files(file_names)
+    
+    upload_dir = Path(tempfile.mkdtemp(prefix="catalog_reload_"))
+    try:
+        for upload, file_name in zip(files, file_names):
+            with open(upload_dir / file_name, "wb") as f:
+                shutil.copyfileobj(upload.file, f)
+        return _start_reload(
+            "/api/v1/admin/catalog_reloads/upload", file_names=file_names, force=force, upload_dir=upload_dir
+        )
+    except Exception:
+        # 任务未创建时删除上传文件（创建后由导入任务删除）
+        shutil.rmtree(upload_dir, ignore_errors=True)
+        raise
+
+
+@router.get("/catalog_reloads", response_model=CatalogReloadListResponse)
+def get_catalog_reloads(current_user: User = Depends(get_current_admin_user)) -> Any:
+    """获取最近的后台导入任务（仅限管理员）"""
+    return CatalogReloadListResponse(
+        code=200,
+        message="获取导入任务成功",
+        jobs=[CatalogReloadJobInfo(**job.to_dict()) for job in catalog_reload_manager.recent()]
+    )
+
+
+@router.get("/catalog_reloads/{job_id}", response_model=CatalogReloadResponse)
+def get_catalog_reload(job_id: str, current_user: User = Depends(get_current_admin_user)) -> Any:
+    """
+    查询后台导入任务进度（仅限管理员）
+    
+    phase为当前阶段（collecting、parsing、loading、refreshing、finished），
+    rows_loaded为已写入的记录数，errors为失败文件及原因
+    """
+    job = catalog_reload_manager.get(job_id)
+    if job is None:
+        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail=f"导入任务不存在: {job_id}")
+    
+    return CatalogReloadResponse(
+        code=200,
+        message="获取导入任务成功",
+        job=CatalogReloadJobInfo(**job.to_dict())
+    )
@@ -4,10 +4,10 @@
 import logging
 from typing import Optional, Dict, Any, List
 from fastapi import APIRouter, Depends, HTTPException, Query
-from sqlalchemy.orm import Session
+from sqlalchemy.ext.asyncio import AsyncSession
 
-from app.db.base import get_db
-from app.db.crud.basic_medical_insurance import get_basic_medical_insurance_crud
+from app.db.async_base import get_async_db
+from app.db.crud.basic_medical_insurance import get_async_basic_medical_insurance_crud
 from app.schemas.basic_medical_insurance import (
     BasicMedicalInsuranceQuery,
     BasicMedicalInsuranceResponse
@@ -23,7 +23,7 @@ async def query_basic_medical_insurance(
     city: str = Query(..., description="城市名称"),
     category: str = Query(..., description="种类：城镇职工/城乡居民"),
     employment_status: Optional[str] = Query(None, description="在职/退休（仅在种类为城镇职工时有效）"),
-    db: Session = Depends(get_db)
+    db: AsyncSession = Depends(get_async_db)
 ):
     """
     查询基本医保信息
@@ -32,7 +32,7 @@ async def query_basic_medical_insurance(
         city: 城市名称
         category: 种类（城镇职工/城乡居民）
         employment_status: 在职/退休状态（仅在种类为城镇职工时有效）
-        db: 数据库会话
+        db: 异步数据库会话
         
     Returns:
         BasicMedicalInsuranceResponse: 基本医保信息响应
@@ -52,8 +52,8 @@ async def query_basic_medical_insurance(
             )
         
         # 查询数据
-        crud = get_basic_medical_insurance_crud(db)
-        filtered_data = crud.get_filtered_data(city, category, employment_status)
+        crud = get_async_basic_medical_insurance_crud(db)
+        filtered_data = await crud.get_filtered_data(city, category, employment_status)
         
         if not filtered_data:
             raise HTTPException(
@@ -78,19 +78,19 @@ async def query_basic_medical_insurance(
 
 
 @router.get("/cities", response_model=Dict[str, Any])
-async def get_cities(db: Session = Depends(get_db)):
+async def get_cities(db: AsyncSession = Depends(get_async_db)):
     """
     获取所有可查询的城市列表
     
     Args:
-        db: 数据库会话
+        db: 异步数据库会话
         
     Returns:
         Dict: 城市列表响应
     """
     try:
-        crud = get_basic_medical_insurance_crud(db)
-        cities = crud.get_all_cities()
+        crud = get_async_basic_medical_insurance_crud(db)
+        cities = await crud.get_all_cities()
         
         return {
             "code": 200,
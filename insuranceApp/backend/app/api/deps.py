@@ -32,4 +32,14 @@ def get_current_user(
     user = db.query(User).filter(User.account == token_data.sub).first()
     if not user:
         raise HTTPException(status_code=404, detail="用户不存在")
-    return user 
\ No newline at end of file
+    return user
+
+
+def get_current_admin_user(current_user: User = Depends(get_current_user)) -> User:
+    """获取当前用户并检查是否为管理员（账号在 ADMIN_ACCOUNTS 中）"""
+    if current_user.account not in settings.ADMIN_ACCOUNTS:
+        raise HTTPException(
+            status_code=status.HTTP_403_FORBIDDEN,
+            detail="需要管理员权限",
+        )
+    return current_user
@@ -1,16 +1,33 @@
-from typing import Any, Dict, List, Optional
+import uuid
+from typing import Any, Dict, List, Optional, Set
 from fastapi import APIRouter, Depends, HTTPException, Query, Request
 from sqlalchemy.orm import Session
 from fastapi.openapi.utils import get_openapi
 from fastapi.openapi.docs import get_swagger_ui_html
+from fastapi.responses import StreamingResponse
+from starlette.concurrency import run_in_threadpool
 
 from app.api.deps import get_current_user, get_db
-from app.db.crud.insurance_product import InsuranceProductCRUD
+from app.db.crud.insurance_product import InsuranceProductCRUD, ProductSearchError
+from app.db.product_compare import MAX_COMPARE_PRODUCTS, MIN_COMPARE_PRODUCTS, dedupe_product_ids
+from app.db.product_export import (
+    ALL_PRODUCT_TYPES, EXPORT_FORMATS, MEDIA_TYPES, prepare_export, stream_export
+)
+from app.db.product_facets import DEFAULT_BUCKETS, MAX_BUCKETS, get_product_facets
+from app.db.product_recommendation import DEFAULT_TOP_K, MAX_TOP_K, product_recommender
+from app.db.product_serializer import PreEncodedJSONResponse, encode_envelope, get_row_serializer
 from app.models.user import User
+from app.models.user_info import UserInfo
 from app.schemas.insurance_product import (
     ProductTypesResponse,
     ProductFieldsResponse,
     ProductSearchResponse,
+    ProductFacetsResponse,
+    ProductCompareResponse,
+    ProductRecommendationResponse,
+    UnifiedSearchResponse,
+    BatchProductInfoRequest,
+    BatchProductInfoResponse,
 )
 
 router = APIRouter()
@@ -60,6 +77,11 @@ async def search_products(
     limit: int = Query(10, ge=1, le=100, description="每页条数"),
     sort_by: Optional[str] = Query(None, description="排序字段，为空则按默认顺序"),
     sort_order: str = Query("desc", description="排序方向 (asc/desc)"),
+    cursor: Optional[str] = Query(None, description="游标分页：上一页返回的next_cursor"),
+    with_total: Optional[bool] = Query(None, description="是否计算总页数，默认页码分页计算、游标分页不计算"),
+    q: Optional[str] = Query(None, max_length=200, description="全文检索词，检索全部文本字段，空格分隔多个关键词"),
+    fields: Optional[str] = Query(None, description="逗号分隔的返回字段，默认返回列表卡片字段"),
+    count_mode: Optional[str] = Query(None, description="总数计算方式：exact/estimated/none，默认由with_total决定"),
     db: Session = Depends(get_db),
 ) -> Any:
     """
@@ -72,6 +94,31 @@ async def search_products(
     - sort_by: 排序字段，默认为空（按数据库默认顺序）
     - sort_order: 排序方向，asc为升序，desc为降序，默认为desc
     
+    ## 游标分页
+    - 每次响应都会返回next_cursor（没有更多数据时为null），下一页请求传入cursor=next_cursor即可，page参数将被忽略
+    - 游标分页不使用OFFSET，深度翻页不会变慢；游标与sort_by/sort_order绑定，切换排序后需从第一页重新开始
+    - with_total: 是否计算总页数pages。页码分页默认计算；游标分页默认不计算（pages为null），
+      无限滚动的客户端首页可传with_total=false跳过COUNT
+    
+    ## 总数计算
+    - count_mode: 总页数的计算方式，指定后忽略with_total
+      - exact: 精确计数（COUNT），即页码分页的默认行为
+      - estimated: 估算总数，不扫描全部匹配记录。优先使用同一筛选条件已有的精确总数，否则使用数据库查询计划的行数估计；
+        估算值置信度低时服务端会在后台补算精确总数，同一条件的下一次请求（如翻页）即返回精确值
+      - none: 不计算总数，pages为null
+    - count_mode=estimated时pages_estimated为true表示pages是估算值，其他计数方式下为null
+    
+    ## 返回字段
+    - 默认只返回列表卡片字段（产品名称、保险公司及该类型的主要指标），完整产品数据请使用/product_info
+    - fields: 逗号分隔的字段名（可通过/product_fields获取），例如 fields=product_name,insurer,waiting_period；
+      product_id始终返回，指定sort_by时排序字段也会返回
+    
+    ## 全文检索
+    - q: 在产品的全部文本字段（产品名称、责任说明、免责条款等）中检索，空格分隔的多个关键词需同时命中（可在不同字段）
+    - 未指定sort_by时按相关度排序（产品名称、保险公司字段命中权重更高）；q可与筛选参数、游标分页组合使用
+    - 响应中的highlights按本页产品顺序给出相关度score和命中字段fields（未指定q时为null）：
+      每个字段包含field、description、snippet（命中位置附近的片段）和positions（命中文本在片段中的[起始, 结束)偏移）
+    
     ## 动态筛选参数
     每种保险产品类型都有特定的字段可用于筛选，可以通过/product_fields接口获取。
     
@@ -85,22 +132,34 @@ async def search_products(
     - 直接数值: 精确匹配，例如 free_look_days=15
     
     ### 布尔型字段筛选
-    直接传true/false，例如：has_tpd_cover=true
+    直接传true/false（也可使用1/0、是/否），例如：has_tpd_cover=true
     
     ### 文本型字段筛选
-    支持模糊匹配，例如：product_name=寿险
+    - 模糊匹配，例如：product_name=寿险
+    - 前缀匹配，例如：product_name=^国寿
+    - 精确匹配，例如：insurer==中国人寿保险股份有限公司
+    
+    ### JSON字段筛选
+    - 传入JSON对象/数组时按包含关系匹配，例如：payment_end_age={"到达期限":"105岁"}
+    - 其他取值按文本模糊匹配
+    
+    筛选条件按字段的实际类型校验，类型不符或使用不支持的运算符（如!=）时返回400
     
     ## 示例
     - 基本搜索: /search?product_type=term_life&page=1&limit=10
     - 数学符号筛选: /search?product_type=term_life&entry_age_min_years=>=18&entry_age_max_years=<=65
     - 组合筛选: /search?product_type=term_life&has_tpd_cover=true&waiting_period=<180&product_name=定期
     - 排序: /search?product_type=term_life&sort_by=entry_age_min_years&sort_order=asc
+    - 游标分页: /search?product_type=term_life&with_total=false，之后 /search?product_type=term_life&cursor=<next_cursor>
+    - 全文检索: /search?product_type=critical_illness&q=恶性肿瘤 终身
+    - 指定返回字段: /search?product_type=term_life&fields=product_name,insurer,exclusions_text
     """
     # 获取所有查询参数
     query_params = dict(request.query_params)
     
+    # 产品搜索使用同步数据库访问和内存引擎计算，放到线程池中执行，不阻塞事件循环
     # 获取该产品类型的所有字段信息
-    fields_info = InsuranceProductCRUD.get_product_fields(product_type)
+    fields_info = await run_in_threadpool(InsuranceProductCRUD.get_product_fields, product_type)
     valid_fields = {f['name'] for f in fields_info}
     
     # 处理筛选参数
@@ -109,7 +168,7 @@ async def search_products(
     # 处理动态参数
     for key, value in query_params.items():
         # 跳过系统参数
-        if key in ["product_type", "page", "limit", "sort_by", "sort_order", "user_id"]:
+        if key in ["product_type", "page", "limit", "sort_by", "sort_order", "cursor", "with_total", "q", "fields", "count_mode", "user_id"]:
             continue
         
         # 只添加有效字段
@@ -117,19 +176,132 @@ async def search_products(
             filters[key] = value
     
     # 查询产品
-    products, total_pages = InsuranceProductCRUD.search_products(
+    try:
+        result = await run_in_threadpool(
+            InsuranceProductCRUD.search_product_rows,
+            db=db,
+            product_type=product_type,
+            page=page,
+            limit=limit,
+            sort_by=sort_by,
+            sort_order=sort_order,
+            cursor=cursor,
+            with_total=with_total,
+            q=q,
+            fields=fields,
+            count_mode=count_mode,
+            **filters
+        )
+    except ProductSearchError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    
+    # 行数据直接编码为JSON（与ProductSearchResponse的输出一致），跳过响应模型的逐字段校验
+    serializer = get_row_serializer(result.schema, result.columns, decimal_as_str=True)
+    # 字段顺序和未设置时的null与ProductSearchResponse的model_dump保持一致
+    envelope = {
+        "code": 200,
+        "message": "搜索保险产品成功",
+        "pages": result.total_pages,
+        "pages_estimated": result.pages_estimated if count_mode == "estimated" else None,
+        "next_cursor": result.next_cursor,
+    }
+    trailer = {"highlights": result.highlights()}
+    # 估算的总数会在后台补算为精确值，不写入响应缓存
+    headers = {"Cache-Control": "no-store"} if result.pages_estimated else None
+    return PreEncodedJSONResponse(
+        encode_envelope(envelope, "products", serializer.encode_rows(result.rows), trailer),
+        headers=headers,
+    )
+
+@router.get("/facets", response_model=ProductFacetsResponse)
+def get_product_facets_api(
+    request: Request,
+    product_type: str = Query(..., description="产品类型"),
+    buckets: int = Query(DEFAULT_BUCKETS, ge=1, le=MAX_BUCKETS, description="数值字段直方图分桶数"),
+) -> Any:
+    """
+    获取保险产品字段的分面统计，用于客户端筛选面板 - 公开API，无需认证
+    
+    - 数值字段：min/max及直方图buckets（等宽分桶，边界取自全目录，筛选前后可直接对比）
+    - 布尔字段和不同取值较少的文本字段（如保险公司）：values（各取值的记录数，按记录数降序）
+    
+    不带筛选参数时返回全目录分面（导入时预先计算并缓存）；
+    带筛选参数时（语法与/search相同）返回满足条件的产品的分面
+    
+    ## 示例
+    - /facets?product_type=term_life
+    - /facets?product_type=term_life&has_tpd_cover=true&entry_age_max_years=>=60
+    """
+    fields_info = InsuranceProductCRUD.get_product_fields(product_type)
+    
+    if not fields_info:
+        return {
+            "code": 404,
+            "message": "未找到指定产品类型",
+            "total": 0,
+            "facets": []
+        }
+    
+    # 筛选参数只保留有效字段
+    valid_fields = {f['name'] for f in fields_info}
+    filters = {
+        key: value for key, value in request.query_params.items()
+        if key not in ["product_type", "buckets", "user_id"] and key in valid_fields
+    }
+    
+    try:
+        result = get_product_facets(product_type, filters, buckets)
+    except ProductSearchError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    
+    return {
+        "code": 200,
+        "message": "获取保险产品分面统计成功",
+        "total": result["total"],
+        "facets": result["facets"]
+    }
+
+@router.get("/search_all", response_model=UnifiedSearchResponse)
+def search_all_products(
+    product_name: Optional[str] = Query(None, description="产品名称（模糊匹配）"),
+    insurer: Optional[str] = Query(None, description="保险公司（模糊匹配）"),
+    entry_age_min: Optional[float] = Query(None, ge=0, description="投保人年龄下限"),
+    entry_age_max: Optional[float] = Query(None, ge=0, description="投保人年龄上限"),
+    page: int = Query(1, ge=1, description="页码"),
+    limit: int = Query(10, ge=1, le=100, description="每页条数"),
+    db: Session = Depends(get_db),
+) -> Any:
+    """
+    跨所有产品类型搜索保险产品 - 公开API，无需认证
+    
+    在定期寿险、年金、非年金、医疗保险、重疾险中同时按通用字段搜索，一次请求返回合并后的结果
+    
+    - product_name: 产品名称，模糊匹配；结果按完全匹配、前缀匹配、包含匹配排序
+    - insurer: 保险公司，模糊匹配（对应各表的insurer/insurance_company列）
+    - entry_age_min / entry_age_max: 投保人年龄范围，返回可投保年龄覆盖该范围的产品（未填写年龄限制的产品视为不限）
+    
+    返回的每个产品包含product_type，可直接用于/product_info查询详情
+    
+    ## 示例
+    - /search_all?product_name=国寿
+    - /search_all?insurer=人保&entry_age_min=30&entry_age_max=30
+    """
+    if entry_age_min is not None and entry_age_max is not None and entry_age_min > entry_age_max:
+        raise HTTPException(status_code=400, detail="entry_age_min不能大于entry_age_max")
+    
+    products, total_pages = InsuranceProductCRUD.search_all_products(
         db=db,
-        product_type=product_type,
+        product_name=product_name,
+        insurer=insurer,
+        entry_age_min=entry_age_min,
+        entry_age_max=entry_age_max,
         page=page,
         limit=limit,
-        sort_by=sort_by,
-        sort_order=sort_order,
-        **filters
     )
     
     return {
         "code": 200,
-        "message": "搜索保险产品成功",
+        "message": "跨类型搜索保险产品成功",
         "pages": total_pages,
         "products": products
     }
@@ -147,21 +319,177 @@ def get_product_info(
     
     返回：包含中文字段名的产品详细信息
     """
-    product = InsuranceProductCRUD.get_product_info(db, product_id, product_type)
+    found = InsuranceProductCRUD.get_product_info_row(db, product_id, product_type)
     
-    if not product:
+    if not found:
         return {
             "code": 404,
             "message": "未找到指定产品"
         }
+    schema, columns, row = found
     
-    # 创建响应（使用中文字段名）
+    # 创建响应（使用中文字段名），产品字段直接编码后拼接到响应中
     response_data = {
         "code": 200,
         "message": "获取保险产品信息成功"
     }
+    fields_json = get_row_serializer(schema, columns).encode_fields(row)
     
-    # 添加产品信息到响应
-    response_data.update(product)
+    # 添加产品类型，方便前端使用
+    return PreEncodedJSONResponse(
+        encode_envelope(response_data, None, fields_json, {"product_type": product_type})
+    )
+
+@router.get("/compare", response_model=ProductCompareResponse)
+def compare_products(
+    product_type: str = Query(..., description="产品类型"),
+    product_ids: List[int] = Query(..., description="要对比的产品ID，可重复传入，例如 product_ids=1&product_ids=2"),
+    only_diff: bool = Query(False, description="只返回取值不同的字段"),
+    db: Session = Depends(get_db),
+) -> Any:
+    """
+    对比同一类型的多个保险产品 - 公开API，无需认证
+    
+    一次查询取出全部产品，返回按字段对齐的对比矩阵：
+    - products: 矩阵每列对应的产品（product_id、产品名称、保险公司），与请求顺序一致
+    - fields: 每个字段一行，包含field、description（中文字段名）、type、differs（各产品取值是否不同）和values（与products对齐）
+    - 所有产品都为空的字段不返回；only_diff=true时只返回取值不同的字段，适合直接交给AI对比
+    
+    取值经过规范化，可以直接比较：数值去掉多余小数位，JSON按对象返回，文本统一全角/半角和空白
+    
+    ## 示例
+    - /compare?product_type=term_life&product_ids=1&product_ids=2
+    - /compare?product_type=medical&product_ids=3&product_ids=5&product_ids=8&only_diff=true
+    """
+    product_ids = dedupe_product_ids(product_ids)
+    if not MIN_COMPARE_PRODUCTS <= len(product_ids) <= MAX_COMPARE_PRODUCTS:
+        raise HTTPException(
+            status_code=400,
+            detail=f"对比产品数量应为{MIN_COMPARE_PRODUCTS}-{MAX_COMPARE_PRODUCTS}个（不含重复）"
+        )
+    
+    comparison = InsuranceProductCRUD.compare_products(db, product_type, product_ids, only_diff)
+    
+    if comparison is None:
+        return {
+            "code": 404,
+            "message": "未找到指定产品类型",
+            "product_type": product_type
+        }
+    
+    return {
+        "code": 200,
+        "message": "产品对比成功",
+        "product_type": product_type,
+        **comparison
+    }
+
+@router.get("/export")
+def export_products(
+    request: Request,
+    product_type: str = Query(..., description="产品类型，all表示导出所有产品类型"),
+    format: str = Query("ndjson", description="导出格式：ndjson 或 csv"),
+    fields: Optional[str] = Query(None, description="逗号分隔的导出字段，默认导出全部字段"),
+) -> Any:
+    """
+    批量导出保险产品目录 - 公开API，无需认证
+    
+    以流式响应输出整个产品目录（按product_id排序），服务端游标按批读取，适合合作方和分析任务拉取全量数据，
+    无需按页调用/search。
+    
+    - format=ndjson: 每行一个JSON对象（中文字段名，与/product_info一致）；product_type=all时每行包含product_type
+    - format=csv: 带表头（中文字段名）的CSV，UTF-8编码（带BOM）；只支持单个产品类型
+    - 筛选参数与/search相同，例如 entry_age_min_years=>=18&has_tpd_cover=true；
+      product_type=all时只导出包含全部筛选字段的产品类型
+    
+    ## 示例
+    - /export?product_type=term_life
+    - /export?product_type=critical_illness&format=csv&waiting_days=<=90
+    - /export?product_type=all&fields=product_name
+    """
+    if format not in EXPORT_FORMATS:
+        raise HTTPException(status_code=400, detail=f"无效的导出格式: {format}，可选值为 {', '.join(EXPORT_FORMATS)}")
+    
+    export_all = product_type == ALL_PRODUCT_TYPES
+    if export_all and format == "csv":
+        raise HTTPException(status_code=400, detail="CSV导出需要指定单个产品类型")
+    product_types = InsuranceProductCRUD.get_product_types() if export_all else [product_type]
     
-    return response_data 
\ No newline at end of file
+    # 筛选参数：除系统参数外、属于导出产品表字段的查询参数
+    valid_fields: Set[str] = set()
+    for pt in product_types:
+        valid_fields.update(f['name'] for f in InsuranceProductCRUD.get_product_fields(pt))
+    filters = {
+        key: value for key, value in request.query_params.items()
+        if key not in ("product_type", "format", "fields") and key in valid_fields
+    }
+    
+    try:
+        plans = prepare_export(product_types, filters, fields, skip_missing_fields=export_all)
+    except ProductSearchError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    
+    filename = f"insurance_products_{product_type}.{format}"
+    return StreamingResponse(
+        stream_export(plans, format, with_type=export_all),
+        media_type=MEDIA_TYPES[format],
+        headers={"Content-Disposition": f'attachment; filename="{filename}"'},
+    )
+
+@router.get("/recommendations", response_model=ProductRecommendationResponse)
+def recommend_products(
+    user_id: uuid.UUID = Query(..., description="用户ID"),
+    top_k: int = Query(DEFAULT_TOP_K, ge=1, le=MAX_TOP_K, description="每种产品类型返回的产品数"),
+    db: Session = Depends(get_db),
+) -> Any:
+    """
+    根据用户个人信息推荐保险产品
+    
+    - 从用户个人信息解析画像：年龄、年收入、风险厌恶程度、家庭成员数量（返回在profile中，无法解析的项为null）
+    - 按年龄筛选各产品类型中可投保的产品（产品投保年龄限制为空视为不限；未填写年龄时不筛选）
+    - 按收益率、等待期、免赔额、保额、保费等数值指标打分（0~100），指标权重随画像调整：
+      风险厌恶程度高时侧重保证收益和保证续保，收入较低时侧重保费和免赔额，家庭成员多时侧重保额和全残责任
+    - 每种产品类型返回得分最高的top_k个产品，reasons为得分贡献最大的指标
+    
+    结果按用户缓存，用户个人信息或产品目录更新后重新计算
+    """
+    user = db.query(User).filter(User.user_id == user_id).first()
+    if not user:
+        raise HTTPException(status_code=404, detail="用户不存在")
+    
+    user_info = db.query(UserInfo).filter(UserInfo.user_id == user_id).first()
+    result = product_recommender.recommend(str(user_id), user_info, top_k)
+    
+    return {
+        "code": 200,
+        "message": "获取产品推荐成功",
+        **result
+    }
+
+@router.post("/product_info/batch", response_model=BatchProductInfoResponse)
+def get_products_info_batch(
+    request: BatchProductInfoRequest,
+    db: Session = Depends(get_db),
+) -> Any:
+    """
+    批量获取保险产品详细信息 - 公开API，无需认证
+    
+    请求体为(product_id, product_type)列表（最多500项），例如用户保单列表：
+    {"items": [{"product_id": 1, "product_type": "term_life"}, {"product_id": 3, "product_type": "medical"}]}
+    
+    返回：
+    - products: 按请求顺序排列的产品详情（中文字段名，包含product_id和product_type）
+    - missing: 未找到的产品标识
+    """
+    items = [(item.product_id, item.product_type) for item in request.items]
+    products, missing = InsuranceProductCRUD.get_products_info(db, items)
+    
+    return {
+        "code": 200,
+        "message": "批量获取保险产品信息成功",
+        "products": products,
+        "missing": [
+            {"product_id": product_id, "product_type": product_type}
+            for product_id, product_type in missing
+        ]
+    }
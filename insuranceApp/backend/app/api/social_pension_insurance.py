@@ -4,10 +4,10 @@
 import logging
 from typing import Dict, Any
 from fastapi import APIRouter, Depends, HTTPException, Query
-from sqlalchemy.orm import Session
+from sqlalchemy.ext.asyncio import AsyncSession
 
-from app.db.base import get_db
-from app.db.crud.social_pension_insurance import get_social_pension_insurance_crud
+from app.db.async_base import get_async_db
+from app.db.crud.social_pension_insurance import get_async_social_pension_insurance_crud
 from app.schemas.social_pension_insurance import (
     SocialPensionInsuranceQuery,
     SocialPensionInsuranceResponse
@@ -21,22 +21,22 @@ router = APIRouter()
 @router.get("/query", response_model=SocialPensionInsuranceResponse)
 async def query_social_pension_insurance(
     province: str = Query(..., description="省市名称"),
-    db: Session = Depends(get_db)
+    db: AsyncSession = Depends(get_async_db)
 ):
     """
     查询社会养老保险信息
     
     Args:
         province: 省市名称
-        db: 数据库会话
+        db: 异步数据库会话
         
     Returns:
         SocialPensionInsuranceResponse: 社会养老保险信息响应
     """
     try:
         # 查询数据
-        crud = get_social_pension_insurance_crud(db)
-        data = crud.get_data_as_dict(province)
+        crud = get_async_social_pension_insurance_crud(db)
+        data = await crud.get_data_as_dict(province)
         
         if not data:
             raise HTTPException(
@@ -61,19 +61,19 @@ async def query_social_pension_insurance(
 
 
 @router.get("/provinces", response_model=Dict[str, Any])
-async def get_provinces(db: Session = Depends(get_db)):
+async def get_provinces(db: AsyncSession = Depends(get_async_db)):
     """
     获取所有可查询的省市列表
     
     Args:
-        db: 数据库会话
+        db: 异步数据库会话
         
     Returns:
         Dict: 省市列表响应
     """
     try:
-        crud = get_social_pension_insurance_crud(db)
-        provinces = crud.get_all_provinces()
+        crud = get_async_social_pension_insurance_crud(db)
+        provinces = await crud.get_all_provinces()
         
         return {
             "code": 200,
@@ -35,6 +35,9 @@ class Settings(BaseSettings):
 
     # AI模块API密钥
     AI_MODULE_KEYS: List[str] = []
+
+    # 管理员账号（JSON数组，如 ["admin"]），为空时管理员接口拒绝所有请求
+    ADMIN_ACCOUNTS: List[str] = []
     
     # 数据库连接参数
     POSTGRES_USER: str = "postgres"
@@ -46,6 +49,24 @@ class Settings(BaseSettings):
     # 数据库URL
     DATABASE_URL: Optional[PostgresDsn] = None
 
+    # 产品搜索引擎：sql（查询数据库）或 memory（内存列式引擎，启动/导入后加载整表）
+    PRODUCT_SEARCH_ENGINE: str = "sql"
+
+    # 产品目录接口响应缓存（按目录版本失效）
+    RESPONSE_CACHE_ENABLED: bool = True
+    RESPONSE_CACHE_MAX_ENTRIES: int = 1024
+    RESPONSE_CACHE_MAX_BYTES: int = 64 * 1024 * 1024
+    RESPONSE_CACHE_MAX_AGE: int = 60
+
+    # 启动时强制重建全部数据表（默认只重建源文件发生变化的表）
+    IMPORT_FORCE_REBUILD: bool = False
+
+    # 导入时解析xlsx的进程数（0表示按CPU核数，1表示在当前进程中依次解析）
+    IMPORT_WORKERS: int = 0
+
+    # 导入时用tracemalloc统计每个xlsx文件解析的内存峰值（解析耗时约增加数倍，仅用于排查）
+    IMPORT_TRACE_MEMORY: bool = False
+
     @field_validator("DATABASE_URL", mode="before")
     def assemble_db_connection(cls, v: Optional[str]) -> Any:
         if isinstance(v, str):
@@ -59,7 +80,7 @@ class Settings(BaseSettings):
             path=f"/{os.getenv('POSTGRES_DB', 'insurance_app')}",
         )
     
-    @field_validator("AI_MODULE_KEYS", mode="before")
+    @field_validator("AI_MODULE_KEYS", "ADMIN_ACCOUNTS", mode="before")
     def parse_ai_module_keys(cls, v: Any) -> List[str]:
         if isinstance(v, str):
             try:
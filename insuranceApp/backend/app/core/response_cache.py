@@ -0,0 +1,183 @@
+"""
+产品目录接口响应缓存
+
+产品目录接口的返回数据只在导入后变化，缓存键为 (路径, 规范化查询参数, 目录版本)；
+目录版本来自产品表结构注册表，导入重建表后自动递增，旧版本的缓存随之作废。
+响应带ETag/Cache-Control头，客户端携带If-None-Match且未变化时返回304。
+接口返回Cache-Control: no-store的响应不缓存。
+"""
+import hashlib
+import logging
+import threading
+from collections import OrderedDict
+from typing import Dict, Optional, Tuple
+from urllib.parse import urlencode
+
+from fastapi import Request
+from starlette.middleware.base import BaseHTTPMiddleware, RequestResponseEndpoint
+from starlette.responses import Response
+
+from app.core.config import settings
+from app.db.schema_registry import product_schema_registry
+
+logger = logging.getLogger(__name__)
+
+# 启用缓存的GET接口
+CACHEABLE_PATHS = {
+    "/api/v1/insurance_products/product_types",
+    "/api/v1/insurance_products/product_fields",
+    "/api/v1/insurance_products/search",
+    "/api/v1/insurance_products/search_all",
+    "/api/v1/insurance_products/facets",
+    "/api/v1/insurance_products/compare",
+    "/api/v1/insurance_products/product_info",
+}
+
+# 每个缓存条目除响应体外的估算开销（字节）
+_ENTRY_OVERHEAD = 256
+
+
+class CachedResponse:
+    """缓存的响应"""
+
+    def __init__(self, body: bytes, media_type: Optional[str], etag: str):
+        self.body = body
+        self.media_type = media_type
+        self.etag = etag
+
+
+class ResponseCache:
+    """按目录版本失效、按条目数和内存占用淘汰的LRU响应缓存"""
+
+    def __init__(self, max_entries: int, max_bytes: int):
+        self.max_entries = max_entries
+        self.max_bytes = max_bytes
+        self._lock = threading.Lock()
+        self._entries: "OrderedDict[str, Tuple[CachedResponse, int]]" = OrderedDict()
+        self._version: Optional[int] = None
+        self._bytes = 0
+        self.hits = 0
+        self.misses = 0
+
+    def _sync_version(self, version: int) -> None:
+        """目录版本变化时清空所有条目（调用方持有锁）"""
+        if self._version != version:
+            self._entries.clear()
+            self._bytes = 0
+            self._version = version
+
+    def get(self, key: str, version: int) -> Optional[CachedResponse]:
+        """读取缓存条目"""
+        with self._lock:
+            self._sync_version(version)
+            item = self._entries.get(key)
+            if item is None:
+                self.misses += 1
+                return None
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return item[0]
+
+    def put(self, key: str, version: int, response: CachedResponse) -> None:
+        """写入缓存条目，超出限制时淘汰最久未使用的条目"""
+        size = len(response.body) + len(key) + _ENTRY_OVERHEAD
+        if size > self.max_bytes:
+            return
+
+        with self._lock:
+            # 请求处理期间目录已更新，旧版本的结果不再写入
+            if version != product_schema_registry.version:
+                return
+            self._sync_version(version)
+
+            old = self._entries.pop(key, None)
+            if old is not None:
+                self._bytes -= old[1]
+            self._entries[key] = (response, size)
+            self._bytes += size
+
+            while self._entries and (
+                len(self._entries) > self.max_entries or self._bytes > self.max_bytes
+            ):
+                _, (_, evicted_size) = self._entries.popitem(last=False)
+                self._bytes -= evicted_size
+
+    def clear(self) -> None:
+        """清空缓存"""
+        with self._lock:
+            self._entries.clear()
+            self._bytes = 0
+
+    def stats(self) -> Dict[str, int]:
+        """缓存统计信息"""
+        with self._lock:
+            return {
+                "version": self._version if self._version is not None else -1,
+                "entries": len(self._entries),
+                "bytes": self._bytes,
+                "hits": self.hits,
+                "misses": self.misses,
+            }
+
+
+# 全局响应缓存实例
+response_cache = ResponseCache(
+    max_entries=settings.RESPONSE_CACHE_MAX_ENTRIES,
+    max_bytes=settings.RESPONSE_CACHE_MAX_BYTES,
+)
+
+
+def _cache_key(request: Request) -> str:
+    """路径 + 按参数名排序的查询参数"""
+    query = urlencode(sorted(request.query_params.multi_items()))
+    return f"{request.url.path}?{query}"
+
+
+def _etag_matches(if_none_match: Optional[str], etag: str) -> bool:
+    """If-None-Match是否包含当前ETag（忽略弱校验前缀）"""
+    if not if_none_match:
+        return False
+    candidates = [tag.strip() for tag in if_none_match.split(",")]
+    return "*" in candidates or etag in candidates or f"W/{etag}" in candidates
+
+
+def _build_response(cached: CachedResponse, request: Request, cache_status: str) -> Response:
+    """根据缓存条目构建响应，ETag匹配时返回304"""
+    headers = {
+        "ETag": cached.etag,
+        "Cache-Control": f"public, max-age={settings.RESPONSE_CACHE_MAX_AGE}",
+        "X-Cache": cache_status,
+    }
+    if _etag_matches(request.headers.get("if-none-match"), cached.etag):
+        return Response(status_code=304, headers=headers)
+    return Response(content=cached.body, media_type=cached.media_type, headers=headers)
+
+
+class ResponseCacheMiddleware(BaseHTTPMiddleware):
+    """产品目录接口响应缓存中间件"""
+
+    async def dispatch(self, request: Request, call_next: RequestResponseEndpoint) -> Response:
+        if request.method != "GET" or request.url.path not in CACHEABLE_PATHS:
+            return await call_next(request)
+
+        version = product_schema_registry.version
+        key = _cache_key(request)
+
+        cached = response_cache.get(key, version)
+        if cached is not None:
+            return _build_response(cached, request, "HIT")
+
+        response = await call_next(request)
+        # 接口声明不可缓存的响应（如估算的搜索总数）直接返回
+        if response.status_code != 200 or "no-store" in response.headers.get("cache-control", ""):
+            return response
+
+        body = b"".join([chunk async for chunk in response.body_iterator])
+        digest = hashlib.sha1(body).hexdigest()[:16]
+        cached = CachedResponse(
+            body=body,
+            media_type=response.media_type or response.headers.get("content-type"),
+            etag=f'"{version}-{digest}"',
+        )
+        response_cache.put(key, version, cached)
+        return _build_response(cached, request, "MISS")
@@ -0,0 +1,30 @@
+"""
+异步数据库引擎与会话
+
+async def 的路由处理函数使用同步会话时，每次查询都会阻塞事件循环，慢查询会拖住同一worker上的所有请求。
+这些路由改用asyncpg驱动的异步会话，连接参数与同步引擎相同（DATABASE_URL，驱动替换为asyncpg）。
+"""
+from typing import AsyncGenerator
+
+from sqlalchemy.engine import make_url
+from sqlalchemy.ext.asyncio import AsyncSession, async_sessionmaker, create_async_engine
+
+from app.core.config import settings
+
+# 异步引擎使用的数据库URL
+ASYNC_DATABASE_URL = make_url(str(settings.DATABASE_URL)).set(drivername="postgresql+asyncpg")
+
+# 创建异步数据库引擎
+async_engine = create_async_engine(ASYNC_DATABASE_URL, pool_pre_ping=True)
+
+# 创建异步会话工厂（提交后不使对象过期，避免在请求结束前隐式访问数据库）
+AsyncSessionLocal = async_sessionmaker(
+    bind=async_engine, class_=AsyncSession, autoflush=False, expire_on_commit=False
+)
+
+
+# 异步会话依赖函数
+async def get_async_db() -> AsyncGenerator[AsyncSession, None]:
+    """获取异步数据库会话"""
+    async with AsyncSessionLocal() as db:
+        yield db
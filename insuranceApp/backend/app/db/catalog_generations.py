@@ -0,0 +1,203 @@
+"""
+产品目录的蓝绿切换
+
+重新导入产品表时不再先删除正在服务的表：导入器把新数据写入影子表
+insurance_products_{类型}__next（卡片表为 insurance_products_{类型}_card__next），
+在影子表上完成校验、建索引和物化卡片表，再在一个短事务中改名切换：
+
+    当前表 -> __prev（上一代，保留用于回滚）
+    __next -> 当前表
+
+改名只修改系统目录，事务持有排他锁的时间与表大小无关；切换前正在执行的查询读完旧表后，
+新查询直接读取新表，搜索接口不会出现报错或空结果。切换等待锁超过 SWAP_LOCK_TIMEOUT 时放弃并重试，
+避免排队的改名操作阻塞后续查询。
+
+回滚交换当前表和 __prev，同样只需一次改名事务；再次回滚即恢复到回滚前的数据。
+表名带 "__" 的影子表和上一代表不会被产品表模型注册表当作产品表。
+"""
+import logging
+import time
+import uuid
+from typing import Any, Callable, Dict, List, Optional
+
+from sqlalchemy import text
+from sqlalchemy.engine import Connection
+from sqlalchemy.exc import OperationalError
+
+from app.db.base import engine
+from app.db.product_projections import card_table_name
+from app.db.schema_registry import product_schema_registry
+from app.models.insurance_product import PRODUCT_TABLE_PREFIX, product_model_registry
+
+logger = logging.getLogger(__name__)
+
+NEXT_SUFFIX = "__next"
+PREV_SUFFIX = "__prev"
+
+# 改名事务等待表锁的超时时间，超时后重试
+SWAP_LOCK_TIMEOUT = "3s"
+SWAP_RETRIES = 5
+SWAP_RETRY_DELAY_SECONDS = 1.0
+
+
+class CatalogGenerationError(Exception):
+    """产品目录切换或回滚失败"""
+
+
+def next_table_name(table_name: str) -> str:
+    """影子表名（新导入的数据）"""
+    return f"{table_name}{NEXT_SUFFIX}"
+
+
+def prev_table_name(table_name: str) -> str:
+    """上一代表名（用于回滚）"""
+    return f"{table_name}{PREV_SUFFIX}"
+
+
+def new_generation() -> str:
+    """新的导入批次标识（用于影子表上的索引名）"""
+    return uuid.uuid4().hex[:8]
+
+
+def _generation_tables(product_type: str) -> List[str]:
+    """一次切换中需要一起改名的表：基础产品表和卡片表"""
+    return [f"{PRODUCT_TABLE_PREFIX}{product_type}", card_table_name(product_type)]
+
+
+def _existing_tables(conn: Connection, names: List[str]) -> set:
+    result = conn.execute(
+        text("SELECT tablename FROM pg_tables WHERE schemaname = current_schema() AND tablename = ANY(:names)"),
+        {"names": names}
+    )
+    return {row[0] for row in result}
+
+
+def _rename(conn: Connection, source: str, target: str) -> None:
+    conn.execute(text(f"ALTER TABLE {source} RENAME TO {target}"))
+
+
+def _swap(conn: Connection, existing: set, a: str, b: str) -> None:
+    """交换两个表名（其中一个不存在时直接改名）"""
+    if a in existing and b in existing:
+        temp = f"{a}__swap"
+        _rename(conn, a, temp)
+        _rename(conn, b, a)
+        _rename(conn, temp, b)
+    elif a in existing:
+        _rename(conn, a, b)
+    elif b in existing:
+        _rename(conn, b, a)
+
+
+def _run_swap(description: str, action: Callable[[Connection], None]) -> None:
+    """在短事务中执行改名，等待表锁超时时重试"""
+    for attempt in range(1, SWAP_RETRIES + 1):
+        try:
+            started = time.perf_counter()
+            with engine.begin() as conn:
+                conn.execute(text(f"SET LOCAL lock_timeout = '{SWAP_LOCK_TIMEOUT}'"))
+                action(conn)
+            logger.info(f"{description}完成 ({(time.perf_counter() - started) * 1000:.1f} ms)")
+            return
+        except OperationalError as e:
+            if attempt == SWAP_RETRIES:
+                raise CatalogGenerationError(f"{description}失败: {e}") from e
+            logger.warning(f"{description}等待表锁超时，第 {attempt} 次重试: {e.__class__.__name__}")
+            time.sleep(SWAP_RETRY_DELAY_SECONDS)
+
+
+def _refresh_catalog(product_type: str) -> None:
+    """切换提交后使表结构缓存失效并重新反射模型（依赖目录版本号的缓存随之失效）"""
+    product_schema_registry.invalidate(product_type)
+    product_model_registry.get(product_type)
+
+
+def promote_generation(product_type: str) -> None:
+    """
+    把影子表切换为当前表，当前表保留为上一代（原上一代删除）
+
+    Args:
+        product_type: 产品类型（表名后缀）
+
+    Raises:
+        CatalogGenerationError: 影子表不存在或改名失败
+    """
+    tables = _generation_tables(product_type)
+
+    def action(conn: Connection) -> None:
+        names = tables + [next_table_name(t) for t in tables] + [prev_table_name(t) for t in tables]
+        existing = _existing_tables(conn, names)
+        if next_table_name(tables[0]) not in existing:
+            raise CatalogGenerationError(f"影子表不存在: {next_table_name(tables[0])}")
+        for table in tables:
+            prev, shadow = prev_table_name(table), next_table_name(table)
+            if prev in existing:
+                conn.execute(text(f"DROP TABLE {prev} CASCADE"))
+            if table in existing:
+                _rename(conn, table, prev)
+            # 卡片表物化失败时没有影子卡片表，旧卡片表也已移走，搜索回退到基础表
+            if shadow in existing:
+                _rename(conn, shadow, table)
+
+    _run_swap(f"切换产品目录 {product_type}", action)
+    _refresh_catalog(product_type)
+
+
+def rollback_generation(product_type: str) -> None:
+    """
+    回滚到上一代数据（交换当前表和上一代表，再次回滚即恢复）
+
+    导入清单仍记录最近一次导入的源文件哈希，因此重启时不会重新导入该文件；
+    源文件修正后（哈希变化）下次启动或重新导入时才会重建。
+    不能与导入并发执行（导入切换时会删除上一代表），调用方需通过
+    catalog_reload_manager.exclusive() 确认没有后台导入任务在运行。
+
+    Args:
+        product_type: 产品类型（表名后缀）
+
+    Raises:
+        CatalogGenerationError: 没有上一代数据或改名失败
+    """
+    tables = _generation_tables(product_type)
+
+    def action(conn: Connection) -> None:
+        existing = _existing_tables(conn, tables + [prev_table_name(t) for t in tables])
+        if prev_table_name(tables[0]) not in existing:
+            raise CatalogGenerationError(f"没有可回滚的上一代数据: {product_type}")
+        for table in tables:
+            _swap(conn, existing, table, prev_table_name(table))
+
+    _run_swap(f"回滚产品目录 {product_type}", action)
+    _refresh_catalog(product_type)
+
+
+def _row_count(conn: Connection, table: str) -> Optional[int]:
+    return conn.execute(text(f"SELECT COUNT(*) FROM {table}")).scalar()
+
+
+def get_generation_status(product_types: List[str]) -> List[Dict[str, Any]]:
+    """
+    各产品类型当前表、影子表和上一代表的记录数（表不存在时为None）
+
+    Args:
+        product_types: 产品类型（表名后缀）列表
+    """
+    status = []
+    with engine.connect() as conn:
+        for product_type in product_types:
+            table = f"{PRODUCT_TABLE_PREFIX}{product_type}"
+            names = {'current': table, 'next': next_table_name(table), 'prev': prev_table_name(table)}
+            existing = _existing_tables(conn, list(names.values()))
+            counts = {
+                key: _row_count(conn, name) if name in existing else None
+                for key, name in names.items()
+            }
+            status.append({
+                'product_type': product_type,
+                'table_name': table,
+                'current_records': counts['current'],
+                'next_records': counts['next'],
+                'prev_records': counts['prev'],
+                'can_rollback': counts['prev'] is not None,
+            })
+    return status
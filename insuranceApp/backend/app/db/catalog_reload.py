@@ -0,0 +1,295 @@
+"""
+管理员触发的后台数据重新导入
+
+此前刷新数据目录只能重启服务（init_db 在启动事件中执行）。管理员接口通过本模块在后台线程中执行导入：
+请求只创建导入任务并立即返回任务ID，客户端轮询任务状态查看进度（阶段、已写入记录数、错误）。
+
+- 同一时间只允许一个导入任务运行，已有任务运行时再次发起返回冲突
+- 导入复用启动时的导入流水线：解析在进程池中并行执行，写入在后台线程中逐个表进行
+- 产品表写入影子表后改名切换（见 catalog_generations），切换事务提交后才使表结构缓存失效，
+  依赖目录版本号的缓存（响应缓存、分面、计数、内存目录等）随之失效；
+  基本医保、社会养老保险的清空和写入在同一事务中提交
+- 上传的文件先保存到临时目录，导入成功后才替换数据目录中的同名文件，
+  与导入清单记录的哈希一致，重启时不会再次导入
+"""
+import logging
+import shutil
+import threading
+import traceback
+import uuid
+from collections import OrderedDict
+from contextlib import contextmanager
+from datetime import datetime
+from pathlib import Path
+from typing import Any, Dict, Iterator, List, Optional
+
+from app.core.config import settings
+from app.core.logging_config import log_error
+from app.db.base import SessionLocal
+from app.db.importers import InsuranceProductImporter
+from app.db.importers.pipeline import ImportTask, run_import_pipeline
+from app.db.init_db import DATA_DIR, collect_import_tasks, data_file_names
+from app.db.product_catalog_engine import product_catalog_engine
+
+logger = logging.getLogger(__name__)
+
+# 保留最近的导入任务数量（供轮询查询）
+MAX_RETAINED_JOBS = 20
+
+# 任务状态
+STATUS_QUEUED = "queued"
+STATUS_RUNNING = "running"
+STATUS_SUCCEEDED = "succeeded"
+STATUS_FAILED = "failed"
+
+
+class CatalogReloadBusyError(Exception):
+    """已有导入任务正在运行，或产品目录正在回滚"""
+
+    def __init__(self, job_id: Optional[str] = None):
+        super().__init__(f"已有导入任务正在运行: {job_id}" if job_id else "产品目录正在回滚，请稍后重试")
+        self.job_id = job_id
+
+
+class CatalogReloadJob:
+    """一次后台导入任务的状态"""
+
+    def __init__(
+        self,
+        source_dir: Path,
+        file_names: Optional[List[str]],
+        force: bool,
+        uploaded: bool = False,
+    ):
+        """
+        Args:
+            source_dir: 数据文件所在目录（数据目录或上传文件的临时目录）
+            file_names: 只导入这些文件，为None时导入全部数据文件
+            force: 是否忽略导入清单，源文件未变化也重新导入
+            uploaded: 文件是否为上传文件（导入成功后替换数据目录中的同名文件）
+        """
+        self.job_id = uuid.uuid4().hex
+        self.source_dir = source_dir
+        self.file_names = file_names
+        self.force = force
+        self.uploaded = uploaded
+
+        self.status = STATUS_QUEUED
+        # queued -> collecting（计算文件哈希、生成任务）-> parsing / loading -> refreshing -> finished
+        self.phase = "queued"
+        self.current_file: Optional[str] = None
+        self.files: Dict[str, Dict[str, Any]] = {}
+        self.skipped_files: List[str] = []
+        self.rows_loaded = 0
+        self.errors: List[str] = []
+        self.created_at = datetime.now()
+        self.started_at: Optional[datetime] = None
+        self.finished_at: Optional[datetime] = None
+        self._lock = threading.Lock()
+
+    @property
+    def active(self) -> bool:
+        return self.status in (STATUS_QUEUED, STATUS_RUNNING)
+
+    def update(self, **fields: Any) -> None:
+        with self._lock:
+            for key, value in fields.items():
+                setattr(self, key, value)
+
+    def add_error(self, message: str) -> None:
+        with self._lock:
+            self.errors.append(message)
+
+    def set_tasks(self, tasks: List[ImportTask], requested: List[str]) -> None:
+        """记录需要导入的文件，请求中其余文件视为源文件未变化而跳过"""
+        with self._lock:
+            for task in tasks:
+                self.files[task.path.name] = {
+                    'name': task.name,
+                    'file_name': task.path.name,
+                    'status': 'pending',
+                    'records': None,
+                    'parse_seconds': None,
+                    'load_seconds': None,
+                    'error': None,
+                }
+            self.skipped_files = [name for name in requested if name not in self.files]
+
+    def file_loading(self, task: ImportTask) -> None:
+        with self._lock:
+            self.phase = "loading"
+            self.current_file = task.path.name
+            self.files[task.path.name]['status'] = 'loading'
+
+    def file_loaded(self, timing: Dict[str, Any]) -> None:
+        with self._lock:
+            entry = self.files[timing['file_name']]
+            entry.update({
+                'status': 'succeeded' if timing['success'] else 'failed',
+                'records': timing['records'],
+                'parse_seconds': timing['parse_seconds'],
+                'load_seconds': timing['load_seconds'],
+                'error': timing['error'],
+            })
+            if timing['success']:
+                self.rows_loaded += timing['records'] or 0
+            else:
+                self.errors.append(f"{timing['file_name']}: {timing['error']}")
+            self.current_file = None
+            pending = any(f['status'] == 'pending' for f in self.files.values())
+            self.phase = "parsing" if pending else "refreshing"
+
+    def to_dict(self) -> Dict[str, Any]:
+        with self._lock:
+            return {
+                'job_id': self.job_id,
+                'status': self.status,
+                'phase': self.phase,
+                'source': 'upload' if self.uploaded else 'data_dir',
+                'force': self.force,
+                'current_file': self.current_file,
+                'total_files': len(self.files),
+                'completed_files': sum(1 for f in self.files.values() if f['status'] in ('succeeded', 'failed')),
+                'rows_loaded': self.rows_loaded,
+                'files': [dict(f) for f in self.files.values()],
+                'skipped_files': list(self.skipped_files),
+                'errors': list(self.errors),
+                'created_at': self.created_at,
+                'started_at': self.started_at,
+                'finished_at': self.finished_at,
+            }
+
+
+class CatalogReloadManager:
+    """后台导入任务管理（同一时间最多一个任务运行）"""
+
+    def __init__(self) -> None:
+        self._lock = threading.Lock()
+        self._jobs: "OrderedDict[str, CatalogReloadJob]" = OrderedDict()
+        self._running: Optional[CatalogReloadJob] = None
+        self._exclusive = False
+
+    def start(
+        self,
+        file_names: Optional[List[str]] = None,
+        force: bool = False,
+        upload_dir: Optional[Path] = None,
+    ) -> CatalogReloadJob:
+        """
+        创建导入任务并在后台线程中执行
+
+        Args:
+            file_names: 只导入这些文件，默认导入数据目录中的全部数据文件
+            force: 忽略导入清单，源文件未变化也重新导入
+            upload_dir: 上传文件所在的临时目录，任务结束后删除
+
+        Returns:
+            新建的导入任务
+
+        Raises:
+            CatalogReloadBusyError: 已有导入任务正在运行
+        """
+        with self._lock:
+            if self._running is not None and self._running.active:
+                raise CatalogReloadBusyError(self._running.job_id)
+            if self._exclusive:
+                raise CatalogReloadBusyError()
+
+            job = CatalogReloadJob(
+                upload_dir or DATA_DIR, file_names, force, uploaded=upload_dir is not None
+            )
+            self._running = job
+            self._jobs[job.job_id] = job
+            while len(self._jobs) > MAX_RETAINED_JOBS:
+                self._jobs.popitem(last=False)
+
+        thread = threading.Thread(
+            target=self._run, args=(job,), name=f"catalog-reload-{job.job_id[:8]}", daemon=True
+        )
+        thread.start()
+        logger.info(f"后台导入任务已创建: {job.job_id} (文件: {file_names or '全部'}, 强制: {force})")
+        return job
+
+    @contextmanager
+    def exclusive(self) -> Iterator[None]:
+        """
+        在没有导入任务运行时独占执行产品目录操作（如回滚），期间不能创建新的导入任务
+
+        导入任务切换影子表时会删除上一代表，回滚与导入并发执行会丢失刚回滚下来的数据。
+
+        Raises:
+            CatalogReloadBusyError: 已有导入任务正在运行或其他独占操作正在执行
+        """
+        with self._lock:
+            if self._running is not None and self._running.active:
+                raise CatalogReloadBusyError(self._running.job_id)
+            if self._exclusive:
+                raise CatalogReloadBusyError()
+            self._exclusive = True
+        try:
+            yield
+        finally:
+            with self._lock:
+                self._exclusive = False
+
+    def get(self, job_id: str) -> Optional[CatalogReloadJob]:
+        with self._lock:
+            return self._jobs.get(job_id)
+
+    def recent(self) -> List[CatalogReloadJob]:
+        """最近的导入任务（新任务在前）"""
+        with self._lock:
+            return list(reversed(self._jobs.values()))
+
+    def _run(self, job: CatalogReloadJob) -> None:
+        """后台线程中执行导入"""
+        job.update(status=STATUS_RUNNING, phase="collecting", started_at=datetime.now())
+        db = SessionLocal()
+        try:
+            requested = job.file_names or data_file_names()
+            tasks, summary = collect_import_tasks(
+                db, job.source_dir, skip_unchanged=not job.force, file_names=requested
+            )
+            job.set_tasks(tasks, [name for name in requested if (job.source_dir / name).exists()])
+            job.update(phase="parsing")
+
+            def on_loaded(timing: Dict[str, Any]) -> None:
+                job.file_loaded(timing)
+                if timing['success'] and job.uploaded:
+                    # 导入成功后才替换数据目录中的源文件
+                    shutil.copyfile(job.source_dir / timing['file_name'], DATA_DIR / timing['file_name'])
+
+            run_import_pipeline(tasks, on_load_start=job.file_loading, on_loaded=on_loaded)
+
+            # 切换已提交、缓存已失效；内存目录模式下在后台预先加载新数据，避免首个请求承担加载
+            job.update(phase="refreshing")
+            if settings.PRODUCT_SEARCH_ENGINE == "memory" and summary['tables']:
+                product_catalog_engine.warm([
+                    InsuranceProductImporter.PRODUCT_TYPES[product_type][0] for product_type in summary['tables']
+                ])
+
+            job.update(status=STATUS_FAILED if job.errors else STATUS_SUCCEEDED)
+            logger.info(
+                f"后台导入任务完成: {job.job_id}, 导入 {len(tasks)} 个文件, "
+                f"跳过 {len(job.skipped_files)} 个, 写入 {job.rows_loaded} 条记录, 错误 {len(job.errors)} 个"
+            )
+        except Exception as e:
+            job.add_error(f"导入任务失败: {e}")
+            job.update(status=STATUS_FAILED)
+            log_error(
+                message=f"后台导入任务失败: {str(e)}",
+                error_type="IMPORT_ERROR",
+                stack_trace=traceback.format_exc()
+            )
+        finally:
+            db.close()
+            job.update(phase="finished", current_file=None, finished_at=datetime.now())
+            if job.uploaded:
+                shutil.rmtree(job.source_dir, ignore_errors=True)
+            with self._lock:
+                if self._running is job:
+                    self._running = None
+
+
+# 全局后台导入任务管理器
+catalog_reload_manager = CatalogReloadManager()
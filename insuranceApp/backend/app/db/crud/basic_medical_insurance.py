@@ -4,87 +4,47 @@
 import logging
 from typing import Optional, Dict, Any, List
 from sqlalchemy.orm import Session
-from sqlalchemy import or_, and_
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy import ColumnElement, or_, and_, select
+from sqlalchemy.engine import Result
 
 from app.models.basic_medical_insurance import BasicMedicalInsurance
 
 logger = logging.getLogger(__name__)
 
 
-class BasicMedicalInsuranceCRUD:
-    """基本医保数据CRUD操作类"""
-    
-    def __init__(self, db: Session):
-        """
-        初始化CRUD操作类
-        
-        Args:
-            db: 数据库会话
-        """
-        self.db = db
+def _city_condition(city: str) -> ColumnElement[bool]:
+    """城市模糊匹配条件（同步和异步查询共用）"""
+    return or_(
+        BasicMedicalInsurance.city == city,
+        BasicMedicalInsurance.city.ilike(f"%{city}%"),
+        BasicMedicalInsurance.city.ilike(f"{city}%"),
+        BasicMedicalInsurance.city.ilike(f"%{city}")
+    )
+
+
+class BasicMedicalInsuranceRecordMixin:
+    """基本医保记录的转换和过滤（同步和异步CRUD共用）"""
     
-    def get_by_city(self, city: str) -> Optional[BasicMedicalInsurance]:
+    def _filter_record(
+        self, record: BasicMedicalInsurance, category: str, employment_status: Optional[str]
+    ) -> Optional[Dict[str, Any]]:
         """
-        根据城市查询基本医保数据
+        将数据库记录转换为字典并按种类过滤
         
-        Args:
-            city: 城市名称
-            
         Returns:
-            BasicMedicalInsurance: 基本医保数据记录，如果未找到返回None
+            Dict: 过滤后的数据字典，种类不支持时返回None
         """
-        try:
-            # 使用模糊匹配查找城市
-            record = self.db.query(BasicMedicalInsurance).filter(
-                or_(
-                    BasicMedicalInsurance.city == city,
-                    BasicMedicalInsurance.city.ilike(f"%{city}%"),
-                    BasicMedicalInsurance.city.ilike(f"{city}%"),
-                    BasicMedicalInsurance.city.ilike(f"%{city}")
-                )
-            ).first()
-            
-            return record
-        except Exception as e:
-            logger.error(f"查询城市 {city} 的基本医保数据失败: {e}")
-            return None
-    
-    def get_filtered_data(self, city: str, category: str, employment_status: Optional[str] = None) -> Optional[Dict[str, Any]]:
-        """
-        根据条件获取过滤后的基本医保数据
+        # 转换为字典
+        data_dict = self._record_to_dict(record)
         
-        Args:
-            city: 城市名称
-            category: 种类（城镇职工/城乡居民）
-            employment_status: 在职/退休状态（仅在种类为城镇职工时有效）
-            
-        Returns:
-            Dict: 过滤后的数据字典，如果未找到返回None
-        """
-        try:
-            # 查询基础数据
-            record = self.get_by_city(city)
-            if not record:
-                logger.warning(f"未找到城市 {city} 的基本医保数据")
-                return None
-            
-            # 转换为字典
-            data_dict = self._record_to_dict(record)
-            
-            # 根据种类过滤数据
-            if category == "城乡居民":
-                filtered_data = self._filter_resident_data(data_dict)
-            elif category == "城镇职工":
-                filtered_data = self._filter_employee_data(data_dict, employment_status)
-            else:
-                logger.error(f"不支持的种类: {category}")
-                return None
-            
-            return filtered_data
-            
-        except Exception as e:
-            logger.error(f"获取过滤数据失败: {e}")
-            return None
+        # 根据种类过滤数据
+        if category == "城乡居民":
+            return self._filter_resident_data(data_dict)
+        if category == "城镇职工":
+            return self._filter_employee_data(data_dict, employment_status)
+        logger.error(f"不支持的种类: {category}")
+        return None
     
     def _record_to_dict(self, record: BasicMedicalInsurance) -> Dict[str, Any]:
         """
@@ -234,6 +194,63 @@ class BasicMedicalInsuranceCRUD:
                 continue
         
         return filtered_data
+
+
+class BasicMedicalInsuranceCRUD(BasicMedicalInsuranceRecordMixin):
+    """基本医保数据CRUD操作类"""
+    
+    def __init__(self, db: Session):
+        """
+        初始化CRUD操作类
+        
+        Args:
+            db: 数据库会话
+        """
+        self.db = db
+    
+    def get_by_city(self, city: str) -> Optional[BasicMedicalInsurance]:
+        """
+        根据城市查询基本医保数据
+        
+        Args:
+            city: 城市名称
+            
+        Returns:
+            BasicMedicalInsurance: 基本医保数据记录，如果未找到返回None
+        """
+        try:
+            # 使用模糊匹配查找城市
+            record = self.db.query(BasicMedicalInsurance).filter(_city_condition(city)).first()
+            
+            return record
+        except Exception as e:
+            logger.error(f"查询城市 {city} 的基本医保数据失败: {e}")
+            return None
+    
+    def get_filtered_data(self, city: str, category: str, employment_status: Optional[str] = None) -> Optional[Dict[str, Any]]:
+        """
+        根据条件获取过滤后的基本医保数据
+        
+        Args:
+            city: 城市名称
+            category: 种类（城镇职工/城乡居民）
+            employment_status: 在职/退休状态（仅在种类为城镇职工时有效）
+            
+        Returns:
+            Dict: 过滤后的数据字典，如果未找到返回None
+        """
+        try:
+            # 查询基础数据
+            record = self.get_by_city(city)
+            if not record:
+                logger.warning(f"未找到城市 {city} 的基本医保数据")
+                return None
+            
+            return self._filter_record(record, category, employment_status)
+            
+        except Exception as e:
+            logger.error(f"获取过滤数据失败: {e}")
+            return None
     
     def get_all_cities(self) -> List[str]:
         """
@@ -250,6 +267,53 @@ class BasicMedicalInsuranceCRUD:
             return []
 
 
+class AsyncBasicMedicalInsuranceCRUD(BasicMedicalInsuranceRecordMixin):
+    """基本医保数据CRUD操作类（异步会话，供async def路由使用）"""
+    
+    def __init__(self, db: AsyncSession):
+        """
+        初始化CRUD操作类
+        
+        Args:
+            db: 异步数据库会话
+        """
+        self.db = db
+    
+    async def get_by_city(self, city: str) -> Optional[BasicMedicalInsurance]:
+        """根据城市查询基本医保数据（参数和返回值同同步版本）"""
+        try:
+            result = await self.db.execute(
+                select(BasicMedicalInsurance).where(_city_condition(city)).limit(1)
+            )
+            return result.scalars().first()
+        except Exception as e:
+            logger.error(f"查询城市 {city} 的基本医保数据失败: {e}")
+            return None
+    
+    async def get_filtered_data(self, city: str, category: str, employment_status: Optional[str] = None) -> Optional[Dict[str, Any]]:
+        """根据条件获取过滤后的基本医保数据（参数和返回值同同步版本）"""
+        try:
+            record = await self.get_by_city(city)
+            if not record:
+                logger.warning(f"未找到城市 {city} 的基本医保数据")
+                return None
+            
+            return self._filter_record(record, category, employment_status)
+            
+        except Exception as e:
+            logger.error(f"获取过滤数据失败: {e}")
+            return None
+    
+    async def get_all_cities(self) -> List[str]:
+        """获取所有城市列表"""
+        try:
+            result: Result[Any] = await self.db.execute(select(BasicMedicalInsurance.city).distinct())
+            return [city for city in result.scalars() if city]
+        except Exception as e:
+            logger.error(f"获取城市列表失败: {e}")
+            return []
+
+
 def get_basic_medical_insurance_crud(db: Session) -> BasicMedicalInsuranceCRUD:
     """
     获取基本医保CRUD操作实例
@@ -261,3 +325,16 @@ def get_basic_medical_insurance_crud(db: Session) -> BasicMedicalInsuranceCRUD:
         BasicMedicalInsuranceCRUD: CRUD操作实例
     """
     return BasicMedicalInsuranceCRUD(db)
+
+
+def get_async_basic_medical_insurance_crud(db: AsyncSession) -> AsyncBasicMedicalInsuranceCRUD:
+    """
+    获取基本医保CRUD操作实例（异步）
+    
+    Args:
+        db: 异步数据库会话
+        
+    Returns:
+        AsyncBasicMedicalInsuranceCRUD: CRUD操作实例
+    """
+    return AsyncBasicMedicalInsuranceCRUD(db)
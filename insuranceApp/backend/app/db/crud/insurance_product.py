@@ -1,12 +1,22 @@
-from typing import Any, Dict, List, Optional, Union, Tuple
+from typing import Any, Dict, List, Optional, Tuple
+import base64
+import json
 import logging
+from decimal import Decimal
 from sqlalchemy.orm import Session
-from sqlalchemy import text, desc, asc, func, and_, or_
-from sqlalchemy.sql.expression import cast
-from sqlalchemy.dialects.postgresql import JSONB
+from sqlalchemy import text, select
 
-from app.models.insurance_product import get_dynamic_model_class
+from app.models.insurance_product import product_model_registry
 from app.db.base import engine
+from app.db.schema_registry import ProductTableSchema, product_schema_registry
+from app.db.product_filters import CompiledFilter, ProductSearchError, compile_filters, escape_like
+from app.db.product_catalog_engine import product_catalog_engine
+from app.db.product_counts import COUNT_MODES, product_count_estimator
+from app.db.product_compare import build_comparison, order_rows, product_summary
+from app.db.product_projections import project_rows, resolve_projection, select_source_table, with_sort_column
+from app.db.product_serializer import get_row_serializer
+from app.db.product_text_index import TextSearchResult, product_text_index
+from app.core.config import settings
 
 logger = logging.getLogger(__name__)
 
@@ -19,6 +29,237 @@ PRODUCT_TYPE_MAPPING = {
     '重疾险': 'critical_illness',
 }
 
+
+def is_product_type(product_type: str) -> bool:
+    """
+    是否为有效的产品类型（PRODUCT_TYPE_MAPPING中的表名后缀）
+    
+    产品类型会拼接为表名，卡片表和切换时保留的表（如 term_life_card、term_life__prev）同样存在，
+    不能只按表是否存在判断
+    """
+    return product_type in PRODUCT_TYPE_MAPPING.values()
+
+# 跨产品类型的通用字段：逻辑字段 -> 各产品表中可能使用的列名
+COMMON_COLUMN_CANDIDATES = {
+    'product_name': ('product_name',),
+    'insurer': ('insurer', 'insurance_company'),
+    'entry_age_min': (
+        'entry_age_min_years', 'insured_min_entry_age', 'insured_min_age_years',
+        'min_entry_age_years', 'entry_age_min',
+    ),
+    'entry_age_max': (
+        'entry_age_max_years', 'insured_max_entry_age', 'insured_max_age_years',
+        'max_entry_age_years', 'entry_age_max',
+    ),
+}
+
+
+def resolve_common_columns(schema: ProductTableSchema) -> Dict[str, Optional[str]]:
+    """
+    解析产品表中通用字段对应的实际列名
+    
+    Returns:
+        {逻辑字段: 列名}，表中没有对应列时为None
+    """
+    return {
+        logical: next((c for c in candidates if c in schema.types), None)
+        for logical, candidates in COMMON_COLUMN_CANDIDATES.items()
+    }
+
+
+# 全文检索按相关度排序时游标中记录的排序标记
+RELEVANCE_SORT = "_relevance"
+
+
+def _encode_cursor(sort_by: Optional[str], order_direction: str, value: Any, product_id: int) -> str:
+    """
+    将最后一条记录的排序键编码为不透明游标
+    
+    Args:
+        sort_by: 排序字段
+        order_direction: 排序方向 (ASC/DESC)
+        value: 最后一条记录的排序字段值
+        product_id: 最后一条记录的产品ID
+        
+    Returns:
+        URL安全的base64游标字符串
+    """
+    if isinstance(value, Decimal):
+        value = str(value)
+    elif isinstance(value, (dict, list)):
+        value = json.dumps(value, ensure_ascii=False)
+    payload = {"s": sort_by, "o": order_direction, "v": value, "id": product_id}
+    raw = json.dumps(payload, ensure_ascii=False, default=str).encode("utf-8")
+    return base64.urlsafe_b64encode(raw).decode("ascii")
+
+
+def _decode_cursor(cursor: str, sort_by: Optional[str], order_direction: str) -> Tuple[Any, int]:
+    """
+    解析游标，并校验其排序方式与当前请求一致
+    
+    Returns:
+        (排序字段值, 产品ID)
+        
+    Raises:
+        ProductSearchError: 游标格式错误或与当前排序不匹配
+    """
+    try:
+        payload = json.loads(base64.urlsafe_b64decode(cursor.encode("ascii")))
+        value, product_id = payload["v"], int(payload["id"])
+    except Exception:
+        raise ProductSearchError("无效的游标")
+    
+    if payload.get("s") != sort_by or payload.get("o") != order_direction:
+        raise ProductSearchError("游标与当前排序方式不匹配")
+    return value, product_id
+
+
+def _keyset_condition(sort_by: Optional[str], order_direction: str, value_is_null: bool) -> str:
+    """
+    构建游标定位条件，与 ORDER BY sort_by NULLS LAST, product_id 的顺序一致
+    
+    Args:
+        sort_by: 排序字段（为空则只按product_id升序）
+        order_direction: 排序方向 (ASC/DESC)
+        value_is_null: 游标中的排序字段值是否为NULL
+    """
+    if not sort_by:
+        return "product_id > :cursor_id"
+    
+    op = ">" if order_direction == "ASC" else "<"
+    if value_is_null:
+        # NULL排在最后，只需在NULL记录中继续按product_id推进
+        return f"({sort_by} IS NULL AND product_id {op} :cursor_id)"
+    return (
+        f"({sort_by} {op} :cursor_value"
+        f" OR ({sort_by} = :cursor_value AND product_id {op} :cursor_id)"
+        f" OR {sort_by} IS NULL)"
+    )
+
+
+def _fetch_page_sql(
+    table_name: str,
+    compiled_filter: CompiledFilter,
+    sort_by: Optional[str],
+    order_direction: str,
+    cursor_key: Optional[Tuple[Any, int]],
+    offset: int,
+    limit: int,
+    with_total: bool,
+    restrict_ids: Optional[List[int]] = None,
+    rank_ids: Optional[List[int]] = None,
+    columns: Optional[List[str]] = None,
+) -> Tuple[List[str], List[Any], Optional[int]]:
+    """
+    从数据库查询一页产品
+    
+    Args:
+        columns: 查询的列，为空则查询全部列
+        restrict_ids: 只在这些产品中查询（全文检索命中的产品）
+        rank_ids: 按相关度排列的候选产品（游标之后的部分），按其顺序返回，代替排序字段和游标条件
+    
+    Returns:
+        (列名列表, 行列表, 总记录数（未计算时为None）)
+    """
+    where_clauses = [compiled_filter.sql] if compiled_filter.sql else []
+    params = dict(compiled_filter.params)
+    if restrict_ids is not None:
+        where_clauses.append("product_id = ANY(:restrict_ids)")
+        params['restrict_ids'] = list(restrict_ids)
+    
+    # 构建WHERE子句（不含游标条件，用于计数）
+    where_sql = ""
+    if where_clauses:
+        where_sql = "WHERE " + " AND ".join(where_clauses)
+    
+    # 游标条件
+    page_clauses = list(where_clauses)
+    page_params = dict(params)
+    if rank_ids is not None:
+        page_clauses.append("product_id = ANY(:rank_ids)")
+        page_params['rank_ids'] = list(rank_ids)
+    elif cursor_key is not None:
+        cursor_value, cursor_id = cursor_key
+        page_clauses.append(
+            _keyset_condition(sort_by, order_direction, cursor_value is None)
+        )
+        page_params['cursor_value'] = cursor_value
+        page_params['cursor_id'] = cursor_id
+    page_where_sql = ""
+    if page_clauses:
+        page_where_sql = "WHERE " + " AND ".join(page_clauses)
+    
+    # 构建排序子句，product_id作为唯一的次级排序键保证分页稳定
+    if rank_ids is not None:
+        order_sql = "ORDER BY array_position(CAST(:rank_ids AS INTEGER[]), product_id)"
+    elif sort_by:
+        order_sql = (
+            f"ORDER BY {sort_by} {order_direction} NULLS LAST, "
+            f"product_id {order_direction}"
+        )
+    else:
+        order_sql = "ORDER BY product_id ASC"
+    
+    with engine.connect() as conn:
+        # 计算总记录数
+        total_count = None
+        if with_total:
+            count_query = text(f"SELECT COUNT(*) FROM {table_name} {where_sql}")
+            total_count = conn.execute(count_query, params).scalar()
+        
+        select_sql = ", ".join(columns) if columns else "*"
+        query = text(f"""
+            SELECT {select_sql} FROM {table_name} 
+            {page_where_sql}
+            {order_sql}
+            LIMIT :limit OFFSET :offset
+        """)
+        
+        page_params['limit'] = limit
+        page_params['offset'] = offset
+        
+        result = conn.execute(query, page_params)
+        return list(result.keys()), result.fetchall(), total_count
+
+
+class ProductSearchPage:
+    """一页搜索结果（原始行，由调用方选择转换为字典或直接序列化为JSON）"""
+    
+    def __init__(
+        self,
+        schema: ProductTableSchema,
+        columns: List[str],
+        rows: List[Any],
+        total_pages: Optional[int],
+        next_cursor: Optional[str],
+        text_result: Optional[TextSearchResult] = None,
+        pages_estimated: bool = False,
+    ):
+        self.schema = schema
+        self.columns = columns
+        self.rows = rows
+        self.total_pages = total_pages
+        self.next_cursor = next_cursor
+        # 总页数是否为估算值（count_mode=estimated且没有精确总数时）
+        self.pages_estimated = pages_estimated
+        # 全文检索结果（带q参数时），用于返回相关度得分和高亮片段
+        self.text_result = text_result
+    
+    def highlights(self) -> Optional[List[Dict[str, Any]]]:
+        """本页产品的相关度得分和命中字段高亮，没有全文检索时为None"""
+        if self.text_result is None:
+            return None
+        id_idx = self.columns.index('product_id') if self.columns else 0
+        return [
+            {
+                "product_id": row[id_idx],
+                "score": self.text_result.score_of(row[id_idx]),
+                "fields": self.text_result.highlights_of(row[id_idx]),
+            }
+            for row in self.rows
+        ]
+
+
 class InsuranceProductCRUD:
     """保险产品数据访问对象"""
     
@@ -39,188 +280,343 @@ class InsuranceProductCRUD:
         Returns:
             字段列表，每个字段包含：name（字段名）、type（数据类型）、description（中文说明）
         """
-        # 构造表名
-        table_name = f"insurance_products_{product_type}"
+        if not is_product_type(product_type):
+            logger.warning(f"无效的产品类型: {product_type}")
+            return []
         
-        # 查询表字段及其注释
-        query = text("""
-            SELECT 
-                c.column_name,
-                c.data_type,
-                pgd.description
-            FROM information_schema.columns c
-            LEFT JOIN pg_catalog.pg_statio_all_tables st 
-                ON c.table_name = st.relname
-            LEFT JOIN pg_catalog.pg_description pgd 
-                ON pgd.objoid = st.relid 
-                AND pgd.objsubid = c.ordinal_position
-            WHERE c.table_name = :table_name
-            AND c.column_name != 'product_id'
-            ORDER BY c.ordinal_position
-        """)
+        schema = product_schema_registry.get(product_type)
         
-        try:
-            with engine.connect() as conn:
-                result = conn.execute(query, {"table_name": table_name})
-                fields = []
-                
-                for row in result:
-                    field_name, data_type, description = row
-                    fields.append({
-                        'name': field_name,
-                        'type': data_type,
-                        'description': description if description else field_name
-                    })
-                
-                if not fields:
-                    logger.warning(f"表 {table_name} 不存在或没有列")
-                    return []
-                    
-                return fields
-        except Exception as e:
-            logger.error(f"获取表字段失败: {e}")
+        if not schema.exists:
+            logger.warning(f"表 {schema.table_name} 不存在或没有列")
             return []
+        
+        return list(schema.fields)
     
     @staticmethod
-    def search_products(
+    def search_product_rows(
         db: Session, 
         product_type: str,
         page: int = 1,
         limit: int = 10,
-        sort_by: str = None,
+        sort_by: Optional[str] = None,
         sort_order: str = "desc",
-        **filters
-    ) -> Tuple[List[Dict[str, Any]], int]:
+        cursor: Optional[str] = None,
+        with_total: Optional[bool] = None,
+        q: Optional[str] = None,
+        fields: Optional[str] = None,
+        count_mode: Optional[str] = None,
+        **filters: Any
+    ) -> ProductSearchPage:
         """
-        搜索保险产品
+        搜索保险产品，返回原始行
+        
+        支持两种分页方式：
+        - 页码分页：按page计算OFFSET
+        - 游标分页：传入上一页返回的next_cursor，按(排序字段, product_id)定位，不使用OFFSET
+        
+        传入q时先在全文检索索引中检索全部文本字段，只返回命中的产品；
+        未指定排序字段时按相关度排序
+        
+        默认只返回列表卡片字段（查询条件都在卡片字段内时直接查询物化的卡片表），
+        可通过fields指定返回字段；完整数据由get_product_info返回
         
         Args:
             db: 数据库会话
             product_type: 产品类型
-            page: 页码
+            page: 页码（游标分页时忽略）
             limit: 每页数量
-            sort_by: 排序字段（为空则按默认顺序）
+            sort_by: 排序字段（为空则按product_id顺序）
             sort_order: 排序方向 (asc/desc)
+            cursor: 上一页返回的游标，为空则从第一页开始
+            with_total: 是否计算总页数，为空时页码分页计算、游标分页不计算（指定count_mode时忽略）
+            q: 全文检索词（空格分隔多个关键词，需同时命中）
+            fields: 逗号分隔的返回字段，为空则返回卡片字段；排序字段会自动包含在结果中
+            count_mode: 总数计算方式：exact（COUNT精确计数）、estimated（估算，见product_counts）、
+                none（不计算），为空时由with_total决定exact或none
             **filters: 过滤条件
             
         Returns:
-            包含产品列表（带中文字段）和总页数的元组
+            ProductSearchPage（总页数未计算时为None，没有更多数据时下一页游标为None）
+            
+        Raises:
+            ProductSearchError: 产品类型不存在，或过滤条件、排序字段、游标无效
         """
-        # 构造表名
-        table_name = f"insurance_products_{product_type}"
+        # 产品类型必须是有效的产品类型并对应已导入的产品表（表名会拼接到SQL中）
+        if not is_product_type(product_type):
+            raise ProductSearchError(f"无效的产品类型: {product_type}")
         
         # 获取字段及其中文说明
-        fields_info = InsuranceProductCRUD.get_product_fields(product_type)
-        field_desc_map = {f['name']: f['description'] for f in fields_info}
+        schema = product_schema_registry.get(product_type)
+        if not schema.exists:
+            raise ProductSearchError(f"无效的产品类型: {product_type}")
+        
+        # 排序字段必须是表中的列
+        if sort_by and sort_by.strip():
+            sort_by = sort_by.strip()
+            if sort_by not in schema.types:
+                raise ProductSearchError(f"无效的排序字段: {sort_by}")
+        else:
+            sort_by = None
+        order_direction = "ASC" if sort_order.lower() == "asc" else "DESC"
+        
+        if count_mode is None:
+            if with_total is None:
+                with_total = cursor is None
+            count_mode = "exact" if with_total else "none"
+        elif count_mode not in COUNT_MODES:
+            raise ProductSearchError(f"无效的count_mode: {count_mode}，可选值为 {', '.join(COUNT_MODES)}")
+        with_total = count_mode != "none"
+        
+        # 按列类型编译过滤条件（在访问数据库之前校验字段与运算符）
+        compiled_filter = compile_filters(schema, filters)
+        
+        # 返回字段（游标需要排序字段的值）
+        columns = with_sort_column(resolve_projection(schema, fields), sort_by)
+        
+        # 全文检索：限定在命中的产品中，未指定排序字段时按相关度排序
+        text_result = None
+        restrict_ids = rank_ids = None
+        relevance = False
+        if q is not None and q.strip():
+            text_result = product_text_index.search(product_type, q)
+            restrict_ids = text_result.ids
+            relevance = sort_by is None
+            if not restrict_ids:
+                return ProductSearchPage(schema, [], [], 1 if with_total else None, None, text_result)
+        
+        # 游标：从上一页最后一条记录之后继续，不使用OFFSET
+        cursor_key = None
+        if text_result is not None and relevance:
+            rank_ids = restrict_ids
+            if cursor:
+                score, cursor_id = _decode_cursor(cursor, RELEVANCE_SORT, "DESC")
+                rank_ids = text_result.ids_after(float(score), cursor_id)
+        elif cursor:
+            cursor_key = _decode_cursor(cursor, sort_by, order_direction)
+        offset = 0 if cursor else (page - 1) * limit
         
         try:
-            # 构建基础查询
-            where_clauses = []
-            params = {}
+            catalog_table = None
+            if settings.PRODUCT_SEARCH_ENGINE == "memory":
+                catalog_table = product_catalog_engine.get(product_type)
             
-            # 应用筛选条件
-            for field, value in filters.items():
-                if value is None or value == '':
-                    continue
-                
-                # 处理范围筛选（字典形式）
-                if isinstance(value, dict) and ("min" in value or "max" in value):
-                    if "min" in value and value["min"] not in (None, ''):
-                        where_clauses.append(f"{field} >= :min_{field}")
-                        params[f"min_{field}"] = value["min"]
-                    if "max" in value and value["max"] not in (None, ''):
-                        where_clauses.append(f"{field} <= :max_{field}")
-                        params[f"max_{field}"] = value["max"]
-                
-                # BOOLEAN类型筛选
-                elif isinstance(value, bool):
-                    where_clauses.append(f"{field} = :{field}")
-                    params[field] = value
-                
-                # 数值类型筛选（支持大于、小于等符号）
-                elif isinstance(value, str) and value:
-                    # 检查是否包含比较符号
-                    if value.startswith('>='):
-                        where_clauses.append(f"CAST({field} AS NUMERIC) >= :{field}")
-                        params[field] = float(value[2:].strip())
-                    elif value.startswith('<='):
-                        where_clauses.append(f"CAST({field} AS NUMERIC) <= :{field}")
-                        params[field] = float(value[2:].strip())
-                    elif value.startswith('>'):
-                        where_clauses.append(f"CAST({field} AS NUMERIC) > :{field}")
-                        params[field] = float(value[1:].strip())
-                    elif value.startswith('<'):
-                        where_clauses.append(f"CAST({field} AS NUMERIC) < :{field}")
-                        params[field] = float(value[1:].strip())
-                    elif value.startswith('='):
-                        where_clauses.append(f"CAST({field} AS NUMERIC) = :{field}")
-                        params[field] = float(value[1:].strip())
-                    else:
-                        # 文本模糊搜索
-                        where_clauses.append(f"{field}::text ILIKE :{field}")
-                        params[field] = f"%{value}%"
+            # 多取一条用于判断是否还有下一页
+            pages_estimated = False
+            if catalog_table is not None:
+                # 内存列式引擎，不访问数据库（计数只是掩码求和，估算模式也精确计数）
+                all_columns, rows, total_count = catalog_table.search(
+                    compiled_filter, sort_by, order_direction, cursor_key,
+                    offset, limit + 1, with_total, restrict_ids, rank_ids
+                )
+                rows = project_rows(all_columns, rows, columns)
+            else:
+                # 全文检索限定了产品ID时按主键计数，代价很小，估算模式也精确计数
+                count_in_query = count_mode == "exact" or (count_mode == "estimated" and restrict_ids is not None)
+                source_table = select_source_table(schema, columns, compiled_filter.fields, sort_by)
+                columns, rows, total_count = _fetch_page_sql(
+                    source_table, compiled_filter, sort_by, order_direction, cursor_key,
+                    offset, limit + 1, count_in_query, restrict_ids, rank_ids, columns
+                )
+                if count_mode == "estimated" and not count_in_query:
+                    total_count, exact = product_count_estimator.estimate(schema, source_table, compiled_filter)
+                    pages_estimated = not exact
+                elif count_in_query and restrict_ids is None and total_count is not None:
+                    # 精确总数同时用于后续估算请求
+                    product_count_estimator.record_exact(schema, compiled_filter, total_count)
+            
+            total_pages = None
+            if with_total:
+                total_pages = (total_count + limit - 1) // limit if total_count > 0 else 1
+            
+            # 生成下一页游标
+            next_cursor = None
+            if len(rows) > limit:
+                rows = rows[:limit]
+                last_row = rows[-1]
+                last_id = last_row[columns.index('product_id')]
+                if text_result is not None and relevance:
+                    next_cursor = _encode_cursor(
+                        RELEVANCE_SORT, "DESC", text_result.score_of(last_id), last_id
+                    )
+                else:
+                    next_cursor = _encode_cursor(
+                        sort_by,
+                        order_direction,
+                        last_row[columns.index(sort_by)] if sort_by else None,
+                        last_id,
+                    )
+            
+            return ProductSearchPage(
+                schema, columns, rows, total_pages, next_cursor, text_result, pages_estimated
+            )
                 
-                # 数值类型精确匹配
-                elif isinstance(value, (int, float)):
-                    where_clauses.append(f"CAST({field} AS NUMERIC) = :{field}")
-                    params[field] = value
+        except ProductSearchError:
+            raise
+        except Exception as e:
+            logger.error(f"搜索产品失败: {e}")
+            return ProductSearchPage(schema, [], [], 1 if with_total else None, None, text_result)
+    
+    @staticmethod
+    def search_products(
+        db: Session, 
+        product_type: str,
+        page: int = 1,
+        limit: int = 10,
+        sort_by: Optional[str] = None,
+        sort_order: str = "desc",
+        cursor: Optional[str] = None,
+        with_total: Optional[bool] = None,
+        fields: Optional[str] = None,
+        **filters: Any
+    ) -> Tuple[List[Dict[str, Any]], Optional[int], Optional[str]]:
+        """
+        搜索保险产品（参数同search_product_rows）
+        
+        Returns:
+            包含产品列表（带中文字段）、总页数（未计算时为None）和下一页游标（没有更多数据时为None）的元组
+            
+        Raises:
+            ProductSearchError: 过滤条件、排序字段或游标无效
+        """
+        result = InsuranceProductCRUD.search_product_rows(
+            db, product_type, page, limit, sort_by, sort_order, cursor, with_total,
+            fields=fields, **filters
+        )
+        
+        # 转换为字典列表（使用中文字段名）
+        serializer = get_row_serializer(result.schema, result.columns)
+        products = [serializer.to_dict(row) for row in result.rows]
+        
+        return products, result.total_pages, result.next_cursor
+    
+    @staticmethod
+    def search_all_products(
+        db: Session,
+        product_name: Optional[str] = None,
+        insurer: Optional[str] = None,
+        entry_age_min: Optional[float] = None,
+        entry_age_max: Optional[float] = None,
+        page: int = 1,
+        limit: int = 10,
+    ) -> Tuple[List[Dict[str, Any]], int]:
+        """
+        跨所有产品类型搜索产品（单条 UNION ALL 查询）
+        
+        Args:
+            db: 数据库会话
+            product_name: 产品名称（模糊匹配）
+            insurer: 保险公司（模糊匹配）
+            entry_age_min: 投保人年龄下限，要求产品最低投保年龄不高于该值
+            entry_age_max: 投保人年龄上限，要求产品最高投保年龄不低于该值
+            page: 页码
+            limit: 每页数量
+            
+        Returns:
+            包含产品列表（通用字段 + product_type）和总页数的元组；
+            排序：名称完全匹配 > 前缀匹配 > 包含匹配，同级按产品类型和product_id
+        """
+        params: Dict[str, Any] = {}
+        if product_name:
+            params['name'] = product_name
+            params['name_prefix'] = f"{escape_like(product_name)}%"
+            params['name_like'] = f"%{escape_like(product_name)}%"
+        if insurer:
+            params['insurer_like'] = f"%{escape_like(insurer)}%"
+        if entry_age_min is not None:
+            params['age_min'] = entry_age_min
+        if entry_age_max is not None:
+            params['age_max'] = entry_age_max
+        
+        subqueries = []
+        for type_order, product_type in enumerate(PRODUCT_TYPE_MAPPING.values()):
+            schema = product_schema_registry.get(product_type)
+            if not schema.exists:
+                continue
+            columns = resolve_common_columns(schema)
+            name_col, insurer_col = columns['product_name'], columns['insurer']
+            age_min_col, age_max_col = columns['entry_age_min'], columns['entry_age_max']
             
-            # 构建WHERE子句
-            where_sql = ""
-            if where_clauses:
-                where_sql = "WHERE " + " AND ".join(where_clauses)
+            # 缺少筛选所需列的表不参与搜索
+            if (product_name and not name_col) or (insurer and not insurer_col):
+                continue
             
-            # 计算总记录数
-            count_query = text(f"SELECT COUNT(*) FROM {table_name} {where_sql}")
+            where_clauses = []
+            rank_sql = "0"
+            if product_name:
+                where_clauses.append(f"{name_col} ILIKE :name_like")
+                rank_sql = (
+                    f"CASE WHEN {name_col} = :name THEN 0 "
+                    f"WHEN {name_col} LIKE :name_prefix THEN 1 ELSE 2 END"
+                )
+            if insurer:
+                where_clauses.append(f"{insurer_col} ILIKE :insurer_like")
+            # 年龄限制为空视为不限
+            if entry_age_min is not None and age_min_col:
+                where_clauses.append(f"({age_min_col} IS NULL OR {age_min_col} <= :age_min)")
+            if entry_age_max is not None and age_max_col:
+                where_clauses.append(f"({age_max_col} IS NULL OR {age_max_col} >= :age_max)")
+            where_sql = "WHERE " + " AND ".join(where_clauses) if where_clauses else ""
             
+            params[f"type_{type_order}"] = product_type
+            subqueries.append(f"""
+                SELECT
+                    CAST(:type_{type_order} AS TEXT) AS product_type,
+                    {type_order} AS type_order,
+                    product_id,
+                    CAST({name_col or 'NULL'} AS TEXT) AS product_name,
+                    CAST({insurer_col or 'NULL'} AS TEXT) AS insurer,
+                    CAST({age_min_col or 'NULL'} AS NUMERIC) AS entry_age_min,
+                    CAST({age_max_col or 'NULL'} AS NUMERIC) AS entry_age_max,
+                    {rank_sql} AS rank
+                FROM {schema.table_name}
+                {where_sql}
+            """)
+        
+        if not subqueries:
+            return [], 1
+        
+        union_sql = " UNION ALL ".join(subqueries)
+        type_names = {v: k for k, v in PRODUCT_TYPE_MAPPING.items()}
+        
+        try:
             with engine.connect() as conn:
-                total_count = conn.execute(count_query, params).scalar()
+                total_count = conn.execute(
+                    text(f"SELECT COUNT(*) FROM ({union_sql}) AS products"), params
+                ).scalar()
                 total_pages = (total_count + limit - 1) // limit if total_count > 0 else 1
                 
-                # 构建排序子句
-                order_sql = ""
-                if sort_by and sort_by.strip():
-                    order_direction = "ASC" if sort_order.lower() == "asc" else "DESC"
-                    order_sql = f"ORDER BY {sort_by} {order_direction}"
-                
-                # 构建查询语句
-                offset = (page - 1) * limit
                 query = text(f"""
-                    SELECT * FROM {table_name} 
-                    {where_sql}
-                    {order_sql}
+                    SELECT * FROM ({union_sql}) AS products
+                    ORDER BY rank, type_order, product_id
                     LIMIT :limit OFFSET :offset
                 """)
+                result = conn.execute(
+                    query, {**params, 'limit': limit, 'offset': (page - 1) * limit}
+                )
                 
-                params['limit'] = limit
-                params['offset'] = offset
-                
-                result = conn.execute(query, params)
-                
-                # 转换为字典列表（使用中文字段名）
                 products = []
-                for row in result:
-                    product_dict = {}
-                    for idx, column in enumerate(result.keys()):
-                        chinese_name = field_desc_map.get(column, column)
-                        product_dict[chinese_name] = row[idx]
-                        
-                        # 同时保留product_id的英文版本（作为唯一标识）
-                        if column == 'product_id':
-                            product_dict['product_id'] = row[idx]
-                    
-                    products.append(product_dict)
+                for row in result.mappings():
+                    products.append({
+                        'product_type': row['product_type'],
+                        'product_type_name': type_names.get(row['product_type']),
+                        'product_id': row['product_id'],
+                        'product_name': row['product_name'],
+                        'insurer': row['insurer'],
+                        'entry_age_min': row['entry_age_min'],
+                        'entry_age_max': row['entry_age_max'],
+                    })
                 
                 return products, total_pages
-                
         except Exception as e:
-            logger.error(f"搜索产品失败: {e}")
+            logger.error(f"跨类型搜索产品失败: {e}")
             return [], 1
     
     @staticmethod
-    def get_product_info(db: Session, product_id: int, product_type: str) -> Optional[Dict[str, Any]]:
+    def get_product_info_row(
+        db: Session, product_id: int, product_type: str
+    ) -> Optional[Tuple[ProductTableSchema, List[str], Any]]:
         """
-        获取产品详细信息（使用中文字段名）
+        获取产品详细信息的原始行
         
         Args:
             db: 数据库会话
@@ -228,55 +624,168 @@ class InsuranceProductCRUD:
             product_type: 产品类型
             
         Returns:
-            产品详细信息字典（中文字段名），未找到则返回None
+            (表结构, 列名列表, 行)，未找到则返回None
         """
         # 构造表名
         table_name = f"insurance_products_{product_type}"
         
-        # 获取字段及其中文说明
-        fields_info = InsuranceProductCRUD.get_product_fields(product_type)
-        field_desc_map = {f['name']: f['description'] for f in fields_info}
+        if not is_product_type(product_type):
+            logger.warning(f"无效的产品类型: {product_type}")
+            return None
+        
+        # 表不存在时注册表返回空结构
+        schema = product_schema_registry.get(product_type)
+        table = product_model_registry.table(product_type)
+        if not schema.exists or table is None:
+            logger.error(f"表 {table_name} 不存在")
+            return None
         
         try:
-            # 检查表是否存在
-            check_table = text(f"""
-                SELECT EXISTS (
-                    SELECT FROM information_schema.tables 
-                    WHERE table_name = :table_name
-                )
-            """)
-            
             with engine.connect() as conn:
-                result = conn.execute(check_table, {"table_name": table_name})
-                if not result.scalar():
-                    logger.error(f"表 {table_name} 不存在")
-                    return None
-                
                 # 表存在，查询产品
-                query = text(f"""
-                    SELECT * FROM {table_name} WHERE product_id = :product_id
-                """)
-                
-                result = conn.execute(query, {"product_id": product_id})
+                result = conn.execute(select(table).where(table.c.product_id == product_id))
                 row = result.fetchone()
                 
                 if not row:
                     return None
-                    
-                # 转换为字典（使用中文字段名）
-                result_dict = {}
-                for idx, column in enumerate(result.keys()):
-                    chinese_name = field_desc_map.get(column, column)
-                    result_dict[chinese_name] = row[idx]
-                    
-                    # 同时保留product_id的英文版本（作为唯一标识）
-                    if column == 'product_id':
-                        result_dict['product_id'] = row[idx]
-                
-                # 添加产品类型，方便前端使用
-                result_dict["product_type"] = product_type
                 
-                return result_dict
+                return schema, list(result.keys()), row
         except Exception as e:
             logger.error(f"查询表 {table_name} 失败: {e}")
-            return None
\ No newline at end of file
+            return None
+    
+    @staticmethod
+    def get_product_info(db: Session, product_id: int, product_type: str) -> Optional[Dict[str, Any]]:
+        """
+        获取产品详细信息（使用中文字段名）
+        
+        Args:
+            db: 数据库会话
+            product_id: 产品ID
+            product_type: 产品类型
+            
+        Returns:
+            产品详细信息字典（中文字段名），未找到则返回None
+        """
+        found = InsuranceProductCRUD.get_product_info_row(db, product_id, product_type)
+        if found is None:
+            return None
+        schema, columns, row = found
+        
+        # 转换为字典（使用中文字段名）
+        result_dict = get_row_serializer(schema, columns).to_dict(row)
+        
+        # 添加产品类型，方便前端使用
+        result_dict["product_type"] = product_type
+        
+        return result_dict
+    
+    @staticmethod
+    def get_products_info(
+        db: Session, items: List[Tuple[int, str]]
+    ) -> Tuple[List[Dict[str, Any]], List[Tuple[int, str]]]:
+        """
+        批量获取产品详细信息（使用中文字段名）
+        
+        按产品类型分组，每个产品表只执行一次 product_id IN (...) 查询
+        
+        Args:
+            db: 数据库会话
+            items: (产品ID, 产品类型) 列表
+            
+        Returns:
+            (按请求顺序排列的产品列表, 未找到的(产品ID, 产品类型)列表)
+        """
+        # 按产品类型分组
+        ids_by_type: Dict[str, List[int]] = {}
+        for product_id, product_type in items:
+            ids_by_type.setdefault(product_type, []).append(product_id)
+        
+        found: Dict[Tuple[int, str], Dict[str, Any]] = {}
+        for product_type, product_ids in ids_by_type.items():
+            if not is_product_type(product_type):
+                logger.warning(f"无效的产品类型: {product_type}")
+                continue
+            schema = product_schema_registry.get(product_type)
+            table = product_model_registry.table(product_type)
+            if not schema.exists or table is None:
+                logger.warning(f"表 {schema.table_name} 不存在")
+                continue
+            
+            # 单个产品表查询失败时只有该类型的产品计入未找到
+            try:
+                with engine.connect() as conn:
+                    result = conn.execute(
+                        select(table).where(table.c.product_id.in_(set(product_ids)))
+                    )
+                    serializer = get_row_serializer(schema, list(result.keys()))
+                    products_of_type = []
+                    for row in result:
+                        product = serializer.to_dict(row)
+                        product["product_type"] = product_type
+                        products_of_type.append(product)
+            except Exception as e:
+                logger.error(f"批量查询产品失败: {product_type}, {e}")
+                continue
+            for product in products_of_type:
+                found[(product["product_id"], product_type)] = product
+        
+        products = []
+        missing = []
+        for key in items:
+            if key in found:
+                products.append(found[key])
+            else:
+                missing.append(key)
+        
+        return products, missing
+    
+    @staticmethod
+    def compare_products(
+        db: Session,
+        product_type: str,
+        product_ids: List[int],
+        only_diff: bool = False,
+    ) -> Optional[Dict[str, Any]]:
+        """
+        对比同一类型的多个产品（一次查询取出全部产品）
+        
+        Args:
+            db: 数据库会话
+            product_type: 产品类型
+            product_ids: 按对比顺序排列的产品ID（已去重）
+            only_diff: 只返回取值不同的字段
+            
+        Returns:
+            对比结果：products（对比矩阵每列对应的产品）、fields（按字段对齐的矩阵）、missing（未找到的产品ID）；
+            产品类型无效、表不存在或查询失败时返回None
+        """
+        if not is_product_type(product_type):
+            logger.warning(f"无效的产品类型: {product_type}")
+            return None
+        
+        schema = product_schema_registry.get(product_type)
+        table = product_model_registry.table(product_type)
+        if not schema.exists or table is None:
+            logger.warning(f"表 {schema.table_name} 不存在")
+            return None
+        
+        try:
+            with engine.connect() as conn:
+                result = conn.execute(select(table).where(table.c.product_id.in_(product_ids)))
+                columns = list(result.keys())
+                fetched = result.fetchall()
+        except Exception as e:
+            logger.error(f"查询对比产品失败: {schema.table_name}, {e}")
+            return None
+        
+        rows, missing = order_rows(columns, fetched, product_ids)
+        common_columns = resolve_common_columns(schema)
+        fields = build_comparison(schema, columns, rows, only_diff=only_diff)
+        
+        return {
+            "products": [product_summary(columns, row, common_columns) for row in rows],
+            "fields": fields,
+            "differing_fields": sum(1 for field in fields if field["differs"]),
+            "missing": missing,
+        }
@@ -4,14 +4,82 @@
 import logging
 from typing import Optional, Dict, Any, List
 from sqlalchemy.orm import Session
-from sqlalchemy import or_, and_
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy import ColumnElement, or_, and_, select
+from sqlalchemy.engine import Result
 
 from app.models.social_pension_insurance import SocialPensionInsurance
 
 logger = logging.getLogger(__name__)
 
 
-class SocialPensionInsuranceCRUD:
+def _province_condition(province: str) -> ColumnElement[bool]:
+    """省市模糊匹配条件（同步和异步查询共用）"""
+    return or_(
+        SocialPensionInsurance.province_code == province,
+        SocialPensionInsurance.province_code.ilike(f"%{province}%"),
+        SocialPensionInsurance.province_code.ilike(f"{province}%"),
+        SocialPensionInsurance.province_code.ilike(f"%{province}")
+    )
+
+
+class SocialPensionInsuranceRecordMixin:
+    """社会养老保险记录的转换（同步和异步CRUD共用）"""
+    
+    def _record_to_dict(self, record: SocialPensionInsurance) -> Dict[str, Any]:
+        """
+        将数据库记录转换为字典（使用中文字段名）
+        
+        Args:
+            record: 数据库记录
+            
+        Returns:
+            Dict: 数据字典
+        """
+        # 字段映射：英文字段名 -> 中文字段名
+        field_mapping = {
+            "province_code": "省市",
+            "data_year": "数据年份",
+            "avg_monthly_salary_basis": "核定缴费基数的全省月平均工资",
+            "contribution_base_min": "城镇职工缴费基数下限",
+            "contribution_base_max": "城镇职工缴费基数上限",
+            "employer_ratio": "城镇职工单位缴费比例",
+            "employee_ratio": "城镇职工个人缴费比例",
+            "flexible_worker_ratio": "灵活就业人员缴费比例",
+            "contribution_base_min_city": "城乡居民最低缴费金额",
+            "contribution_base_max_city": "城乡居民最高缴费金额",
+            "retirement_age_male": "男性退休年龄",
+            "retirement_age_female": "女性退休年龄",
+            "retirement_age_female_worker": "女工人退休年龄",
+            "min_contribution_years": "最低累计缴费年限",
+            "contribution_tiers": "缴费档次",
+            "government_subsidies": "政府补贴标准",
+            "retirement_age": "待遇领取年龄",
+            "base_pension_standard": "基础养老金标准",
+            "long_term_incentive": "长缴多得激励政策",
+            "more_pay_more_incentive": "多缴多得激励政策",
+            "transfer_process": "转移接续流程",
+            "transfer_timeframe": "转移办理时限",
+            "pension_qualification_rule": "养老金领取地确定规则",
+            "fund_transfer_rule": "资金划转规则",
+            "remote_certification": "异地资格认证方式",
+            "certification_frequency": "资格认证周期",
+            "remote_payment_method": "异地发放方式",
+            "special_notes": "特别说明"
+        }
+        
+        result = {}
+        for english_field, chinese_field in field_mapping.items():
+            value = getattr(record, english_field, None)
+            # 处理Decimal类型，转换为float
+            if value is not None and hasattr(value, '__float__'):
+                value = float(value)
+            result[chinese_field] = value
+        
+        return result
+
+
+class SocialPensionInsuranceCRUD(SocialPensionInsuranceRecordMixin):
     """社会养老保险数据CRUD操作类"""
     
     def __init__(self, db: Session):
@@ -35,14 +103,7 @@ class SocialPensionInsuranceCRUD:
         """
         try:
             # 使用模糊匹配查找省市
-            record = self.db.query(SocialPensionInsurance).filter(
-                or_(
-                    SocialPensionInsurance.province_code == province,
-                    SocialPensionInsurance.province_code.ilike(f"%{province}%"),
-                    SocialPensionInsurance.province_code.ilike(f"{province}%"),
-                    SocialPensionInsurance.province_code.ilike(f"%{province}")
-                )
-            ).first()
+            record = self.db.query(SocialPensionInsurance).filter(_province_condition(province)).first()
             
             return record
         except Exception as e:
@@ -74,58 +135,6 @@ class SocialPensionInsuranceCRUD:
             logger.error(f"获取数据失败: {e}")
             return None
     
-    def _record_to_dict(self, record: SocialPensionInsurance) -> Dict[str, Any]:
-        """
-        将数据库记录转换为字典（使用中文字段名）
-        
-        Args:
-            record: 数据库记录
-            
-        Returns:
-            Dict: 数据字典
-        """
-        # 字段映射：英文字段名 -> 中文字段名
-        field_mapping = {
-            "province_code": "省市",
-            "data_year": "数据年份",
-            "avg_monthly_salary_basis": "核定缴费基数的全省月平均工资",
-            "contribution_base_min": "城镇职工缴费基数下限",
-            "contribution_base_max": "城镇职工缴费基数上限",
-            "employer_ratio": "城镇职工单位缴费比例",
-            "employee_ratio": "城镇职工个人缴费比例",
-            "flexible_worker_ratio": "灵活就业人员缴费比例",
-            "contribution_base_min_city": "城乡居民最低缴费金额",
-            "contribution_base_max_city": "城乡居民最高缴费金额",
-            "retirement_age_male": "男性退休年龄",
-            "retirement_age_female": "女性退休年龄",
-            "retirement_age_female_worker": "女工人退休年龄",
-            "min_contribution_years": "最低累计缴费年限",
-            "contribution_tiers": "缴费档次",
-            "government_subsidies": "政府补贴标准",
-            "retirement_age": "待遇领取年龄",
-            "base_pension_standard": "基础养老金标准",
-            "long_term_incentive": "长缴多得激励政策",
-            "more_pay_more_incentive": "多缴多得激励政策",
-            "transfer_process": "转移接续流程",
-            "transfer_timeframe": "转移办理时限",
-            "pension_qualification_rule": "养老金领取地确定规则",
-            "fund_transfer_rule": "资金划转规则",
-            "remote_certification": "异地资格认证方式",
-            "certification_frequency": "资格认证周期",
-            "remote_payment_method": "异地发放方式",
-            "special_notes": "特别说明"
-        }
-        
-        result = {}
-        for english_field, chinese_field in field_mapping.items():
-            value = getattr(record, english_field, None)
-            # 处理Decimal类型，转换为float
-            if value is not None and hasattr(value, '__float__'):
-                value = float(value)
-            result[chinese_field] = value
-        
-        return result
-    
     def get_all_provinces(self) -> List[str]:
         """
         获取所有省市列表
@@ -141,6 +150,53 @@ class SocialPensionInsuranceCRUD:
             return []
 
 
+class AsyncSocialPensionInsuranceCRUD(SocialPensionInsuranceRecordMixin):
+    """社会养老保险数据CRUD操作类（异步会话，供async def路由使用）"""
+    
+    def __init__(self, db: AsyncSession):
+        """
+        初始化CRUD操作类
+        
+        Args:
+            db: 异步数据库会话
+        """
+        self.db = db
+    
+    async def get_by_province(self, province: str) -> Optional[SocialPensionInsurance]:
+        """根据省市查询社会养老保险数据（参数和返回值同同步版本）"""
+        try:
+            result = await self.db.execute(
+                select(SocialPensionInsurance).where(_province_condition(province)).limit(1)
+            )
+            return result.scalars().first()
+        except Exception as e:
+            logger.error(f"查询省市 {province} 的社会养老保险数据失败: {e}")
+            return None
+    
+    async def get_data_as_dict(self, province: str) -> Optional[Dict[str, Any]]:
+        """根据省市获取社会养老保险数据（参数和返回值同同步版本）"""
+        try:
+            record = await self.get_by_province(province)
+            if not record:
+                logger.warning(f"未找到省市 {province} 的社会养老保险数据")
+                return None
+            
+            return self._record_to_dict(record)
+            
+        except Exception as e:
+            logger.error(f"获取数据失败: {e}")
+            return None
+    
+    async def get_all_provinces(self) -> List[str]:
+        """获取所有省市列表"""
+        try:
+            result: Result[Any] = await self.db.execute(select(SocialPensionInsurance.province_code).distinct())
+            return [province for province in result.scalars() if province]
+        except Exception as e:
+            logger.error(f"获取省市列表失败: {e}")
+            return []
+
+
 def get_social_pension_insurance_crud(db: Session) -> SocialPensionInsuranceCRUD:
     """
     获取社会养老保险CRUD操作实例
@@ -153,3 +209,15 @@ def get_social_pension_insurance_crud(db: Session) -> SocialPensionInsuranceCRUD
     """
     return SocialPensionInsuranceCRUD(db)
 
+
+def get_async_social_pension_insurance_crud(db: AsyncSession) -> AsyncSocialPensionInsuranceCRUD:
+    """
+    获取社会养老保险CRUD操作实例（异步）
+    
+    Args:
+        db: 异步数据库会话
+        
+    Returns:
+        AsyncSocialPensionInsuranceCRUD: CRUD操作实例
+    """
+    return AsyncSocialPensionInsuranceCRUD(db)
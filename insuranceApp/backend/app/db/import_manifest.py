@@ -0,0 +1,135 @@
+"""
+数据导入清单
+
+应用每次启动都会执行init_db。导入清单表记录每个目标表最近一次成功导入时源文件的内容哈希，
+启动时只重建源文件发生变化（或表已不存在）的表，数据未变时跳过导入，重启和滚动发布不再重复全量导入，
+也不会出现短暂的空目录。
+
+IMPORT_FORMAT_VERSION 表示导入逻辑的版本：导入器的建表或转换规则变化时递增，
+使所有表在下次启动时按新逻辑重建。
+"""
+import hashlib
+import logging
+from pathlib import Path
+from typing import Any, Dict, Optional, Union
+
+from sqlalchemy import inspect, text
+
+from app.db.base import engine
+
+logger = logging.getLogger(__name__)
+
+IMPORT_MANIFEST_TABLE = "import_manifest"
+
+# 导入逻辑版本，导入器的建表/转换规则变化时递增
+IMPORT_FORMAT_VERSION = 2
+
+# 计算文件哈希时每次读取的字节数
+HASH_CHUNK_BYTES = 1024 * 1024
+
+
+def file_content_hash(path: Union[str, Path]) -> str:
+    """计算源文件内容的SHA-256哈希"""
+    digest = hashlib.sha256()
+    with open(path, "rb") as f:
+        for chunk in iter(lambda: f.read(HASH_CHUNK_BYTES), b""):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+class ImportManifest:
+    """数据导入清单（每个目标表一条记录）"""
+
+    def ensure_table(self) -> None:
+        """创建导入清单表（如果不存在）"""
+        with engine.begin() as conn:
+            conn.execute(text(f"""
+                CREATE TABLE IF NOT EXISTS {IMPORT_MANIFEST_TABLE} (
+                    target_table VARCHAR(255) PRIMARY KEY,
+                    source_file VARCHAR(255) NOT NULL,
+                    content_hash VARCHAR(64) NOT NULL,
+                    format_version INTEGER NOT NULL,
+                    record_count INTEGER,
+                    imported_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+                )
+            """))
+
+    def get(self, target_table: str) -> Optional[Dict[str, Any]]:
+        """获取目标表的导入记录，没有记录时返回None"""
+        with engine.connect() as conn:
+            row = conn.execute(
+                text(f"SELECT * FROM {IMPORT_MANIFEST_TABLE} WHERE target_table = :target_table"),
+                {"target_table": target_table}
+            ).mappings().first()
+        return dict(row) if row else None
+
+    def is_current(self, target_table: str, content_hash: str) -> bool:
+        """
+        目标表是否已是源文件当前内容的导入结果
+
+        Args:
+            target_table: 目标表名
+            content_hash: 源文件当前的内容哈希
+
+        Returns:
+            清单记录的哈希和导入逻辑版本都一致，且目标表存在时返回True
+        """
+        try:
+            entry = self.get(target_table)
+        except Exception as e:
+            logger.warning(f"读取导入清单失败: {target_table}, {e}")
+            return False
+
+        if (
+            entry is None
+            or entry["content_hash"] != content_hash
+            or entry["format_version"] != IMPORT_FORMAT_VERSION
+        ):
+            return False
+        return inspect(engine).has_table(target_table)
+
+    def record(
+        self, target_table: str, source_file: str, content_hash: str, record_count: Optional[int] = None
+    ) -> None:
+        """目标表导入成功后记录源文件哈希"""
+        with engine.begin() as conn:
+            conn.execute(text(f"""
+                INSERT INTO {IMPORT_MANIFEST_TABLE}
+                    (target_table, source_file, content_hash, format_version, record_count, imported_at)
+                VALUES (:target_table, :source_file, :content_hash, :format_version, :record_count, CURRENT_TIMESTAMP)
+                ON CONFLICT (target_table) DO UPDATE SET
+                    source_file = EXCLUDED.source_file,
+                    content_hash = EXCLUDED.content_hash,
+                    format_version = EXCLUDED.format_version,
+                    record_count = EXCLUDED.record_count,
+                    imported_at = EXCLUDED.imported_at
+            """), {
+                "target_table": target_table,
+                "source_file": source_file,
+                "content_hash": content_hash,
+                "format_version": IMPORT_FORMAT_VERSION,
+                "record_count": record_count,
+            })
+        logger.info(f"已记录导入清单: {target_table} <- {source_file} ({content_hash[:12]})")
+
+    def forget(self, target_table: Optional[str] = None) -> None:
+        """
+        删除导入记录，下次启动时重建
+
+        重建目标表之前先删除记录：导入中途失败时表可能不完整，不能再按旧哈希跳过。
+
+        Args:
+            target_table: 目标表名，为None时删除全部记录
+        """
+        with engine.begin() as conn:
+            if target_table is None:
+                conn.execute(text(f"DELETE FROM {IMPORT_MANIFEST_TABLE}"))
+            else:
+                conn.execute(
+                    text(f"DELETE FROM {IMPORT_MANIFEST_TABLE} WHERE target_table = :target_table"),
+                    {"target_table": target_table}
+                )
+
+
+# 全局导入清单实例
+import_manifest = ImportManifest()
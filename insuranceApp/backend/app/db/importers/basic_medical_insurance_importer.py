@@ -1,13 +1,13 @@
 """
 基本医保数据导入器
 """
-import pandas as pd
 import logging
 from pathlib import Path
 from typing import Dict, List, Optional, Any
 from sqlalchemy.orm import Session
 from sqlalchemy.exc import SQLAlchemyError
 
+from app.db.importers.workbook_reader import ParsedWorkbook, read_workbook
 from app.models.basic_medical_insurance import BasicMedicalInsurance
 
 logger = logging.getLogger(__name__)
@@ -16,6 +16,9 @@ logger = logging.getLogger(__name__)
 class BasicMedicalInsuranceImporter:
     """基本医保数据导入器"""
     
+    # 字段名所在列号（B列），数据从D列开始
+    KEY_COLUMN = 2
+    
     def __init__(self, db_session: Session):
         """
         初始化导入器
@@ -24,6 +27,8 @@ class BasicMedicalInsuranceImporter:
             db_session: 数据库会话
         """
         self.db = db_session
+        self.workbook_stats: Dict[str, Any] = {}
+        self.imported_count = 0
         
         # 字段映射：中文字段名 -> 英文字段名
         self.field_mapping = {
@@ -110,47 +115,48 @@ class BasicMedicalInsuranceImporter:
             bool: 导入是否成功
         """
         try:
-            # 读取Excel文件
-            df = pd.read_excel(excel_path, header=None)
-            logger.info(f"成功读取Excel文件: {excel_path}, 数据形状: {df.shape}")
+            workbook = read_workbook(excel_path, key_column=self.KEY_COLUMN)
+        except Exception as e:
+            logger.error(f"读取Excel文件失败: {excel_path}, {e}")
+            return False
+        return self.import_workbook(workbook)
+    
+    def import_workbook(self, workbook: ParsedWorkbook) -> bool:
+        """
+        从已解析的Excel文件导入基本医保数据
+        
+        Args:
+            workbook: read_workbook解析的Excel文件
             
-            # 获取字段名（B列，索引1）
-            field_names = df.iloc[:, 1].dropna().tolist()
+        Returns:
+            bool: 导入是否成功
+        """
+        try:
+            self.workbook_stats = workbook.stats
+            logger.info(f"成功读取Excel文件: {workbook.path}, {self.workbook_stats}")
+            
+            # 获取字段名（B列）
+            field_names = workbook.keys
             logger.info(f"发现 {len(field_names)} 个字段")
             
-            # 清空现有数据
+            # 清空现有数据（与新数据在同一事务中提交，导入期间查询仍读到旧数据）
             self.db.query(BasicMedicalInsurance).delete()
-            self.db.commit()
             logger.info("清空现有基本医保数据")
             
-            # 获取数据列（从D列开始，索引3开始）
-            data_columns = list(range(3, df.shape[1]))
             imported_count = 0
             
-            for col_idx in data_columns:
-                city_data = df.iloc[:, col_idx]
-                
-                # 跳过空列
-                if city_data.isna().all():
-                    continue
-                
+            # 每列一个城市（跳过空列）
+            for col_idx, city_data in workbook.records():
                 # 创建数据记录
                 record_data = {}
                 
-                for i, field_name in enumerate(field_names):
-                    if i >= len(city_data):
-                        break
-                        
-                    value = city_data.iloc[i]
-                    
-                    # 处理空值
-                    if pd.isna(value):
-                        value = None
-                    else:
+                for field_name, value in zip(field_names, city_data):
+                    # 处理非空值（空单元格为None）
+                    if value is not None:
                         # 统一转换为字符串
                         if isinstance(value, (int, float)):
                             # 对于数值类型，转换为字符串
-                            if pd.isna(value) or value != value:  # 检查NaN
+                            if value != value:  # 检查NaN
                                 value = None
                             else:
                                 value = str(value)
@@ -182,6 +188,7 @@ class BasicMedicalInsuranceImporter:
             
             # 提交事务
             self.db.commit()
+            self.imported_count = imported_count
             logger.info(f"成功导入 {imported_count} 条基本医保数据")
             return True
             
@@ -205,7 +212,8 @@ class BasicMedicalInsuranceImporter:
             return {
                 "total_records": total_count,
                 "cities_count": len(city_list),
-                "cities": city_list
+                "cities": city_list,
+                "workbook": self.workbook_stats
             }
         except Exception as e:
             logger.error(f"获取导入摘要失败: {e}")
@@ -1,15 +1,37 @@
 """
 保险产品数据导入器 - 从xlsx文件导入保险产品数据
+
+取值先按字段类型逐列规范化（布尔、数值去单位、JSON校验，见 value_normalizer），
+无法转换的取值写为NULL并记入导入摘要的拒绝报告，产品表中的数据都是原生类型。
+
+数据写入使用COPY：所有产品的规范化取值先以CSV格式通过 COPY FROM STDIN 写入临时暂存表（全部为TEXT列），
+再用一条 INSERT ... SELECT 按字段类型转换写入产品表。转换失败时回退为逐行写入，
+记录每个失败的产品列，与逐行INSERT时的错误处理一致。
+
+重新导入时数据写入影子表 insurance_products_{类型}__next，建好索引和卡片表后再改名切换
+（见 catalog_generations），导入期间当前表照常服务。
 """
-import openpyxl
+import csv
+import io
 import logging
+from functools import partial
 from pathlib import Path
-from typing import Dict, List, Optional, Any, Tuple
+from typing import Collection, Dict, Iterable, List, Optional, Any, Tuple
 from sqlalchemy.orm import Session
 from sqlalchemy import text, inspect
+from sqlalchemy.engine import Connection
 from sqlalchemy.exc import SQLAlchemyError
 
 from app.db.base import engine
+from app.db.catalog_generations import CatalogGenerationError, new_generation, next_table_name, promote_generation
+from app.db.import_manifest import file_content_hash, import_manifest
+from app.db.product_facets import precompute_catalog_facets
+from app.db.product_indexes import create_product_indexes
+from app.db.product_projections import build_card_table, card_table_name
+from app.db.product_text_index import product_text_index
+from app.db.importers.pipeline import ImportTask, run_import_pipeline
+from app.db.importers.value_normalizer import normalize_records
+from app.db.importers.workbook_reader import ParsedWorkbook
 
 logger = logging.getLogger(__name__)
 
@@ -50,8 +72,9 @@ class InsuranceProductImporter:
             db_session: 数据库会话
         """
         self.db = db_session
-        self.field_mappings = {}  # 存储每个表的字段映射
-        self.table_schemas = {}   # 存储每个表的schema
+        self.field_mappings: Dict[str, Dict[str, str]] = {}  # 存储每个表的字段映射
+        self.table_schemas: Dict[str, List[Dict[str, Any]]] = {}   # 存储每个表的schema
+        self.rejection_reports: Dict[str, Dict[str, Dict[str, Any]]] = {}  # 存储每个表规范化时被拒绝的取值
     
     def _parse_field_type(self, field_type_str: str) -> str:
         """
@@ -89,52 +112,49 @@ class InsuranceProductImporter:
             # 没有长度的类型
             return self.TYPE_MAPPING.get(field_type_str, 'VARCHAR(255)')
     
-    def _create_table_from_xlsx(self, product_type: str, table_name: str, xlsx_path: str) -> Tuple[bool, Dict]:
+    def _create_table_from_xlsx(
+        self, product_type: str, table_name: str, workbook: ParsedWorkbook, build_table: Optional[str] = None
+    ) -> Tuple[bool, Dict]:
         """
         根据xlsx文件创建数据库表
         
         Args:
             product_type: 产品类型（中文）
             table_name: 表名
-            xlsx_path: xlsx文件路径
+            workbook: 已解析的xlsx文件
+            build_table: 实际创建的表名（影子表），默认为 insurance_products_{table_name}
             
         Returns:
             (是否成功, 字段映射字典)
         """
         try:
-            # 读取xlsx文件
-            wb = openpyxl.load_workbook(xlsx_path)
-            ws = wb.active
-            
             # 读取字段信息
             fields = []
             field_mapping = {}  # 字段名 -> 中文说明
             
-            for row in range(1, ws.max_row + 1):
-                field_name = ws.cell(row, 1).value  # A列：字段名
-                field_desc = ws.cell(row, 2).value  # B列：字段解释
-                field_type = ws.cell(row, 3).value  # C列：数据类型
-                
-                if field_name:
-                    # 解析字段类型
-                    pg_type = self._parse_field_type(field_type)
-                    fields.append({
-                        'name': field_name.strip(),
-                        'type': pg_type,
-                        'desc': field_desc.strip() if field_desc else field_name
-                    })
-                    field_mapping[field_name.strip()] = field_desc.strip() if field_desc else field_name
+            # A列：字段名，B列：字段解释，C列：数据类型
+            for field_name, field_desc, field_type in workbook.schema_rows():
+                field_name = str(field_name).strip()
+                field_desc = str(field_desc).strip() if field_desc else field_name
+                # 解析字段类型
+                pg_type = self._parse_field_type(field_type)
+                fields.append({
+                    'name': field_name,
+                    'type': pg_type,
+                    'desc': field_desc
+                })
+                field_mapping[field_name] = field_desc
             
             # 保存字段映射
             self.field_mappings[table_name] = field_mapping
             self.table_schemas[table_name] = fields
             
             # 删除旧表（如果存在）
+            full_table_name = build_table or f"insurance_products_{table_name}"
             with engine.begin() as conn:
-                conn.execute(text(f"DROP TABLE IF EXISTS {table_name} CASCADE"))
+                conn.execute(text(f"DROP TABLE IF EXISTS {full_table_name} CASCADE"))
             
             # 构建CREATE TABLE语句
-            full_table_name = f"insurance_products_{table_name}"
             columns_sql = ["product_id SERIAL PRIMARY KEY"]
             
             for field in fields:
@@ -152,15 +172,19 @@ class InsuranceProductImporter:
                 conn.execute(text(create_table_sql))
                 logger.info(f"成功创建表: {full_table_name}")
                 
-                # 为列添加注释
+                # 为列添加注释（所有注释合并为一次执行）
+                comments = []
                 for field in fields:
-                    comment_sql = f"""
-                    COMMENT ON COLUMN {full_table_name}.{field['name']} IS '{field['desc']}'
-                    """
+                    desc = str(field['desc']).replace("'", "''")
+                    comments.append(f"COMMENT ON COLUMN {full_table_name}.{field['name']} IS '{desc}'")
+                comments_sql = ";\n".join(comments)
+                if comments_sql:
                     try:
-                        conn.execute(text(comment_sql))
+                        with conn.begin_nested():
+                            # 使用DBAPI游标执行，注释中的 % 和 : 不会被当作参数占位符
+                            conn.connection.cursor().execute(comments_sql)
                     except Exception as e:
-                        logger.warning(f"添加列注释失败: {field['name']}, {e}")
+                        logger.warning(f"添加列注释失败: {full_table_name}, {e}")
             
             return True, field_mapping
             
@@ -168,70 +192,129 @@ class InsuranceProductImporter:
             logger.error(f"创建表失败: {table_name}, {e}")
             return False, {}
     
-    def _import_data_from_xlsx(self, table_name: str, xlsx_path: str) -> int:
+    def _read_products(
+        self, workbook: ParsedWorkbook, field_types: Dict[str, str]
+    ) -> Tuple[List[Tuple[int, List[Optional[str]]]], Dict[str, Dict[str, Any]]]:
+        """
+        读取xlsx中的产品数据（D列起每列一个产品），按字段类型逐列规范化（见 value_normalizer）
+        
+        Args:
+            workbook: 已解析的xlsx文件
+            field_types: 字段名 -> PostgreSQL类型
+            
+        Returns:
+            (产品数据 [(产品所在列号, 按字段顺序的规范化取值)]，跳过规范化后全部为空的列,
+             拒绝报告 {字段名: {'type', 'rejected', 'samples'}})
+        """
+        return normalize_records(workbook.keys, field_types, list(workbook.records()))
+    
+    @staticmethod
+    def _cast_expression(field_name: str, field_type: Optional[str]) -> str:
+        """暂存表TEXT列转换为产品表字段类型的表达式（字符串类型直接写入，由列定义检查长度）"""
+        if not field_type or field_type.startswith(('VARCHAR', 'TEXT')):
+            return field_name
+        return f"CAST({field_name} AS {field_type})"
+    
+    def _copy_products(
+        self, conn: Connection, full_table_name: str, field_names: List[str],
+        products: Iterable[Tuple[int, List[Optional[str]]]], field_types: Dict[str, str]
+    ) -> int:
+        """
+        通过暂存表写入产品数据
+        
+        Args:
+            conn: 数据库连接（在事务中）
+            full_table_name: 产品表名
+            field_names: 字段名列表
+            products: _read_products返回的产品数据
+            field_types: 字段名 -> PostgreSQL类型
+            
+        Returns:
+            写入的记录数
+        """
+        staging_table = f"{full_table_name}_staging"
+        staging_columns = ', '.join(f"{name} TEXT" for name in field_names)
+        conn.execute(text(
+            f"CREATE TEMP TABLE {staging_table} (source_column INTEGER, {staging_columns}) ON COMMIT DROP"
+        ))
+        
+        # 规范化后的取值写入内存CSV缓冲区（None写为空字段，COPY按NULL处理）
+        buffer = io.StringIO()
+        writer = csv.writer(buffer)
+        source_columns = []
+        for col_idx, values in products:
+            writer.writerow([col_idx, *values])
+            source_columns.append(col_idx)
+        buffer.seek(0)
+        conn.connection.cursor().copy_expert(
+            f"COPY {staging_table} FROM STDIN WITH (FORMAT csv)", buffer
+        )
+        
+        select_list = ', '.join(self._cast_expression(name, field_types.get(name)) for name in field_names)
+        insert_sql = (
+            f"INSERT INTO {full_table_name} ({', '.join(field_names)}) "
+            f"SELECT {select_list} FROM {staging_table}"
+        )
+        
+        # 所有行一次转换写入
+        try:
+            with conn.begin_nested():
+                result = conn.execute(text(f"{insert_sql} ORDER BY source_column"))
+            return result.rowcount
+        except SQLAlchemyError as e:
+            logger.warning(f"批量写入失败，逐行校验: {full_table_name}, {e.__class__.__name__}")
+        
+        # 批量写入回滚后恢复主键序列，逐行写入时product_id仍从1开始连续编号
+        conn.execute(text(
+            f"SELECT setval(pg_get_serial_sequence('{full_table_name}', 'product_id'), "
+            f"COALESCE((SELECT MAX(product_id) FROM {full_table_name}), 0) + 1, false)"
+        ))
+        
+        # 逐行写入，记录转换失败的产品列
+        imported_count = 0
+        for col_idx in source_columns:
+            try:
+                with conn.begin_nested():
+                    conn.execute(
+                        text(f"{insert_sql} WHERE source_column = :source_column"),
+                        {"source_column": col_idx}
+                    )
+                imported_count += 1
+            except SQLAlchemyError as e:
+                logger.error(f"导入数据失败，列 {col_idx}: {e}")
+        return imported_count
+    
+    def _import_data_from_xlsx(
+        self, table_name: str, workbook: ParsedWorkbook, build_table: Optional[str] = None
+    ) -> int:
         """
         从xlsx文件导入数据到表
         
         Args:
             table_name: 表名
-            xlsx_path: xlsx文件路径
+            workbook: 已解析的xlsx文件
+            build_table: 实际写入的表名（影子表），默认为 insurance_products_{table_name}
             
         Returns:
             导入的记录数
         """
         try:
-            # 读取xlsx文件
-            wb = openpyxl.load_workbook(xlsx_path)
-            ws = wb.active
-            
-            # 读取字段名（A列）
-            field_names = []
-            for row in range(1, ws.max_row + 1):
-                field_name = ws.cell(row, 1).value
-                if field_name:
-                    field_names.append(field_name.strip())
+            field_names = workbook.keys
+            full_table_name = build_table or f"insurance_products_{table_name}"
+            field_types = {field['name']: field['type'] for field in self.table_schemas.get(table_name, [])}
+            products, rejections = self._read_products(workbook, field_types)
             
-            # 读取数据列（从D列开始，索引4）
-            imported_count = 0
-            full_table_name = f"insurance_products_{table_name}"
+            # 无法按字段类型转换的取值写为NULL，按列记录
+            self.rejection_reports[table_name] = rejections
+            for field_name, report in rejections.items():
+                samples = ', '.join(f"列{item['column']}={item['value']!r}" for item in report['samples'])
+                logger.warning(
+                    f"字段取值无法转换为 {report['type']}，已写为NULL: {full_table_name}.{field_name} "
+                    f"({report['rejected']} 个, 如 {samples})"
+                )
             
             with engine.begin() as conn:
-                for col_idx in range(4, ws.max_column + 1):
-                    # 读取该列数据
-                    values = []
-                    skip_row = False
-                    
-                    for row_idx, field_name in enumerate(field_names, start=1):
-                        cell_value = ws.cell(row_idx, col_idx).value
-                        
-                        # 处理空值
-                        if cell_value is None or str(cell_value).strip().lower() in ['', 'nan', 'none', 'null']:
-                            values.append(None)
-                        else:
-                            # 转换为合适的类型
-                            values.append(str(cell_value).strip())
-                    
-                    # 检查是否所有值都为空
-                    if all(v is None for v in values):
-                        continue
-                    
-                    # 构建INSERT语句
-                    columns = ', '.join(field_names)
-                    placeholders = ', '.join([f':val{i}' for i in range(len(values))])
-                    insert_sql = f"""
-                    INSERT INTO {full_table_name} ({columns})
-                    VALUES ({placeholders})
-                    """
-                    
-                    # 准备参数字典
-                    params = {f'val{i}': val for i, val in enumerate(values)}
-                    
-                    try:
-                        conn.execute(text(insert_sql), params)
-                        imported_count += 1
-                    except Exception as e:
-                        logger.error(f"导入数据失败，列 {col_idx}: {e}")
-                        continue
+                imported_count = self._copy_products(conn, full_table_name, field_names, products, field_types)
             
             logger.info(f"成功导入 {imported_count} 条数据到表 {full_table_name}")
             return imported_count
@@ -240,59 +323,170 @@ class InsuranceProductImporter:
             logger.error(f"导入数据失败: {table_name}, {e}")
             return 0
     
-    def import_all_products(self, data_dir: str) -> Dict[str, Any]:
+    @staticmethod
+    def new_summary() -> Dict[str, Any]:
+        """空的导入摘要"""
+        return {
+            'total_tables': 0,
+            'successful_tables': 0,
+            'total_records': 0,
+            'skipped_tables': [],
+            'tables': {},
+            'timings': []
+        }
+    
+    def import_tasks(
+        self, data_dir: str, summary: Dict[str, Any], skip_unchanged: bool = False,
+        file_names: Optional[Collection[str]] = None
+    ) -> List[ImportTask]:
         """
-        导入所有保险产品数据
+        生成产品表的导入任务（交给导入流水线执行）
         
         Args:
             data_dir: 数据文件目录路径
+            summary: 导入摘要，任务执行时写入每个表的结果
+            skip_unchanged: 跳过源文件内容与导入清单记录一致的产品表
+            file_names: 只导入这些文件，默认导入全部产品文件
             
         Returns:
-            导入摘要信息
+            需要导入的产品表任务
         """
         data_path = Path(data_dir)
-        summary = {
-            'total_tables': 0,
-            'successful_tables': 0,
-            'total_records': 0,
-            'tables': {}
-        }
+        tasks = []
         
         for product_type, (table_name, xlsx_file) in self.PRODUCT_TYPES.items():
             xlsx_path = data_path / xlsx_file
+            full_table_name = f"insurance_products_{table_name}"
+            
+            if file_names is not None and xlsx_file not in file_names:
+                continue
             
             if not xlsx_path.exists():
                 logger.warning(f"文件不存在: {xlsx_path}")
                 continue
             
-            logger.info(f"开始导入: {product_type} ({xlsx_file})")
-            
-            # 创建表
-            success, field_mapping = self._create_table_from_xlsx(
-                product_type, table_name, str(xlsx_path)
-            )
-            
-            if not success:
-                logger.error(f"创建表失败: {product_type}")
+            content_hash = file_content_hash(xlsx_path)
+            if skip_unchanged and import_manifest.is_current(full_table_name, content_hash):
+                logger.info(f"源文件未变化，跳过导入: {product_type} ({xlsx_file})")
+                summary['skipped_tables'].append(full_table_name)
                 continue
             
-            # 导入数据
-            record_count = self._import_data_from_xlsx(table_name, str(xlsx_path))
-            
-            # 记录摘要
-            summary['total_tables'] += 1
-            if record_count > 0:
-                summary['successful_tables'] += 1
-                summary['total_records'] += record_count
+            tasks.append(ImportTask(
+                product_type, xlsx_path,
+                partial(self._import_product, product_type, table_name, xlsx_file, content_hash, summary),
+                records=partial(self._imported_records, summary, product_type)
+            ))
+        
+        return tasks
+    
+    @staticmethod
+    def _imported_records(summary: Dict[str, Any], product_type: str) -> Optional[int]:
+        """产品表导入后写入的记录数"""
+        return summary['tables'].get(product_type, {}).get('record_count')
+    
+    def _import_product(
+        self, product_type: str, table_name: str, xlsx_file: str, content_hash: str,
+        summary: Dict[str, Any], workbook: ParsedWorkbook
+    ) -> bool:
+        """
+        导入单个产品表（导入流水线的写入阶段）
+        
+        Args:
+            product_type: 产品类型（中文）
+            table_name: 表名后缀
+            xlsx_file: xlsx文件名
+            content_hash: 源文件内容哈希
+            summary: 导入摘要
+            workbook: 已解析的xlsx文件
             
-            summary['tables'][product_type] = {
-                'table_name': f"insurance_products_{table_name}",
-                'file_name': xlsx_file,
-                'record_count': record_count,
-                'field_count': len(field_mapping),
-                'fields': field_mapping
-            }
+        Returns:
+            是否导入成功
+        """
+        full_table_name = f"insurance_products_{table_name}"
+        logger.info(f"开始导入: {product_type} ({xlsx_file})")
+        
+        # 新数据写入影子表，校验和建索引完成后再切换，导入期间当前表照常服务
+        build_table = next_table_name(full_table_name)
+        generation = new_generation()
+        
+        # 创建表
+        success, field_mapping = self._create_table_from_xlsx(
+            product_type, table_name, workbook, build_table
+        )
         
+        if not success:
+            logger.error(f"创建表失败: {product_type}")
+            return False
+        
+        # 导入数据
+        record_count = self._import_data_from_xlsx(table_name, workbook, build_table)
+        
+        summary['total_tables'] += 1
+        if record_count <= 0:
+            # 没有导入任何数据时不切换，当前表保持不变
+            logger.error(f"导入数据为空，不切换产品目录: {product_type} ({build_table})")
+            return False
+        
+        # 数据导入后根据字段类型创建索引
+        indexes = create_product_indexes(build_table, self.table_schemas[table_name], generation)
+        
+        # 物化搜索列表使用的卡片表（同样先建在影子表上）
+        card_table = card_table_name(table_name)
+        card_built = build_card_table(
+            table_name, build_table, next_table_name(card_table), self.table_schemas[table_name], generation
+        )
+        
+        # 改名切换（当前表保留为上一代），并使表结构缓存失效、重新反射表模型
+        try:
+            promote_generation(table_name)
+        except CatalogGenerationError as e:
+            logger.error(f"切换产品目录失败: {product_type}, {e}")
+            return False
+        
+        # 预先计算全目录分面，客户端打开筛选面板时无需查询
+        facet_count = precompute_catalog_facets(table_name)
+        
+        # 构建全文检索索引
+        text_index = product_text_index.get(table_name)
+        
+        # 记录摘要
+        summary['successful_tables'] += 1
+        summary['total_records'] += record_count
+        # 导入成功后记录源文件哈希，下次启动时内容未变则跳过
+        import_manifest.record(full_table_name, xlsx_file, content_hash, record_count)
+        
+        summary['tables'][product_type] = {
+            'table_name': full_table_name,
+            'file_name': xlsx_file,
+            'record_count': record_count,
+            'field_count': len(field_mapping),
+            'fields': field_mapping,
+            'indexes': indexes,
+            'card_table': card_table if card_built else None,
+            'facet_count': facet_count,
+            'text_index_terms': len(text_index.postings) if text_index else 0,
+            'rejections': self.rejection_reports.get(table_name, {}),
+            'workbook': workbook.stats
+        }
+        return True
+    
+    def import_all_products(
+        self, data_dir: str, skip_unchanged: bool = False, workers: Optional[int] = None
+    ) -> Dict[str, Any]:
+        """
+        导入所有保险产品数据
+        
+        Args:
+            data_dir: 数据文件目录路径
+            skip_unchanged: 跳过源文件内容与导入清单记录一致的产品表
+            workers: 解析进程数，默认取 IMPORT_WORKERS
+            
+        Returns:
+            导入摘要信息（timings为每个文件的耗时明细）
+        """
+        summary = self.new_summary()
+        tasks = self.import_tasks(data_dir, summary, skip_unchanged=skip_unchanged)
+        summary['timings'] = run_import_pipeline(tasks, workers)
         return summary
     
     def get_product_types(self) -> List[Dict[str, str]]:
@@ -320,19 +514,20 @@ class InsuranceProductImporter:
         return self.field_mappings.get(table_name, {})
 
 
-def import_insurance_products_data(db: Session, data_dir: str) -> Dict[str, Any]:
+def import_insurance_products_data(db: Session, data_dir: str, skip_unchanged: bool = False) -> Dict[str, Any]:
     """
     导入保险产品数据的便捷函数
     
     Args:
         db: 数据库会话
         data_dir: 数据文件目录
+        skip_unchanged: 跳过源文件未变化的产品表
         
     Returns:
         导入摘要信息
     """
     importer = InsuranceProductImporter(db)
-    summary = importer.import_all_products(data_dir)
+    summary = importer.import_all_products(data_dir, skip_unchanged=skip_unchanged)
     
     logger.info(f"保险产品数据导入完成: {summary}")
     
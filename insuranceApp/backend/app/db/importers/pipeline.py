@@ -0,0 +1,174 @@
+"""
+多文件导入流水线
+
+解析xlsx是CPU密集的操作，逐个文件串行导入时启动耗时是所有文件解析时间之和。
+流水线分两级：
+- 解析：进程池并行解析工作簿（read_workbook），每个文件得到一个ParsedWorkbook
+- 写入：当前进程按解析完成的顺序逐个执行导入任务的load，每个表在各自的事务中写入
+
+写入级只在当前进程执行，数据库连接和会话不会跨进程共享。
+IMPORT_WORKERS 为1时不创建进程池，在当前进程中依次解析。
+调用方可以传入回调跟踪进度（每个文件开始写入、写入完成时调用）。
+"""
+import logging
+import multiprocessing
+import os
+import threading
+import time
+from concurrent.futures import FIRST_COMPLETED, Future, ProcessPoolExecutor, wait
+from pathlib import Path
+from typing import Any, Callable, Dict, List, Optional, Tuple, Union
+
+from app.core.config import settings
+from app.db.importers.workbook_reader import DATA_START_COLUMN, ParsedWorkbook, read_workbook
+
+logger = logging.getLogger(__name__)
+
+
+class ImportTask:
+    """单个源文件的导入任务"""
+
+    def __init__(
+        self,
+        name: str,
+        path: Union[str, Path],
+        load: Callable[[ParsedWorkbook], Any],
+        key_column: int = 1,
+        data_start_column: int = DATA_START_COLUMN,
+        records: Optional[Callable[[], Optional[int]]] = None,
+    ):
+        """
+        Args:
+            name: 任务名称（目标表名或产品类型），用于日志和耗时明细
+            path: xlsx文件路径
+            load: 写入函数，接收解析后的工作簿，返回值为假时视为导入失败
+            key_column: 字段名所在列号
+            data_start_column: 记录数据的起始列号
+            records: 写入完成后返回写入的记录数，用于耗时明细和进度
+        """
+        self.name = name
+        self.path = Path(path)
+        self.load = load
+        self.key_column = key_column
+        self.data_start_column = data_start_column
+        self.records = records
+
+
+def resolve_workers(task_count: int, workers: Optional[int] = None) -> int:
+    """
+    解析进程数：参数 > IMPORT_WORKERS，0表示按CPU核数，且不超过任务数
+    """
+    if workers is None:
+        workers = settings.IMPORT_WORKERS
+    if workers <= 0:
+        workers = os.cpu_count() or 1
+    return max(1, min(workers, task_count))
+
+
+def _parse(path: Path, key_column: int, data_start_column: int) -> Tuple[ParsedWorkbook, float]:
+    """解析进程中执行：解析工作簿，同时返回解析完成的时间（time.time，可跨进程比较）"""
+    return read_workbook(path, key_column, data_start_column), time.time()
+
+
+def _load(
+    task: ImportTask, future: Future, started: float,
+    on_load_start: Optional[Callable[[ImportTask], None]] = None
+) -> Dict[str, Any]:
+    """执行单个任务的写入，返回该文件的耗时明细"""
+    timing: Dict[str, Any] = {
+        'name': task.name,
+        'file_name': task.path.name,
+        'parse_seconds': None,
+        'wait_seconds': None,
+        'load_seconds': None,
+        'finished_at': None,
+        'max_rss_mb': None,
+        'records': None,
+        'success': False,
+        'error': None,
+    }
+    try:
+        workbook, parsed_at = future.result()
+    except Exception as e:
+        logger.error(f"解析xlsx文件失败: {task.path}, {e}")
+        timing['error'] = f"解析xlsx文件失败: {e}"
+        return timing
+
+    timing['parse_seconds'] = round(workbook.parse_seconds, 3)
+    timing['max_rss_mb'] = workbook.stats['max_rss_mb']
+    # 解析完成后等待写入级空闲的时间
+    timing['wait_seconds'] = round(max(time.time() - parsed_at, 0.0), 3)
+    if on_load_start is not None:
+        on_load_start(task)
+    load_started = time.perf_counter()
+    try:
+        timing['success'] = bool(task.load(workbook))
+        if not timing['success']:
+            timing['error'] = "导入失败，详见服务日志"
+    except Exception as e:
+        logger.error(f"导入失败: {task.name}, {e}")
+        timing['error'] = f"导入失败: {e}"
+    if timing['success'] and task.records is not None:
+        timing['records'] = task.records()
+    timing['load_seconds'] = round(time.perf_counter() - load_started, 3)
+    timing['finished_at'] = round(time.perf_counter() - started, 3)
+    return timing
+
+
+def run_import_pipeline(
+    tasks: List[ImportTask],
+    workers: Optional[int] = None,
+    on_load_start: Optional[Callable[[ImportTask], None]] = None,
+    on_loaded: Optional[Callable[[Dict[str, Any]], None]] = None,
+) -> List[Dict[str, Any]]:
+    """
+    并行解析、逐个写入一组导入任务
+
+    Args:
+        tasks: 导入任务
+        workers: 解析进程数，默认取 IMPORT_WORKERS
+        on_load_start: 文件解析完成、开始写入时调用，参数为导入任务
+        on_loaded: 文件写入完成（或解析失败）时调用，参数为该文件的耗时明细
+
+    Returns:
+        每个文件的耗时明细（按写入顺序）：parse_seconds（解析）、wait_seconds（解析完成后等待写入）、
+        load_seconds（写入）、finished_at（自流水线开始到该文件写入完成）、max_rss_mb（解析进程的内存峰值）、records（写入的记录数）、success、error（失败原因）
+    """
+    if not tasks:
+        return []
+
+    workers = resolve_workers(len(tasks), workers)
+    started = time.perf_counter()
+    timings = []
+    logger.info(f"导入流水线开始: {len(tasks)} 个文件, {workers} 个解析进程")
+
+    if workers == 1:
+        for task in tasks:
+            future: Future = Future()
+            try:
+                future.set_result(_parse(task.path, task.key_column, task.data_start_column))
+            except Exception as e:
+                future.set_exception(e)
+            timings.append(_load(task, future, started, on_load_start))
+            if on_loaded is not None:
+                on_loaded(timings[-1])
+    else:
+        # 在后台线程中（管理员触发的重新导入）fork进程可能复制其他线程持有的锁，改用spawn启动解析进程
+        mp_context = None
+        if threading.current_thread() is not threading.main_thread():
+            mp_context = multiprocessing.get_context("spawn")
+        # 只把文件路径等参数传给解析进程（load通常是闭包，不能序列化）
+        with ProcessPoolExecutor(max_workers=workers, mp_context=mp_context) as executor:
+            pending = {
+                executor.submit(_parse, task.path, task.key_column, task.data_start_column): task
+                for task in tasks
+            }
+            while pending:
+                done, _ = wait(pending, return_when=FIRST_COMPLETED)
+                for future in done:
+                    timings.append(_load(pending.pop(future), future, started, on_load_start))
+                    if on_loaded is not None:
+                        on_loaded(timings[-1])
+
+    logger.info(f"导入流水线完成: {len(tasks)} 个文件, 总耗时 {time.perf_counter() - started:.2f}s")
+    return timings
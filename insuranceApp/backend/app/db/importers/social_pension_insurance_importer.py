@@ -1,7 +1,6 @@
 """
 社会养老保险数据导入器
 """
-import pandas as pd
 import logging
 import json
 from pathlib import Path
@@ -9,6 +8,7 @@ from typing import Dict, List, Optional, Any
 from sqlalchemy.orm import Session
 from sqlalchemy.exc import SQLAlchemyError
 
+from app.db.importers.workbook_reader import ParsedWorkbook, read_workbook
 from app.models.social_pension_insurance import SocialPensionInsurance
 
 logger = logging.getLogger(__name__)
@@ -17,6 +17,9 @@ logger = logging.getLogger(__name__)
 class SocialPensionInsuranceImporter:
     """社会养老保险数据导入器"""
     
+    # 字段名所在列号（C列），数据从D列开始
+    KEY_COLUMN = 3
+    
     def __init__(self, db_session: Session):
         """
         初始化导入器
@@ -25,6 +28,8 @@ class SocialPensionInsuranceImporter:
             db_session: 数据库会话
         """
         self.db = db_session
+        self.workbook_stats: Dict[str, Any] = {}
+        self.imported_count = 0
         
         # 字段映射：中文字段名 -> 英文字段名
         self.field_mapping = {
@@ -73,39 +78,42 @@ class SocialPensionInsuranceImporter:
             bool: 导入是否成功
         """
         try:
-            # 读取Excel文件
-            df = pd.read_excel(excel_path, header=None)
-            logger.info(f"成功读取Excel文件: {excel_path}, 数据形状: {df.shape}")
+            workbook = read_workbook(excel_path, key_column=self.KEY_COLUMN)
+        except Exception as e:
+            logger.error(f"读取Excel文件失败: {excel_path}, {e}")
+            return False
+        return self.import_workbook(workbook)
+    
+    def import_workbook(self, workbook: ParsedWorkbook) -> bool:
+        """
+        从已解析的Excel文件导入社会养老保险数据
+        
+        Args:
+            workbook: read_workbook解析的Excel文件
             
-            # 获取字段名（C列，索引2）
-            field_names = df.iloc[:, 2].dropna().tolist()
+        Returns:
+            bool: 导入是否成功
+        """
+        try:
+            self.workbook_stats = workbook.stats
+            logger.info(f"成功读取Excel文件: {workbook.path}, {self.workbook_stats}")
+            
+            # 获取字段名（C列）
+            field_names = workbook.keys
             logger.info(f"发现 {len(field_names)} 个字段")
             
-            # 清空现有数据
+            # 清空现有数据（与新数据在同一事务中提交，导入期间查询仍读到旧数据）
             self.db.query(SocialPensionInsurance).delete()
-            self.db.commit()
             logger.info("清空现有社会养老保险数据")
             
-            # 获取数据列（从D列开始，索引3开始）
-            data_columns = list(range(3, df.shape[1]))
             imported_count = 0
             
-            for col_idx in data_columns:
-                province_data = df.iloc[:, col_idx]
-                
-                # 跳过空列
-                if province_data.isna().all():
-                    continue
-                
+            # 每列一个省市（跳过空列）
+            for col_idx, province_data in workbook.records():
                 # 创建数据记录
                 record_data = {}
                 
-                for i, field_name in enumerate(field_names):
-                    if i >= len(province_data):
-                        break
-                        
-                    value = province_data.iloc[i]
-                    
+                for field_name, value in zip(field_names, province_data):
                     # 获取对应的英文字段名
                     english_field = self.field_mapping.get(field_name)
                     if not english_field:
@@ -116,10 +124,8 @@ class SocialPensionInsuranceImporter:
                     if english_field == "id":
                         continue
                     
-                    # 处理空值
-                    if pd.isna(value):
-                        value = None
-                    else:
+                    # 处理非空值（空单元格为None）
+                    if value is not None:
                         # 根据字段类型处理值
                         if english_field in self.json_fields:
                             # JSON字段处理
@@ -140,7 +146,7 @@ class SocialPensionInsuranceImporter:
                             # 非JSON字段
                             if isinstance(value, (int, float)):
                                 # 对于数值类型，检查是否为NaN
-                                if pd.isna(value) or value != value:
+                                if value != value:
                                     value = None
                             else:
                                 # 字符串类型
@@ -168,6 +174,7 @@ class SocialPensionInsuranceImporter:
             
             # 提交事务
             self.db.commit()
+            self.imported_count = imported_count
             logger.info(f"成功导入 {imported_count} 条社会养老保险数据")
             return True
             
@@ -191,7 +198,8 @@ class SocialPensionInsuranceImporter:
             return {
                 "total_records": total_count,
                 "provinces_count": len(province_list),
-                "provinces": province_list
+                "provinces": province_list,
+                "workbook": self.workbook_stats
             }
         except Exception as e:
             logger.error(f"获取导入摘要失败: {e}")
@@ -0,0 +1,222 @@
+"""
+产品数据按字段类型规范化
+
+产品文件是转置布局，每个字段行就是产品表的一列。导入时按列转换：每列根据字段的PostgreSQL类型
+（TYPE_MAPPING映射后的类型）选定一次转换函数，再对整列取值逐个转换，输出可直接CAST为该类型的文本：
+
+- BOOLEAN: 是/否、有/无、true/false、1/0 等转换为 true/false
+- INTEGER / NUMERIC / DECIMAL: 去除千分位、货币符号和单位（如 "1,000元"、"50万"、"30%"、"0.5元/天"），
+  万/亿按倍数换算，百分数换算为比例；INTEGER要求取值为整数
+- JSONB: 解析并校验JSON（兼容单引号的Python字面量），输出规范化的JSON文本
+- VARCHAR(n) / TEXT: 去除首尾空白，VARCHAR检查长度
+
+无法转换的取值写为NULL（产品其余字段照常导入），并计入该列的拒绝报告。
+"""
+import ast
+import json
+import re
+from decimal import Decimal, InvalidOperation
+from typing import Any, Callable, Dict, List, Optional, Sequence, Tuple
+
+# 视为空值的文本
+NULL_TOKENS = {'', 'nan', 'none', 'null'}
+
+TRUE_TOKENS = {'是', '有', '支持', '可以', 'true', 't', 'yes', 'y', '1', '√', '✓'}
+FALSE_TOKENS = {'否', '无', '不支持', '不可以', 'false', 'f', 'no', 'n', '0', '×', '✗'}
+
+# 数值前后允许的单位：前缀为货币符号，后缀为不含数字的单位文本（如 元、岁、元/天）
+NUMBER_PATTERN = re.compile(
+    r'^(?:[¥￥$])?\s*([+-]?\d+(?:\.\d+)?)\s*(万|亿)?\s*(%|％)?\s*([^\d]*)$'
+)
+MAGNITUDES = {'万': Decimal(10000), '亿': Decimal(100000000)}
+
+# 拒绝报告中每列保留的样例数
+MAX_REJECTION_SAMPLES = 5
+
+
+class RejectedValue(ValueError):
+    """取值无法转换为字段类型"""
+
+
+def _text(value: Any) -> Optional[str]:
+    """空值和 nan/none/null 转为None，其余转为去除首尾空白的字符串"""
+    if value is None:
+        return None
+    text = str(value).strip()
+    if text.lower() in NULL_TOKENS:
+        return None
+    return text
+
+
+def _to_decimal(value: Any) -> Decimal:
+    if isinstance(value, bool):
+        return Decimal(int(value))
+    if isinstance(value, int):
+        return Decimal(value)
+    if isinstance(value, float):
+        if value != value or value in (float('inf'), float('-inf')):
+            raise RejectedValue("非有限数值")
+        # 以最短表示转换，避免二进制浮点误差（0.3 -> 0.3 而不是 0.299999...）
+        return Decimal(repr(value))
+
+    match = NUMBER_PATTERN.match(str(value).replace(',', '').replace('，', ''))
+    if not match:
+        raise RejectedValue("不是数值")
+    number, magnitude, percent, _ = match.groups()
+    result = Decimal(number)
+    if magnitude:
+        result *= MAGNITUDES[magnitude]
+    if percent:
+        result /= 100
+    return result
+
+
+def _format_decimal(value: Decimal) -> str:
+    """去除多余的小数位（1.50 -> 1.5，1E+4 -> 10000）"""
+    return format(value.normalize(), 'f')
+
+
+def normalize_boolean(value: Any) -> str:
+    if isinstance(value, (bool, int, float)):
+        if value not in (0, 1):
+            raise RejectedValue("不是布尔值")
+        return 'true' if value else 'false'
+    token = str(value).strip().lower()
+    if token in TRUE_TOKENS:
+        return 'true'
+    if token in FALSE_TOKENS:
+        return 'false'
+    raise RejectedValue("不是布尔值")
+
+
+def normalize_numeric(value: Any) -> str:
+    return _format_decimal(_to_decimal(value))
+
+
+def normalize_integer(value: Any) -> str:
+    number = _to_decimal(value)
+    if number != number.to_integral_value():
+        raise RejectedValue("不是整数")
+    return str(int(number))
+
+
+def normalize_json(value: Any) -> str:
+    if isinstance(value, (int, float)) and not isinstance(value, bool):
+        return json.dumps(value)
+    text = str(value).strip()
+    try:
+        parsed = json.loads(text)
+    except ValueError:
+        # 兼容Python字面量形式（单引号、True/None）
+        try:
+            parsed = ast.literal_eval(text)
+            json.dumps(parsed)
+        except (ValueError, SyntaxError, TypeError):
+            raise RejectedValue("不是有效的JSON")
+    return json.dumps(parsed, ensure_ascii=False)
+
+
+def _varchar_normalizer(length: int) -> Callable[[Any], str]:
+    def normalize(value: Any) -> str:
+        text = str(value).strip()
+        if len(text) > length:
+            raise RejectedValue(f"长度超过{length}")
+        return text
+    return normalize
+
+
+def normalize_text(value: Any) -> str:
+    return str(value).strip()
+
+
+# PostgreSQL基本类型（TYPE_MAPPING的取值）-> 转换函数
+NORMALIZERS: Dict[str, Callable[[Any], str]] = {
+    'BOOLEAN': normalize_boolean,
+    'INTEGER': normalize_integer,
+    'NUMERIC': normalize_numeric,
+    'DECIMAL': normalize_numeric,
+    'JSONB': normalize_json,
+    'TEXT': normalize_text,
+}
+
+
+def normalizer_for(field_type: Optional[str]) -> Callable[[Any], str]:
+    """按字段类型（如 VARCHAR(63)、DECIMAL(10,2)、BOOLEAN）选择转换函数"""
+    if not field_type:
+        return normalize_text
+    field_type = field_type.strip().upper()
+    base_type = field_type.split('(')[0].strip()
+    if base_type == 'VARCHAR':
+        match = re.search(r'\((\d+)\)', field_type)
+        return _varchar_normalizer(int(match.group(1))) if match else normalize_text
+    return NORMALIZERS.get(base_type, normalize_text)
+
+
+def normalize_column(
+    field_type: Optional[str], values: Sequence[Any], source_columns: Sequence[int]
+) -> Tuple[List[Optional[str]], List[Dict[str, Any]]]:
+    """
+    按字段类型转换一列取值
+
+    Args:
+        field_type: 字段的PostgreSQL类型
+        values: 该列的原始取值（每个产品一个）
+        source_columns: 每个取值所在的xlsx列号，用于拒绝报告
+
+    Returns:
+        (转换后的文本，空值和无法转换的取值为None, 被拒绝的取值列表 [{'column': 列号, 'value': 原始取值, 'reason': 原因}])
+    """
+    normalize = normalizer_for(field_type)
+    normalized: List[Optional[str]] = []
+    rejected: List[Dict[str, Any]] = []
+    for value, source_column in zip(values, source_columns):
+        if _text(value) is None:
+            normalized.append(None)
+            continue
+        try:
+            normalized.append(normalize(value))
+        except (RejectedValue, InvalidOperation) as e:
+            normalized.append(None)
+            rejected.append({'column': source_column, 'value': str(value)[:100], 'reason': str(e)})
+    return normalized, rejected
+
+
+def normalize_records(
+    field_names: List[str], field_types: Dict[str, str], records: List[Tuple[int, List[Any]]]
+) -> Tuple[List[Tuple[int, List[Optional[str]]]], Dict[str, Dict[str, Any]]]:
+    """
+    按列转换全部产品的取值
+
+    Args:
+        field_names: 字段名列表（与每个产品取值的顺序一致）
+        field_types: 字段名 -> PostgreSQL类型
+        records: (产品所在列号, 按字段顺序的原始取值)
+
+    Returns:
+        (按产品输出的转换结果，跳过转换后全部为空的产品, 拒绝报告 {字段名: {'type', 'rejected', 'samples'}})
+    """
+    if not records:
+        return [], {}
+
+    source_columns = [col_idx for col_idx, _ in records]
+    columns = list(zip(*(values for _, values in records)))
+
+    normalized_columns = []
+    report: Dict[str, Dict[str, Any]] = {}
+    for field_name, column in zip(field_names, columns):
+        field_type = field_types.get(field_name)
+        normalized, rejected = normalize_column(field_type, column, source_columns)
+        normalized_columns.append(normalized)
+        if rejected:
+            report[field_name] = {
+                'type': field_type,
+                'rejected': len(rejected),
+                'samples': rejected[:MAX_REJECTION_SAMPLES],
+            }
+
+    products = []
+    for col_idx, values in zip(source_columns, zip(*normalized_columns)):
+        if all(v is None for v in values):
+            continue
+        products.append((col_idx, list(values)))
+    return products, report
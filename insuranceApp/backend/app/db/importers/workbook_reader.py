@@ -0,0 +1,166 @@
+"""
+xlsx数据文件读取
+
+数据文件都是转置布局：每行一个字段，A~C列为字段定义（字段名、说明、类型等），
+D列起每列一条记录（一个产品 / 城市 / 省份）。三个导入器共用本模块：
+以openpyxl只读、仅取值模式逐行读取，每个文件只解析一次，
+再以生成器输出字段定义行和转置后的记录。
+
+转置需要全部字段行，因此单元格取值会保留在内存中；只读模式不构建单元格对象和样式，
+内存占用远小于完整加载工作簿。解析耗时和内存统计记录在stats中，由导入器写入导入摘要：
+- max_rss_mb: 解析完成时进程的常驻内存峰值（整个进程的高水位，开销可忽略）
+- peak_memory_mb: 解析期间Python新分配内存的峰值，仅在 IMPORT_TRACE_MEMORY 开启时统计
+  （tracemalloc会使解析耗时增加数倍）
+"""
+import sys
+import time
+import tracemalloc
+from pathlib import Path
+from typing import Any, Dict, Iterator, List, Optional, Tuple, Union
+
+import openpyxl
+
+from app.core.config import settings
+
+try:
+    import resource
+except ImportError:  # Windows
+    resource = None
+
+# 记录数据的起始列号（D列）
+DATA_START_COLUMN = 4
+
+
+def _is_blank(value: Any) -> bool:
+    return value is None or (isinstance(value, str) and not value.strip())
+
+
+def _max_rss_bytes() -> Optional[int]:
+    """进程常驻内存峰值（Linux下ru_maxrss单位为KB，macOS下为字节）"""
+    if resource is None:
+        return None
+    max_rss = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return max_rss if sys.platform == 'darwin' else max_rss * 1024
+
+
+class ParsedWorkbook:
+    """解析后的工作簿"""
+
+    def __init__(
+        self,
+        path: Union[str, Path],
+        rows: List[Tuple[Any, ...]],
+        key_column: int,
+        data_start_column: int,
+        parse_seconds: float,
+        peak_memory_bytes: Optional[int] = None,
+        max_rss_bytes: Optional[int] = None,
+    ):
+        """
+        Args:
+            path: 文件路径
+            rows: 字段行（关键列非空的行）的全部取值
+            key_column: 字段名所在列号（从1开始）
+            data_start_column: 记录数据的起始列号（从1开始）
+            parse_seconds: 解析耗时
+            peak_memory_bytes: 解析期间新分配内存的峰值（未统计时为None）
+            max_rss_bytes: 解析完成时进程的常驻内存峰值
+        """
+        self.path = Path(path)
+        self.key_column = key_column
+        self.data_start_column = data_start_column
+        self.parse_seconds = parse_seconds
+        self.peak_memory_bytes = peak_memory_bytes
+        self.max_rss_bytes = max_rss_bytes
+        self._rows = rows
+        self._column_count = max((len(row) for row in rows), default=0)
+
+    @property
+    def keys(self) -> List[str]:
+        """每个字段行关键列的取值（去除首尾空白）"""
+        return [str(row[self.key_column - 1]).strip() for row in self._rows]
+
+    def schema_rows(self) -> Iterator[Tuple[Any, ...]]:
+        """字段定义行：每个字段行A~C列的取值"""
+        for row in self._rows:
+            yield tuple(row[i] if i < len(row) else None for i in range(3))
+
+    def records(self) -> Iterator[Tuple[int, List[Any]]]:
+        """
+        转置后的记录
+
+        Yields:
+            (列号, 与字段行顺序一致的原始取值)，跳过所有取值都为空的列
+        """
+        for col_idx in range(self.data_start_column, self._column_count + 1):
+            values = [row[col_idx - 1] if col_idx - 1 < len(row) else None for row in self._rows]
+            if all(v is None for v in values):
+                continue
+            yield col_idx, values
+
+    @property
+    def stats(self) -> Dict[str, Any]:
+        """解析统计，用于导入摘要"""
+        return {
+            'file_name': self.path.name,
+            'field_count': len(self._rows),
+            'column_count': max(self._column_count - self.data_start_column + 1, 0),
+            'parse_seconds': round(self.parse_seconds, 3),
+            'peak_memory_mb': _to_mb(self.peak_memory_bytes),
+            'max_rss_mb': _to_mb(self.max_rss_bytes),
+        }
+
+
+def _to_mb(value: Optional[int]) -> Optional[float]:
+    return round(value / (1024 * 1024), 2) if value is not None else None
+
+
+def read_workbook(
+    path: Union[str, Path],
+    key_column: int = 1,
+    data_start_column: int = DATA_START_COLUMN,
+    trace_memory: Optional[bool] = None,
+) -> ParsedWorkbook:
+    """
+    以只读、仅取值模式读取工作簿的活动工作表
+
+    Args:
+        path: xlsx文件路径
+        key_column: 字段名所在列号，该列为空的行（分组标题、空行）不是字段行
+        data_start_column: 记录数据的起始列号
+        trace_memory: 是否用tracemalloc统计内存峰值，默认取 IMPORT_TRACE_MEMORY
+
+    Returns:
+        解析后的工作簿
+    """
+    if trace_memory is None:
+        trace_memory = settings.IMPORT_TRACE_MEMORY
+    started_tracing = trace_memory and not tracemalloc.is_tracing()
+    if started_tracing:
+        tracemalloc.start()
+    if trace_memory:
+        baseline, _ = tracemalloc.get_traced_memory()
+        tracemalloc.reset_peak()
+    started = time.perf_counter()
+
+    try:
+        wb = openpyxl.load_workbook(path, read_only=True, data_only=True)
+        try:
+            rows = [
+                row for row in wb.active.iter_rows(values_only=True)
+                if len(row) >= key_column and not _is_blank(row[key_column - 1])
+            ]
+        finally:
+            wb.close()
+        parse_seconds = time.perf_counter() - started
+        peak_memory = None
+        if trace_memory:
+            _, peak = tracemalloc.get_traced_memory()
+            peak_memory = max(peak - baseline, 0)
+    finally:
+        if started_tracing:
+            tracemalloc.stop()
+
+    return ParsedWorkbook(
+        path, rows, key_column, data_start_column, parse_seconds, peak_memory, _max_rss_bytes()
+    )
@@ -1,12 +1,18 @@
 import logging
 from pathlib import Path
+from typing import Any, Callable, Collection, Dict, List, Optional, Tuple
 from sqlalchemy.orm import Session
 from sqlalchemy import text, inspect
 
+from app.core.config import settings
 from app.db.base import Base, engine
+from app.db.import_manifest import file_content_hash, import_manifest
 from app.db.migration import run_database_migration
-from app.db.importers import import_basic_medical_insurance_data, import_insurance_products_data
-from app.db.importers.social_pension_insurance_importer import import_social_pension_insurance_data
+from app.db.schema_registry import product_schema_registry
+from app.db.importers import BasicMedicalInsuranceImporter, InsuranceProductImporter
+from app.db.importers.pipeline import ImportTask, run_import_pipeline
+from app.db.importers.social_pension_insurance_importer import SocialPensionInsuranceImporter
+from app.db.importers.workbook_reader import ParsedWorkbook
 from app.models.user import User
 from app.models.user_info import UserInfo
 from app.models.insurance_list import InsuranceList
@@ -16,10 +22,24 @@ from app.models.social_pension_insurance import SocialPensionInsurance
 
 logger = logging.getLogger(__name__)
 
+# 数据文件目录
+DATA_DIR = Path(__file__).resolve().parent.parent.parent / "datas"
+
+MEDICAL_DATA_FILE = "基本医保.xlsx"
+PENSION_DATA_FILE = "社会养老保险.xlsx"
+
+def data_file_names() -> List[str]:
+    """可导入的数据文件名（产品文件、基本医保、社会养老保险）"""
+    product_files = [xlsx_file for _, xlsx_file in InsuranceProductImporter.PRODUCT_TYPES.values()]
+    return product_files + [MEDICAL_DATA_FILE, PENSION_DATA_FILE]
+
 def clean_insurance_tables(engine) -> None:
     """
     清理旧的保险产品表，以便重新导入
     
+    只删除由导入器生成的 insurance_products_* 表（含卡片表），
+    insurance_list 等保存用户数据的表不受影响。
+    
     Args:
         engine: 数据库引擎
     """
@@ -29,10 +49,10 @@ def clean_insurance_tables(engine) -> None:
     inspector = inspect(engine)
     all_tables = inspector.get_table_names()
     
-    # 筛选出保险产品相关的表（新格式和旧格式）
+    # 筛选出保险产品表
     insurance_tables = [
         table for table in all_tables 
-        if table.startswith("insurance_products") or "insurance" in table.lower()
+        if table.startswith("insurance_products_")
     ]
     
     if not insurance_tables:
@@ -48,17 +68,122 @@ def clean_insurance_tables(engine) -> None:
             except Exception as e:
                 logger.error(f"删除表 {table} 失败: {str(e)}")
     
+    product_schema_registry.invalidate()
     logger.info(f"成功清理 {len(insurance_tables)} 个保险产品表")
 
+def changed_file_task(
+    target_table: str, excel_path: Path, key_column: int, import_workbook: Callable[[ParsedWorkbook], bool],
+    records: Optional[Callable[[], Optional[int]]] = None, skip_unchanged: bool = True
+) -> Optional[ImportTask]:
+    """
+    源文件内容与导入清单记录不一致时生成导入任务
+    
+    Args:
+        target_table: 目标表名
+        excel_path: 源文件路径
+        key_column: 字段名所在列号
+        import_workbook: 写入函数，接收解析后的文件，返回是否成功
+        records: 写入完成后返回写入的记录数
+        skip_unchanged: 为False时不检查导入清单，总是生成导入任务
+        
+    Returns:
+        导入任务；源文件未变化时返回None
+    """
+    content_hash = file_content_hash(excel_path)
+    if skip_unchanged and import_manifest.is_current(target_table, content_hash):
+        logger.info(f"源文件未变化，跳过导入: {target_table} ({excel_path.name})")
+        return None
+    
+    def load(workbook: ParsedWorkbook) -> bool:
+        import_manifest.forget(target_table)
+        if import_workbook(workbook):
+            logger.info(f"{target_table} 数据导入成功")
+            import_manifest.record(target_table, excel_path.name, content_hash)
+            return True
+        logger.error(f"{target_table} 数据导入失败")
+        return False
+    
+    return ImportTask(target_table, excel_path, load, key_column=key_column, records=records)
+
+def _import_with_summary(importer: Any) -> Callable[[ParsedWorkbook], bool]:
+    """导入后输出导入摘要（基本医保、社会养老保险导入器）"""
+    def import_workbook(workbook: ParsedWorkbook) -> bool:
+        success = importer.import_workbook(workbook)
+        if success:
+            logger.info(f"导入摘要: {importer.get_import_summary()}")
+        return success
+    return import_workbook
+
+def collect_import_tasks(
+    db: Session, data_dir: Path, skip_unchanged: bool = True, file_names: Optional[Collection[str]] = None
+) -> Tuple[List[ImportTask], Dict[str, Any]]:
+    """
+    收集数据目录中需要导入的文件，生成导入任务
+    
+    Args:
+        db: 数据库会话（基本医保、社会养老保险导入器使用）
+        data_dir: 数据文件目录
+        skip_unchanged: 跳过源文件内容与导入清单记录一致的表
+        file_names: 只导入这些文件，默认导入全部数据文件
+        
+    Returns:
+        (导入任务, 产品表导入摘要)
+    """
+    tasks = []
+    product_importer = InsuranceProductImporter(db)
+    summary = product_importer.new_summary()
+    if data_dir.exists():
+        tasks.extend(product_importer.import_tasks(
+            str(data_dir), summary, skip_unchanged=skip_unchanged, file_names=file_names
+        ))
+    
+    # 基本医保数据
+    if file_names is None or MEDICAL_DATA_FILE in file_names:
+        excel_path = data_dir / MEDICAL_DATA_FILE
+        if excel_path.exists():
+            medical_importer = BasicMedicalInsuranceImporter(db)
+            task = changed_file_task(
+                BasicMedicalInsurance.__tablename__, excel_path, medical_importer.KEY_COLUMN,
+                _import_with_summary(medical_importer), lambda: medical_importer.imported_count, skip_unchanged
+            )
+            if task:
+                tasks.append(task)
+        else:
+            logger.warning(f"基本医保数据文件不存在: {excel_path}")
+    
+    # 社会养老保险数据
+    if file_names is None or PENSION_DATA_FILE in file_names:
+        pension_excel_path = data_dir / PENSION_DATA_FILE
+        if pension_excel_path.exists():
+            pension_importer = SocialPensionInsuranceImporter(db)
+            task = changed_file_task(
+                SocialPensionInsurance.__tablename__, pension_excel_path, pension_importer.KEY_COLUMN,
+                _import_with_summary(pension_importer), lambda: pension_importer.imported_count, skip_unchanged
+            )
+            if task:
+                tasks.append(task)
+        else:
+            logger.warning(f"社会养老保险数据文件不存在: {pension_excel_path}")
+    
+    return tasks, summary
+
 def init_db(db: Session) -> None:
     """
     初始化数据库，创建表并导入数据
     
+    数据表只在源文件内容变化时重建（见导入清单），
+    设置 IMPORT_FORCE_REBUILD=true 时清理产品表并全部重新导入。
+    需要导入的文件通过导入流水线并行解析（IMPORT_WORKERS），逐个表写入。
+    
     Args:
         db: 数据库会话
     """
-    # 清理旧表
-    clean_insurance_tables(engine)
+    import_manifest.ensure_table()
+    
+    if settings.IMPORT_FORCE_REBUILD:
+        # 强制重建：清理旧表和导入清单
+        clean_insurance_tables(engine)
+        import_manifest.forget()
     
     logger.info("创建数据库表...")
     Base.metadata.create_all(bind=engine)
@@ -67,19 +192,29 @@ def init_db(db: Session) -> None:
     logger.info("执行数据库迁移...")
     run_database_migration(db)
     
-    logger.info("导入保险产品数据...")
-    # 获取数据文件目录路径
-    base_dir = Path(__file__).resolve().parent.parent.parent
-    data_dir = base_dir / "datas"
+    if not DATA_DIR.exists():
+        logger.warning(f"数据目录不存在: {DATA_DIR}")
     
-    # 导入保险产品数据
-    if data_dir.exists():
-        summary = import_insurance_products_data(db, str(data_dir))
-        logger.info(f"保险产品数据导入完成: 成功导入 {summary['successful_tables']}/{summary['total_tables']} 个表，共 {summary['total_records']} 条记录")
-        for product_type, info in summary['tables'].items():
-            logger.info(f"  - {product_type}: {info['table_name']} ({info['record_count']} 条记录)")
-    else:
-        logger.warning(f"数据目录不存在: {data_dir}")
+    # 收集导入任务（跳过源文件未变化的表）
+    tasks, summary = collect_import_tasks(db, DATA_DIR, skip_unchanged=True)
+    
+    # 并行解析、逐个写入
+    timings = run_import_pipeline(tasks)
+    
+    logger.info(f"保险产品数据导入完成: 成功导入 {summary['successful_tables']}/{summary['total_tables']} 个表，共 {summary['total_records']} 条记录")
+    for product_type, info in summary['tables'].items():
+        logger.info(f"  - {product_type}: {info['table_name']} ({info['record_count']} 条记录, {len(info['indexes'])} 个索引)")
+    if summary['skipped_tables']:
+        logger.info(f"源文件未变化，跳过 {len(summary['skipped_tables'])} 个表: {', '.join(summary['skipped_tables'])}")
+    
+    # 每个文件的耗时明细
+    for timing in timings:
+        logger.info(
+            f"  - {timing['name']} ({timing['file_name']}): "
+            f"{'成功' if timing['success'] else '失败'}, 解析 {timing['parse_seconds']}s, "
+            f"等待 {timing['wait_seconds']}s, 写入 {timing['load_seconds']}s, "
+            f"完成于 {timing['finished_at']}s, 解析进程内存峰值 {timing['max_rss_mb']}MB"
+        )
     
     # 验证表是否成功创建
     inspector = inspect(engine)
@@ -88,30 +223,6 @@ def init_db(db: Session) -> None:
     
     logger.info(f"数据库中的保险相关表 ({len(insurance_tables)}): {', '.join(insurance_tables)}")
     
-    # 导入基本医保数据
-    logger.info("导入基本医保数据...")
-    excel_path = base_dir / "datas" / "基本医保.xlsx"
-    if excel_path.exists():
-        success = import_basic_medical_insurance_data(db, str(excel_path))
-        if success:
-            logger.info("基本医保数据导入成功")
-        else:
-            logger.error("基本医保数据导入失败")
-    else:
-        logger.warning(f"基本医保数据文件不存在: {excel_path}")
-    
-    # 导入社会养老保险数据
-    logger.info("导入社会养老保险数据...")
-    pension_excel_path = base_dir / "datas" / "社会养老保险.xlsx"
-    if pension_excel_path.exists():
-        success = import_social_pension_insurance_data(db, str(pension_excel_path))
-        if success:
-            logger.info("社会养老保险数据导入成功")
-        else:
-            logger.error("社会养老保险数据导入失败")
-    else:
-        logger.warning(f"社会养老保险数据文件不存在: {pension_excel_path}")
-    
     # 添加测试用户，如果不存在
     create_test_user(db)
     
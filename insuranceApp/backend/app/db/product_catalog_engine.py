@@ -0,0 +1,326 @@
+"""
+保险产品内存列式检索引擎
+
+产品目录表规模小、只在导入时变化，可以整表加载到内存：数值/布尔列转为NumPy数组，
+文本和JSON列按字典编码（去重后的取值列表 + 每行的取值编号），搜索时对整列做向量化
+过滤、排序和分页，不访问数据库。启用方式：PRODUCT_SEARCH_ENGINE=memory。
+"""
+import bisect
+import json
+import logging
+import re
+import threading
+from decimal import Decimal
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
+import numpy as np
+from sqlalchemy import text
+
+from app.db.base import engine
+from app.db.product_filters import CompiledFilter, type_category
+from app.db.schema_registry import ProductTableSchema, product_schema_registry
+
+logger = logging.getLogger(__name__)
+
+
+def _like_to_regex(pattern: str, ignore_case: bool) -> "re.Pattern":
+    """将SQL LIKE模式（反斜杠转义）转换为正则表达式"""
+    parts = []
+    escaped = False
+    for char in pattern:
+        if escaped:
+            parts.append(re.escape(char))
+            escaped = False
+        elif char == '\\':
+            escaped = True
+        elif char == '%':
+            parts.append('.*')
+        elif char == '_':
+            parts.append('.')
+        else:
+            parts.append(re.escape(char))
+    flags = re.S | (re.I if ignore_case else 0)
+    return re.compile(''.join(parts) + r'\Z', flags)
+
+
+def _json_contains(container: Any, contained: Any) -> bool:
+    """与PostgreSQL jsonb @> 运算符语义一致的包含判断"""
+    if isinstance(contained, dict):
+        if not isinstance(container, dict):
+            return False
+        return all(
+            key in container and _json_contains(container[key], value)
+            for key, value in contained.items()
+        )
+    if isinstance(contained, list):
+        if not isinstance(container, list):
+            return False
+        return all(
+            any(_json_contains(item, value) for item in container)
+            for value in contained
+        )
+    return container == contained
+
+
+def _dump_json(value: Any) -> str:
+    """JSON值的文本形式（与游标编码一致）"""
+    return json.dumps(value, ensure_ascii=False)
+
+
+class _DictionaryColumn:
+    """字典编码列：去重后的取值 + 每行取值编号（NULL为-1）"""
+
+    def __init__(self, values: List[Any], key_func: Callable[[Any], Any]):
+        self.keys: List[Any] = []      # 去重后的文本取值
+        self.objects: List[Any] = []   # 与keys对应的原始取值
+        positions: Dict[Any, int] = {}
+        codes = np.full(len(values), -1, dtype=np.int32)
+        for row_idx, value in enumerate(values):
+            if value is None:
+                continue
+            key = key_func(value)
+            code = positions.get(key)
+            if code is None:
+                code = positions[key] = len(self.keys)
+                self.keys.append(key)
+                self.objects.append(value)
+            codes[row_idx] = code
+        self.codes = codes
+
+        # 按取值排序后的名次，用于排序和游标比较
+        order = sorted(range(len(self.keys)), key=lambda i: self.keys[i])
+        ranks = np.empty(len(self.keys), dtype=np.float64)
+        ranks[order] = np.arange(len(self.keys), dtype=np.float64)
+        self.sorted_keys = [self.keys[i] for i in order]
+        self.row_ranks = np.append(ranks, np.nan)[codes]
+
+    def rows_where(self, value_mask: np.ndarray) -> np.ndarray:
+        """将按取值计算的布尔结果映射到每一行（NULL行为False）"""
+        return np.append(value_mask, False)[self.codes]
+
+    def rank_of(self, key: Any) -> float:
+        """取值在排序中的位置；不存在时返回相邻两个名次之间的值"""
+        pos = bisect.bisect_left(self.sorted_keys, key)
+        if pos < len(self.sorted_keys) and self.sorted_keys[pos] == key:
+            return float(pos)
+        return pos - 0.5
+
+
+class ColumnarProductTable:
+    """单个产品表的列式快照"""
+
+    def __init__(self, schema: ProductTableSchema, columns: List[str], rows: List[tuple]):
+        self.schema = schema
+        self.version = schema.version
+        self.columns = columns
+        self.rows = rows
+        self.size = len(rows)
+
+        self.product_ids = np.array(
+            [row[columns.index('product_id')] for row in rows], dtype=np.int64
+        )
+        self.numeric: Dict[str, np.ndarray] = {}
+        self.booleans: Dict[str, np.ndarray] = {}
+        self.dictionaries: Dict[str, _DictionaryColumn] = {}
+        self.categories: Dict[str, str] = {}
+
+        for idx, column in enumerate(columns):
+            category = type_category(schema.types.get(column))
+            self.categories[column] = category
+            values = [row[idx] for row in rows]
+            if category == 'numeric':
+                self.numeric[column] = np.array(
+                    [np.nan if v is None else float(v) for v in values], dtype=np.float64
+                )
+            elif category == 'boolean':
+                # 1/0，NULL为NaN
+                self.booleans[column] = np.array(
+                    [np.nan if v is None else float(bool(v)) for v in values], dtype=np.float64
+                )
+            elif category == 'json':
+                self.dictionaries[column] = _DictionaryColumn(values, _dump_json)
+            else:
+                self.dictionaries[column] = _DictionaryColumn(values, str)
+
+    def _sort_keys(self, column: str) -> np.ndarray:
+        """列的可比较数值键（文本/JSON为字典名次），NULL为NaN"""
+        if column in self.numeric:
+            return self.numeric[column]
+        if column in self.booleans:
+            return self.booleans[column]
+        return self.dictionaries[column].row_ranks
+
+    def _cursor_key(self, column: str, value: Any) -> float:
+        """将游标中的排序字段值转换到排序键空间"""
+        if column in self.numeric:
+            return float(Decimal(str(value)))
+        if column in self.booleans:
+            return float(bool(value))
+        return self.dictionaries[column].rank_of(str(value))
+
+    def _predicate_mask(self, field: str, kind: str, value: Any) -> np.ndarray:
+        """计算单个谓词的行掩码，语义与product_filters生成的SQL一致"""
+        if kind.startswith('num_'):
+            keys = self.numeric[field]
+            number = float(value)
+            with np.errstate(invalid='ignore'):
+                if kind == 'num_gte':
+                    return keys >= number
+                if kind == 'num_lte':
+                    return keys <= number
+                if kind == 'num_gt':
+                    return keys > number
+                if kind == 'num_lt':
+                    return keys < number
+                return keys == number
+
+        if kind == 'bool_eq':
+            return self.booleans[field] == float(value)
+
+        column = self.dictionaries[field]
+        if kind == 'text_eq':
+            matches = np.array([key == value for key in column.keys], dtype=bool)
+        elif kind == 'json_contains':
+            contained = json.loads(value)
+            matches = np.array(
+                [_json_contains(obj, contained) for obj in column.objects], dtype=bool
+            )
+        else:
+            # text_contains / text_prefix / any_text_contains
+            pattern = _like_to_regex(value, ignore_case=kind != 'text_prefix')
+            matches = np.array([bool(pattern.match(key)) for key in column.keys], dtype=bool)
+        return column.rows_where(matches)
+
+    def filter_mask(self, compiled_filter: CompiledFilter) -> np.ndarray:
+        """计算满足全部过滤条件的行掩码"""
+        mask = np.ones(self.size, dtype=bool)
+        for idx, (field, kind) in enumerate(compiled_filter.shape):
+            mask &= self._predicate_mask(field, kind, compiled_filter.params[f"f{idx}"])
+        return mask
+
+    def search(
+        self,
+        compiled_filter: CompiledFilter,
+        sort_by: Optional[str],
+        order_direction: str,
+        cursor_key: Optional[Tuple[Any, int]],
+        offset: int,
+        limit: int,
+        with_total: bool,
+        restrict_ids: Optional[List[int]] = None,
+        rank_ids: Optional[List[int]] = None,
+    ) -> Tuple[List[str], List[tuple], Optional[int]]:
+        """
+        在内存中过滤、排序和分页，参数和返回值与SQL路径一致
+
+        Returns:
+            (列名列表, 行列表, 总记录数（未计算时为None）)
+        """
+        mask = self.filter_mask(compiled_filter)
+        if restrict_ids is not None:
+            mask &= np.isin(self.product_ids, restrict_ids)
+        total_count = int(mask.sum()) if with_total else None
+
+        # 按给定的相关度顺序返回
+        if rank_ids is not None:
+            positions = {product_id: pos for pos, product_id in enumerate(rank_ids)}
+            selected = np.flatnonzero(mask & np.isin(self.product_ids, rank_ids))
+            ranked = sorted(selected, key=lambda i: positions[int(self.product_ids[i])])
+            return list(self.columns), [self.rows[i] for i in ranked[offset:offset + limit]], total_count
+
+        descending = order_direction == "DESC" and sort_by is not None
+        ids = -self.product_ids if descending else self.product_ids
+
+        # 游标条件：与SQL的 ORDER BY sort_by NULLS LAST, product_id 保持一致
+        if cursor_key is not None:
+            cursor_value, cursor_id = cursor_key
+            cursor_ids = -cursor_id if descending else cursor_id
+            if not sort_by:
+                mask &= ids > cursor_ids
+            else:
+                keys = self._sort_keys(sort_by)
+                keys = -keys if descending else keys
+                nulls = np.isnan(keys)
+                if cursor_value is None:
+                    mask &= nulls & (ids > cursor_ids)
+                else:
+                    key = self._cursor_key(sort_by, cursor_value)
+                    key = -key if descending else key
+                    with np.errstate(invalid='ignore'):
+                        after = (keys > key) | ((keys == key) & (ids > cursor_ids)) | nulls
+                    mask &= after
+
+        selected = np.flatnonzero(mask)
+        if sort_by:
+            keys = self._sort_keys(sort_by)[selected]
+            keys = -keys if descending else keys
+            nulls = np.isnan(keys)
+            keys = np.where(nulls, 0.0, keys)
+            # lexsort以最后一个键为主键：先NULL置后，再按排序键，最后按product_id
+            order = np.lexsort((ids[selected], keys, nulls))
+        else:
+            order = np.argsort(ids[selected], kind='stable')
+        page_rows = selected[order][offset:offset + limit]
+
+        return list(self.columns), [self.rows[i] for i in page_rows], total_count
+
+
+class ProductCatalogEngine:
+    """
+    内存产品目录
+
+    每个表的快照记录构建时的表结构版本；导入器使注册表失效后版本变化，
+    下一次访问会自动重新加载该表。
+    """
+
+    def __init__(self) -> None:
+        self._lock = threading.Lock()
+        self._tables: Dict[str, ColumnarProductTable] = {}
+
+    def get(self, product_type: str) -> Optional[ColumnarProductTable]:
+        """
+        获取产品表的列式快照，版本过期时重新加载
+
+        Returns:
+            列式快照；表不存在或加载失败时返回None（调用方回退到SQL）
+        """
+        schema = product_schema_registry.get(product_type)
+        if not schema.exists:
+            return None
+
+        table = self._tables.get(product_type)
+        if table is not None and table.version == schema.version:
+            return table
+
+        with self._lock:
+            table = self._tables.get(product_type)
+            if table is None or table.version != schema.version:
+                table = self._load(schema)
+                if table is None:
+                    self._tables.pop(product_type, None)
+                else:
+                    self._tables[product_type] = table
+            return table
+
+    def _load(self, schema: ProductTableSchema) -> Optional[ColumnarProductTable]:
+        """从数据库加载整表"""
+        try:
+            with engine.connect() as conn:
+                result = conn.execute(text(f"SELECT * FROM {schema.table_name} ORDER BY product_id"))
+                columns = list(result.keys())
+                rows = [tuple(row) for row in result]
+            table = ColumnarProductTable(schema, columns, rows)
+            logger.info(f"已加载内存产品目录: {schema.table_name} ({table.size} 条记录, 版本 {schema.version})")
+            return table
+        except Exception as e:
+            logger.error(f"加载内存产品目录失败: {schema.table_name}, {e}")
+            return None
+
+    def warm(self, product_types: List[str]) -> None:
+        """预加载产品表"""
+        for product_type in product_types:
+            self.get(product_type)
+
+
+# 全局内存产品目录实例
+product_catalog_engine = ProductCatalogEngine()
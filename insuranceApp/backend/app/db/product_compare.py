@@ -0,0 +1,156 @@
+"""
+保险产品对比 - 将同一类型的多个产品按字段对齐为矩阵，并标记取值不同的字段
+
+对比前统一取值形式，使其可以直接比较：
+- 数值：去掉多余的小数位（18.00 与 18 视为相同），整数输出为int
+- JSON：字符串形式的JSON先解析，按键排序后比较
+- 文本：统一全角/半角并合并空白
+"""
+import json
+import re
+import unicodedata
+from decimal import Decimal
+from typing import Any, Dict, List, Optional, Sequence, Tuple
+
+from app.db.product_filters import type_category
+from app.db.schema_registry import ProductTableSchema
+
+# 单次对比的产品数量范围
+MIN_COMPARE_PRODUCTS = 2
+MAX_COMPARE_PRODUCTS = 10
+
+_WHITESPACE = re.compile(r'\s+')
+
+
+def _normalize_numeric(value: Any) -> Any:
+    if value is None:
+        return None
+    number = value if isinstance(value, Decimal) else Decimal(str(value))
+    if not number.is_finite():
+        return None
+    number = number.normalize()
+    if number == number.to_integral_value():
+        return int(number)
+    return float(number)
+
+
+def _normalize_json(value: Any) -> Any:
+    if isinstance(value, str):
+        try:
+            return json.loads(value)
+        except ValueError:
+            return _normalize_text(value)
+    return value
+
+
+def _normalize_text(value: Any) -> Any:
+    if value is None:
+        return None
+    normalized = _WHITESPACE.sub(' ', unicodedata.normalize('NFKC', str(value))).strip()
+    return normalized or None
+
+
+def normalize_value(category: str, value: Any) -> Any:
+    """
+    将字段取值转换为可直接比较的形式
+
+    Args:
+        category: 字段类型分类（numeric / boolean / text / json / other）
+        value: 数据库中的原始取值
+    """
+    if category == 'numeric':
+        return _normalize_numeric(value)
+    if category == 'json':
+        return _normalize_json(value)
+    if category == 'boolean':
+        return value
+    return _normalize_text(value)
+
+
+def _comparison_key(value: Any) -> str:
+    """取值的规范化文本形式（JSON对象按键排序），用于判断是否相同"""
+    return json.dumps(value, ensure_ascii=False, sort_keys=True, default=str)
+
+
+def build_comparison(
+    schema: ProductTableSchema,
+    columns: Sequence[str],
+    rows: Sequence[Sequence[Any]],
+    only_diff: bool = False,
+    include_empty: bool = False,
+) -> List[Dict[str, Any]]:
+    """
+    构建按字段对齐的对比矩阵
+
+    Args:
+        schema: 产品表结构
+        columns: 查询结果的列名
+        rows: 按对比顺序排列的产品行
+        only_diff: 只返回取值不同的字段
+        include_empty: 是否返回所有产品都为空的字段
+
+    Returns:
+        字段列表，每项包含field、description（中文字段名）、type、differs和values（与rows顺序对齐）
+    """
+    matrix = []
+    for idx, column in enumerate(columns):
+        if column == 'product_id':
+            continue
+        category = type_category(schema.types.get(column))
+        values = [normalize_value(category, row[idx]) for row in rows]
+        if not include_empty and all(value is None for value in values):
+            continue
+
+        differs = len({_comparison_key(value) for value in values}) > 1
+        if only_diff and not differs:
+            continue
+
+        matrix.append({
+            'field': column,
+            'description': schema.desc_map.get(column, column),
+            'type': category,
+            'differs': differs,
+            'values': values,
+        })
+    return matrix
+
+
+def dedupe_product_ids(product_ids: Sequence[int]) -> List[int]:
+    """去除重复的产品ID，保持原有顺序"""
+    seen = set()
+    result = []
+    for product_id in product_ids:
+        if product_id not in seen:
+            seen.add(product_id)
+            result.append(product_id)
+    return result
+
+
+def order_rows(
+    columns: Sequence[str], rows: Sequence[Sequence[Any]], product_ids: Sequence[int]
+) -> Tuple[List[Sequence[Any]], List[int]]:
+    """
+    按请求的产品顺序排列查询结果
+
+    Returns:
+        (排好序的行, 未找到的产品ID)
+    """
+    id_idx = list(columns).index('product_id') if columns else 0
+    by_id: Dict[int, Sequence[Any]] = {row[id_idx]: row for row in rows}
+    ordered = [by_id[product_id] for product_id in product_ids if product_id in by_id]
+    missing = [product_id for product_id in product_ids if product_id not in by_id]
+    return ordered, missing
+
+
+def product_summary(
+    columns: Sequence[str], row: Sequence[Any], common_columns: Dict[str, Optional[str]]
+) -> Dict[str, Any]:
+    """对比矩阵中每列对应产品的标识信息"""
+    values = dict(zip(columns, row))
+    name_column = common_columns.get('product_name')
+    insurer_column = common_columns.get('insurer')
+    return {
+        'product_id': values.get('product_id'),
+        'product_name': values.get(name_column) if name_column else None,
+        'insurer': values.get(insurer_column) if insurer_column else None,
+    }
@@ -0,0 +1,196 @@
+"""
+保险产品搜索总数估算
+
+COUNT(*) 需要完整扫描满足条件的记录，而页码指示器并不需要精确总数。count_mode=estimated时：
+1. 相同条件已有精确总数（之前的请求或后台补算的结果）时直接使用
+2. 无筛选条件时使用ANALYZE后的表行数（pg_class.reltuples）
+3. 否则使用查询计划器的行数估计，并按该筛选结构（字段+谓词种类）历史上"精确值/估计值"的比例校正；
+   这种估计置信度低，会在后台补算精确总数，同一条件的下一页请求即可拿到精确值
+"""
+import json
+import logging
+import threading
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Dict, Optional, Tuple
+
+from sqlalchemy import text
+from sqlalchemy.engine import Connection
+
+from app.db.base import engine
+from app.db.product_filters import CompiledFilter
+from app.db.schema_registry import ProductTableSchema
+
+logger = logging.getLogger(__name__)
+
+COUNT_MODES = ('exact', 'estimated', 'none')
+
+# 缓存的精确总数条目上限
+MAX_CACHED_COUNTS = 4096
+
+# 记录校正比例的筛选结构数量上限
+MAX_LEARNED_SHAPES = 1024
+
+# 后台补算精确总数的线程数
+REFINE_WORKERS = 2
+
+
+def _filter_key(schema: ProductTableSchema, compiled_filter: CompiledFilter) -> Tuple:
+    # 取值可能是列表（in运算），用repr作为键；基础表和卡片表的总数相同，键中不区分
+    params = tuple((name, repr(value)) for name, value in sorted(compiled_filter.params.items()))
+    return (schema.product_type, schema.version, compiled_filter.shape, params)
+
+
+class ProductCountEstimator:
+    """搜索总数估算器"""
+
+    def __init__(self) -> None:
+        self._lock = threading.Lock()
+        # 精确总数：筛选条件 -> 记录数
+        self._exact: "OrderedDict[Tuple, int]" = OrderedDict()
+        # 计划器估计的校正比例：(产品类型, 表结构版本, 筛选结构) -> (比例之和, 样本数)
+        self._ratios: "OrderedDict[Tuple, Tuple[float, int]]" = OrderedDict()
+        self._pending: set = set()
+        self._executor: Optional[ThreadPoolExecutor] = None
+
+    def record_exact(self, schema: ProductTableSchema, compiled_filter: CompiledFilter, count: int) -> None:
+        """记录精确总数（精确计数的请求和后台补算都会调用）"""
+        key = _filter_key(schema, compiled_filter)
+        with self._lock:
+            self._exact[key] = count
+            self._exact.move_to_end(key)
+            while len(self._exact) > MAX_CACHED_COUNTS:
+                self._exact.popitem(last=False)
+
+    def _cached_exact(self, key: Tuple) -> Optional[int]:
+        with self._lock:
+            count = self._exact.get(key)
+            if count is not None:
+                self._exact.move_to_end(key)
+            return count
+
+    def _ratio(self, schema: ProductTableSchema, compiled_filter: CompiledFilter) -> float:
+        with self._lock:
+            total, samples = self._ratios.get(
+                (schema.product_type, schema.version, compiled_filter.shape), (0.0, 0)
+            )
+        return total / samples if samples else 1.0
+
+    def _learn_ratio(
+        self, schema: ProductTableSchema, compiled_filter: CompiledFilter, planned: int, exact: int
+    ) -> None:
+        key = (schema.product_type, schema.version, compiled_filter.shape)
+        ratio = (exact + 1) / (planned + 1)
+        with self._lock:
+            if key not in self._ratios:
+                # 表结构版本变化后丢弃该产品类型的旧比例（重新导入后数据分布可能不同）
+                for stale in [k for k in self._ratios if k[0] == key[0] and k[1] != key[1]]:
+                    del self._ratios[stale]
+            total, samples = self._ratios.get(key, (0.0, 0))
+            self._ratios[key] = (total + ratio, samples + 1)
+            self._ratios.move_to_end(key)
+            while len(self._ratios) > MAX_LEARNED_SHAPES:
+                self._ratios.popitem(last=False)
+
+    @staticmethod
+    def _planner_rows(conn: Connection, table_name: str, compiled_filter: CompiledFilter) -> int:
+        """查询计划器估计的行数（只做计划，不执行查询）"""
+        where_sql = f"WHERE {compiled_filter.sql}" if compiled_filter.sql else ""
+        plan: Any = conn.execute(
+            text(f"EXPLAIN (FORMAT JSON) SELECT 1 FROM {table_name} {where_sql}"),
+            compiled_filter.params
+        ).scalar()
+        if isinstance(plan, str):
+            plan = json.loads(plan)
+        return int(plan[0]['Plan']['Plan Rows'])
+
+    @staticmethod
+    def _table_rows(conn: Connection, table_name: str) -> Optional[int]:
+        """ANALYZE统计的表行数，未分析过时返回None"""
+        reltuples = conn.execute(
+            text("SELECT reltuples FROM pg_class WHERE relname = :table_name"),
+            {"table_name": table_name}
+        ).scalar()
+        if reltuples is None or reltuples < 0:
+            return None
+        return int(reltuples)
+
+    def estimate(
+        self, schema: ProductTableSchema, table_name: str, compiled_filter: CompiledFilter
+    ) -> Tuple[int, bool]:
+        """
+        估算满足条件的记录数
+
+        Returns:
+            (记录数, 是否为精确值)
+        """
+        key = _filter_key(schema, compiled_filter)
+        cached = self._cached_exact(key)
+        if cached is not None:
+            return cached, True
+
+        with engine.connect() as conn:
+            if not compiled_filter.sql:
+                table_rows = self._table_rows(conn, table_name)
+                if table_rows is not None:
+                    return table_rows, False
+            planned = self._planner_rows(conn, table_name, compiled_filter)
+
+        estimate = max(0, int(round(planned * self._ratio(schema, compiled_filter))))
+        self._schedule_refine(key, schema, table_name, compiled_filter, planned)
+        return estimate, False
+
+    def _schedule_refine(
+        self,
+        key: Tuple,
+        schema: ProductTableSchema,
+        table_name: str,
+        compiled_filter: CompiledFilter,
+        planned: int,
+    ) -> None:
+        """在后台补算精确总数（同一条件只补算一次）"""
+        with self._lock:
+            if key in self._pending:
+                return
+            self._pending.add(key)
+            if self._executor is None:
+                self._executor = ThreadPoolExecutor(
+                    max_workers=REFINE_WORKERS, thread_name_prefix="count-refine"
+                )
+        self._executor.submit(self._refine, key, schema, table_name, compiled_filter, planned)
+
+    def _refine(
+        self,
+        key: Tuple,
+        schema: ProductTableSchema,
+        table_name: str,
+        compiled_filter: CompiledFilter,
+        planned: int,
+    ) -> None:
+        try:
+            where_sql = f"WHERE {compiled_filter.sql}" if compiled_filter.sql else ""
+            with engine.connect() as conn:
+                count = conn.execute(
+                    text(f"SELECT COUNT(*) FROM {table_name} {where_sql}"), compiled_filter.params
+                ).scalar_one()
+            self.record_exact(schema, compiled_filter, count)
+            self._learn_ratio(schema, compiled_filter, planned, count)
+            logger.debug(f"已补算搜索总数: {table_name} {compiled_filter.shape} 估计 {planned}, 精确 {count}")
+        except Exception as e:
+            logger.warning(f"补算搜索总数失败: {table_name}, {e}")
+        finally:
+            with self._lock:
+                self._pending.discard(key)
+
+    def stats(self) -> Dict[str, Any]:
+        """估算器统计信息"""
+        with self._lock:
+            return {
+                'cached_counts': len(self._exact),
+                'learned_shapes': len(self._ratios),
+                'pending_refines': len(self._pending),
+            }
+
+
+# 全局搜索总数估算器实例
+product_count_estimator = ProductCountEstimator()
@@ -0,0 +1,190 @@
+"""
+保险产品目录批量导出（NDJSON / CSV）
+
+合作方和分析任务需要拉取整个产品目录。按页调用/search时每页都要重新计算COUNT和OFFSET；
+导出接口改用服务端游标按批读取，每批编码后立即写出，内存占用与表的大小无关。
+筛选条件与/search使用相同的语法（compile_filters）。
+
+流式响应开始后无法再返回400，因此导出分两步：
+prepare_export在访问数据之前校验产品类型、筛选条件和字段，stream_export再逐批读取和编码。
+"""
+import csv
+import io
+import json
+import logging
+from datetime import date, datetime
+from decimal import Decimal
+from typing import Any, Dict, Iterator, List, Optional, Sequence
+
+from sqlalchemy import TextClause, text
+
+from app.db.base import engine
+from app.db.crud.insurance_product import is_product_type
+from app.db.product_filters import CompiledFilter, ProductSearchError, compile_filters
+from app.db.product_serializer import dumps, get_row_serializer
+from app.db.schema_registry import ProductTableSchema, product_schema_registry
+
+logger = logging.getLogger(__name__)
+
+EXPORT_FORMATS = ('ndjson', 'csv')
+
+# 导出所有产品类型时的product_type取值
+ALL_PRODUCT_TYPES = 'all'
+
+# 服务端游标每批读取的行数
+EXPORT_BATCH_ROWS = 1000
+
+MEDIA_TYPES = {
+    'ndjson': 'application/x-ndjson',
+    'csv': 'text/csv; charset=utf-8',
+}
+
+
+class ExportPlan:
+    """单个产品表的导出计划（已校验的筛选条件和导出列）"""
+
+    def __init__(self, schema: ProductTableSchema, compiled_filter: CompiledFilter, columns: List[str]):
+        self.schema = schema
+        self.compiled_filter = compiled_filter
+        self.columns = columns
+
+    @property
+    def query(self) -> TextClause:
+        where_sql = f"WHERE {self.compiled_filter.sql}" if self.compiled_filter.sql else ""
+        return text(
+            f"SELECT {', '.join(self.columns)} FROM {self.schema.table_name} {where_sql} ORDER BY product_id"
+        )
+
+
+def _export_columns(schema: ProductTableSchema, fields: Optional[str]) -> List[str]:
+    """导出列：默认全部列，fields指定时只导出指定列（product_id始终在最前）"""
+    if fields is None or not fields.strip():
+        return list(schema.column_names)
+
+    columns = ['product_id']
+    for field in fields.split(','):
+        field = field.strip()
+        if not field or field in columns:
+            continue
+        if field not in schema.types:
+            raise ProductSearchError(f"无效的导出字段: {field}")
+        columns.append(field)
+    return columns
+
+
+def prepare_export(
+    product_types: Sequence[str],
+    filters: Dict[str, Any],
+    fields: Optional[str] = None,
+    skip_missing_fields: bool = False,
+) -> List[ExportPlan]:
+    """
+    校验导出参数并生成每个产品表的导出计划
+
+    Args:
+        product_types: 要导出的产品类型
+        filters: 筛选条件（与/search相同的语法）
+        fields: 逗号分隔的导出字段，为空则导出全部字段
+        skip_missing_fields: 导出多个产品类型时，跳过缺少筛选/导出字段的产品表（否则返回400）
+
+    Raises:
+        ProductSearchError: 产品类型不存在、筛选条件或字段无效
+    """
+    plans = []
+    for product_type in product_types:
+        if not is_product_type(product_type):
+            raise ProductSearchError(f"无效的产品类型: {product_type}")
+        schema = product_schema_registry.get(product_type)
+        if not schema.exists:
+            if skip_missing_fields:
+                continue
+            raise ProductSearchError(f"无效的产品类型: {product_type}")
+
+        applicable = {field: value for field, value in filters.items() if field in schema.types}
+        if skip_missing_fields and len(applicable) < len(filters):
+            continue
+        try:
+            plans.append(ExportPlan(
+                schema, compile_filters(schema, filters), _export_columns(schema, fields)
+            ))
+        except ProductSearchError:
+            if not skip_missing_fields:
+                raise
+    return plans
+
+
+def _csv_cell(value: Any) -> Any:
+    """CSV单元格取值：空值为空字符串，JSON按紧凑格式输出"""
+    if value is None:
+        return ''
+    if isinstance(value, bool):
+        return 'true' if value else 'false'
+    if isinstance(value, (dict, list)):
+        return json.dumps(value, ensure_ascii=False, separators=(',', ':'))
+    if isinstance(value, (datetime, date)):
+        return value.isoformat()
+    if isinstance(value, Decimal):
+        return str(value)
+    return value
+
+
+def _iter_batches(plan: ExportPlan) -> Iterator[Sequence[Any]]:
+    """使用服务端游标按批读取产品表"""
+    with engine.connect() as conn:
+        result = conn.execution_options(
+            stream_results=True, max_row_buffer=EXPORT_BATCH_ROWS
+        ).execute(plan.query, plan.compiled_filter.params)
+        while True:
+            rows = result.fetchmany(EXPORT_BATCH_ROWS)
+            if not rows:
+                break
+            yield rows
+
+
+def _stream_ndjson(plans: List[ExportPlan], with_type: bool) -> Iterator[bytes]:
+    for plan in plans:
+        serializer = get_row_serializer(plan.schema, plan.columns)
+        # 导出多个产品类型时，每行末尾追加product_type
+        suffix = b',"product_type":' + dumps(plan.schema.product_type) + b'}\n' if with_type else b'}\n'
+        for rows in _iter_batches(plan):
+            yield b''.join(b'{' + serializer.encode_fields(row) + suffix for row in rows)
+
+
+def _stream_csv(plan: ExportPlan) -> Iterator[bytes]:
+    serializer = get_row_serializer(plan.schema, plan.columns)
+    buffer = io.StringIO()
+    writer = csv.writer(buffer)
+
+    # UTF-8 BOM，Excel打开时正确识别中文
+    buffer.write('\ufeff')
+    writer.writerow(serializer.keys)
+    for rows in _iter_batches(plan):
+        for row in rows:
+            writer.writerow([_csv_cell(value) for value in serializer.to_dict(row).values()])
+        yield buffer.getvalue().encode('utf-8')
+        buffer.seek(0)
+        buffer.truncate()
+
+    if buffer.tell():
+        yield buffer.getvalue().encode('utf-8')
+
+
+def stream_export(plans: List[ExportPlan], export_format: str, with_type: bool = False) -> Iterator[bytes]:
+    """
+    逐批生成导出内容
+
+    Args:
+        plans: prepare_export生成的导出计划
+        export_format: ndjson 或 csv（csv只支持单个产品类型）
+        with_type: NDJSON每行是否包含product_type
+    """
+    try:
+        if export_format == 'csv':
+            for plan in plans:
+                yield from _stream_csv(plan)
+        else:
+            yield from _stream_ndjson(plans, with_type)
+    except Exception as e:
+        # 响应已经开始，只能中断输出；客户端通过不完整的内容发现错误
+        logger.error(f"导出产品目录失败: {e}")
+        raise
@@ -0,0 +1,378 @@
+"""
+保险产品分面统计 - 为客户端筛选面板提供字段取值分布
+
+- 数值列：最小值、最大值和等宽直方图
+- 布尔列和低基数文本列（如保险公司、返还类型）：各取值的记录数
+
+全目录（无筛选条件）的分面在导入时预先计算，按产品表结构版本缓存，打开筛选面板不再访问数据库；
+带筛选条件的分面沿用全目录分面的字段和分桶边界，保证筛选前后的直方图可以直接对比。
+"""
+import logging
+import threading
+from typing import Any, Dict, List, Optional, Tuple
+
+import numpy as np
+from sqlalchemy import text
+from sqlalchemy.engine import Connection
+
+from app.core.config import settings
+from app.db.base import engine
+from app.db.crud.insurance_product import is_product_type
+from app.db.product_catalog_engine import ColumnarProductTable, product_catalog_engine
+from app.db.product_filters import CompiledFilter, ProductSearchError, compile_filters, type_category
+from app.db.schema_registry import ProductTableSchema, product_schema_registry
+
+logger = logging.getLogger(__name__)
+
+# 文本列不同取值数不超过该值时才统计取值分布
+FACET_MAX_DISTINCT = 30
+
+# 直方图默认分桶数和最大分桶数
+DEFAULT_BUCKETS = 10
+MAX_BUCKETS = 50
+
+# 全目录分面缓存：(产品类型, 分桶数) -> (表结构版本, 分面结果)
+_catalog_facets: Dict[Tuple[str, int], Tuple[int, Dict[str, Any]]] = {}
+_catalog_facets_lock = threading.Lock()
+
+
+def _to_float(value: Any) -> Optional[float]:
+    return None if value is None else float(value)
+
+
+def _bucket_edges(lower: float, upper: float, buckets: int) -> List[Tuple[float, float]]:
+    """等宽分桶边界；最小值等于最大值时只有一个桶"""
+    if lower == upper:
+        return [(lower, upper)]
+    width = (upper - lower) / buckets
+    return [(lower + width * i, upper if i == buckets - 1 else lower + width * (i + 1)) for i in range(buckets)]
+
+
+def _facet_entry(schema: ProductTableSchema, field: str, facet_type: str) -> Dict[str, Any]:
+    return {
+        'field': field,
+        'description': schema.desc_map.get(field, field),
+        'type': facet_type,
+        'count': 0,
+        'null_count': 0,
+        'min': None,
+        'max': None,
+        'buckets': [],
+        'values': [],
+    }
+
+
+def _sorted_values(counts: Dict[Any, int]) -> List[Dict[str, Any]]:
+    """按记录数降序、取值升序排列"""
+    items = sorted(counts.items(), key=lambda item: (-item[1], str(item[0])))
+    return [{'value': value, 'count': count} for value, count in items]
+
+
+class _FacetLayout:
+    """分面字段及直方图范围（由全目录统计决定）"""
+
+    def __init__(self) -> None:
+        self.numeric: Dict[str, Tuple[float, float]] = {}  # 字段 -> (最小值, 最大值)
+        self.discrete: Dict[str, str] = {}                 # 字段 -> boolean / text
+
+    @classmethod
+    def from_facets(cls, facets: List[Dict[str, Any]]) -> "_FacetLayout":
+        layout = cls()
+        for facet in facets:
+            if facet['type'] == 'numeric':
+                if facet['min'] is not None:
+                    layout.numeric[facet['field']] = (facet['min'], facet['max'])
+            else:
+                layout.discrete[facet['field']] = facet['type']
+        return layout
+
+
+def _candidate_fields(schema: ProductTableSchema) -> Tuple[List[str], List[str], List[str]]:
+    """按类型划分可统计分面的字段：(数值列, 布尔列, 文本列)"""
+    numeric, booleans, texts = [], [], []
+    for field in schema.fields:
+        category = type_category(field['type'])
+        if category == 'numeric':
+            numeric.append(field['name'])
+        elif category == 'boolean':
+            booleans.append(field['name'])
+        elif category == 'text':
+            texts.append(field['name'])
+    return numeric, booleans, texts
+
+
+# ---------------------------------------------------------------------------
+# SQL实现
+# ---------------------------------------------------------------------------
+
+def _sql_layout(conn: Connection, schema: ProductTableSchema) -> _FacetLayout:
+    """统计全表的数值范围和文本列基数，确定分面字段"""
+    numeric, booleans, texts = _candidate_fields(schema)
+    expressions = []
+    for field in numeric:
+        expressions += [f"MIN({field})", f"MAX({field})"]
+    for field in texts:
+        expressions.append(f"COUNT(DISTINCT {field})")
+    layout = _FacetLayout()
+    layout.discrete.update({field: 'boolean' for field in booleans})
+    if not expressions:
+        return layout
+
+    row = conn.execute(text(f"SELECT {', '.join(expressions)} FROM {schema.table_name}")).one()
+    for idx, field in enumerate(numeric):
+        lower, upper = row[idx * 2], row[idx * 2 + 1]
+        if lower is not None:
+            layout.numeric[field] = (float(lower), float(upper))
+    offset = len(numeric) * 2
+    for idx, field in enumerate(texts):
+        if 0 < row[offset + idx] <= FACET_MAX_DISTINCT:
+            layout.discrete[field] = 'text'
+    return layout
+
+
+def _sql_facets(
+    conn: Connection, schema: ProductTableSchema, compiled_filter: CompiledFilter, layout: _FacetLayout, buckets: int
+) -> Dict[str, Any]:
+    """在数据库中统计分面：一条聚合查询取总数和数值范围，一条UNION ALL查询取分布"""
+    where_sql = f"WHERE {compiled_filter.sql}" if compiled_filter.sql else ""
+    params: Dict[str, Any] = dict(compiled_filter.params)
+
+    # 总数、各字段非空数量及筛选后的数值范围
+    numeric_fields = list(layout.numeric)
+    discrete_fields = list(layout.discrete)
+    expressions = ["COUNT(*)"]
+    for field in numeric_fields:
+        expressions += [f"COUNT({field})", f"MIN({field})", f"MAX({field})"]
+    for field in discrete_fields:
+        expressions.append(f"COUNT({field})")
+    stats = conn.execute(
+        text(f"SELECT {', '.join(expressions)} FROM {schema.table_name} {where_sql}"), params
+    ).one()
+    total = stats[0]
+
+    facets: Dict[str, Dict[str, Any]] = {}
+    for idx, field in enumerate(numeric_fields):
+        count, lower, upper = stats[1 + idx * 3:4 + idx * 3]
+        facet = _facet_entry(schema, field, 'numeric')
+        facet.update({'count': count, 'null_count': total - count,
+                      'min': _to_float(lower), 'max': _to_float(upper)})
+        facets[field] = facet
+    offset = 1 + len(numeric_fields) * 3
+    for idx, field in enumerate(discrete_fields):
+        facet = _facet_entry(schema, field, layout.discrete[field])
+        facet.update({'count': stats[offset + idx], 'null_count': total - stats[offset + idx]})
+        facets[field] = facet
+
+    # 直方图和取值分布：每个字段一个子查询，按编号区分
+    selects = []
+    for idx, field in enumerate(numeric_fields):
+        lower, upper = layout.numeric[field]
+        if lower == upper:
+            bucket_sql = "1"
+        else:
+            params[f"lo{idx}"], params[f"hi{idx}"] = lower, upper
+            # width_bucket对等于上界的值返回buckets+1，并入最后一个桶
+            bucket_sql = (
+                f"GREATEST(1, LEAST({buckets}, "
+                f"width_bucket({field}::float8, :lo{idx}, :hi{idx}, {buckets})))"
+            )
+        condition = f"{field} IS NOT NULL" + (f" AND {compiled_filter.sql}" if compiled_filter.sql else "")
+        selects.append(
+            f"SELECT {idx} AS facet, ({bucket_sql})::text AS value, COUNT(*) AS cnt "
+            f"FROM {schema.table_name} WHERE {condition} GROUP BY 2"
+        )
+    for idx, field in enumerate(discrete_fields, start=len(numeric_fields)):
+        condition = f"{field} IS NOT NULL" + (f" AND {compiled_filter.sql}" if compiled_filter.sql else "")
+        selects.append(
+            f"SELECT {idx} AS facet, {field}::text AS value, COUNT(*) AS cnt "
+            f"FROM {schema.table_name} WHERE {condition} GROUP BY 2"
+        )
+
+    bucket_counts: Dict[str, Dict[int, int]] = {field: {} for field in numeric_fields}
+    value_counts: Dict[str, Dict[Any, int]] = {field: {} for field in discrete_fields}
+    if selects and total:
+        for facet_idx, value, count in conn.execute(text(" UNION ALL ".join(selects)), params):
+            if facet_idx < len(numeric_fields):
+                bucket_counts[numeric_fields[facet_idx]][int(value)] = count
+            else:
+                field = discrete_fields[facet_idx - len(numeric_fields)]
+                if layout.discrete[field] == 'boolean':
+                    value = value == 'true'
+                value_counts[field][value] = count
+
+    for field in numeric_fields:
+        edges = _bucket_edges(*layout.numeric[field], buckets)
+        facets[field]['buckets'] = [
+            {'lower': lower, 'upper': upper, 'count': bucket_counts[field].get(i + 1, 0)}
+            for i, (lower, upper) in enumerate(edges)
+        ]
+    for field in discrete_fields:
+        facets[field]['values'] = _sorted_values(value_counts[field])
+
+    return {'total': total, 'facets': [facets[field] for field in numeric_fields + discrete_fields]}
+
+
+# ---------------------------------------------------------------------------
+# 内存列式引擎实现（PRODUCT_SEARCH_ENGINE=memory）
+# ---------------------------------------------------------------------------
+
+def _memory_layout(table: ColumnarProductTable) -> _FacetLayout:
+    numeric, booleans, texts = _candidate_fields(table.schema)
+    layout = _FacetLayout()
+    for field in numeric:
+        values = table.numeric[field]
+        if not np.isnan(values).all():
+            layout.numeric[field] = (float(np.nanmin(values)), float(np.nanmax(values)))
+    layout.discrete.update({field: 'boolean' for field in booleans})
+    for field in texts:
+        if 0 < len(table.dictionaries[field].keys) <= FACET_MAX_DISTINCT:
+            layout.discrete[field] = 'text'
+    return layout
+
+
+def _memory_facets(
+    table: ColumnarProductTable, compiled_filter: CompiledFilter, layout: _FacetLayout, buckets: int
+) -> Dict[str, Any]:
+    """在内存快照上统计分面，分桶规则与SQL的width_bucket一致"""
+    mask = table.filter_mask(compiled_filter)
+    total = int(mask.sum())
+    result = []
+
+    for field, (lower, upper) in layout.numeric.items():
+        values = table.numeric[field][mask]
+        values = values[~np.isnan(values)]
+        facet = _facet_entry(table.schema, field, 'numeric')
+        facet.update({'count': int(values.size), 'null_count': total - int(values.size)})
+        if values.size:
+            facet.update({'min': float(values.min()), 'max': float(values.max())})
+        if lower == upper:
+            counts = np.array([values.size])
+        else:
+            positions = np.floor((values - lower) / (upper - lower) * buckets).astype(np.int64)
+            counts = np.bincount(np.clip(positions, 0, buckets - 1), minlength=buckets)
+        facet['buckets'] = [
+            {'lower': edge_lower, 'upper': edge_upper, 'count': int(counts[i])}
+            for i, (edge_lower, edge_upper) in enumerate(_bucket_edges(lower, upper, buckets))
+        ]
+        result.append(facet)
+
+    for field, facet_type in layout.discrete.items():
+        facet = _facet_entry(table.schema, field, facet_type)
+        if facet_type == 'boolean':
+            values = table.booleans[field][mask]
+            values = values[~np.isnan(values)]
+            flag_counts = {flag: int((values == float(flag)).sum()) for flag in (True, False)}
+            value_counts = {flag: count for flag, count in flag_counts.items() if count}
+        else:
+            column = table.dictionaries[field]
+            codes = column.codes[mask]
+            codes = codes[codes >= 0]
+            code_counts = np.bincount(codes, minlength=len(column.keys))
+            value_counts = {column.keys[code]: int(count) for code, count in enumerate(code_counts) if count}
+        non_null = sum(value_counts.values())
+        facet.update({'count': non_null, 'null_count': total - non_null, 'values': _sorted_values(value_counts)})
+        result.append(facet)
+
+    return {'total': total, 'facets': result}
+
+
+# ---------------------------------------------------------------------------
+# 对外接口
+# ---------------------------------------------------------------------------
+
+def _compute(
+    schema: ProductTableSchema,
+    compiled_filter: CompiledFilter,
+    layout: Optional[_FacetLayout],
+    buckets: int,
+) -> Dict[str, Any]:
+    """统计分面；layout为空时先根据全表统计确定分面字段"""
+    table = None
+    if settings.PRODUCT_SEARCH_ENGINE == "memory":
+        table = product_catalog_engine.get(schema.product_type)
+    if table is not None:
+        return _memory_facets(table, compiled_filter, layout or _memory_layout(table), buckets)
+
+    with engine.connect() as conn:
+        return _sql_facets(conn, schema, compiled_filter, layout or _sql_layout(conn, schema), buckets)
+
+
+def get_catalog_facets(product_type: str, buckets: int = DEFAULT_BUCKETS) -> Dict[str, Any]:
+    """
+    获取全目录分面（按表结构版本缓存）
+
+    Returns:
+        {'total': 记录数, 'facets': 分面列表}；产品类型无效或表不存在时facets为空
+    """
+    if not is_product_type(product_type):
+        return {'total': 0, 'facets': []}
+    schema = product_schema_registry.get(product_type)
+    if not schema.exists:
+        return {'total': 0, 'facets': []}
+
+    key = (product_type, buckets)
+    cached = _catalog_facets.get(key)
+    if cached is not None and cached[0] == schema.version:
+        return cached[1]
+
+    try:
+        facets = _compute(schema, compile_filters(schema, {}), None, buckets)
+    except Exception as e:
+        # 统计失败时不写入缓存，下次请求重新计算
+        logger.error(f"统计全目录分面失败: {schema.table_name}, {e}")
+        return {'total': 0, 'facets': []}
+
+    with _catalog_facets_lock:
+        # 表结构版本变化后丢弃该产品类型的旧缓存
+        for stale in [k for k, v in _catalog_facets.items() if k[0] == product_type and v[0] != schema.version]:
+            del _catalog_facets[stale]
+        _catalog_facets[key] = (schema.version, facets)
+    return facets
+
+
+def get_product_facets(
+    product_type: str, filters: Dict[str, Any], buckets: int = DEFAULT_BUCKETS
+) -> Dict[str, Any]:
+    """
+    获取产品分面统计
+
+    Args:
+        product_type: 产品类型（表名后缀）
+        filters: 筛选条件，语法与搜索接口相同；为空时返回缓存的全目录分面
+        buckets: 直方图分桶数
+
+    Returns:
+        {'total': 满足条件的记录数, 'facets': 分面列表}
+
+    Raises:
+        ProductSearchError: 筛选条件无效
+    """
+    if not is_product_type(product_type):
+        return {'total': 0, 'facets': []}
+    catalog = get_catalog_facets(product_type, buckets)
+    schema = product_schema_registry.get(product_type)
+    compiled_filter = compile_filters(schema, filters)
+    if not compiled_filter.sql or not schema.exists:
+        return catalog
+
+    # 沿用全目录的分面字段和分桶边界
+    layout = _FacetLayout.from_facets(catalog['facets'])
+    try:
+        return _compute(schema, compiled_filter, layout, buckets)
+    except ProductSearchError:
+        raise
+    except Exception as e:
+        logger.error(f"统计产品分面失败: {schema.table_name}, {e}")
+        return {'total': 0, 'facets': []}
+
+
+def precompute_catalog_facets(product_type: str) -> int:
+    """
+    导入完成后预先计算全目录分面
+
+    Returns:
+        分面字段数量（统计失败时为0）
+    """
+    facets = get_catalog_facets(product_type)
+    logger.info(f"已预计算产品分面: {product_type} ({len(facets['facets'])} 个字段)")
+    return len(facets['facets'])
@@ -0,0 +1,265 @@
+"""
+保险产品搜索过滤条件编译器
+
+根据列的实际PostgreSQL类型生成原生谓词，避免 CAST(... AS NUMERIC) 和 ::text ILIKE
+导致索引无法使用；相同结构（字段+谓词种类）的过滤条件复用已编译的SQL片段。
+"""
+import json
+import logging
+import re
+import threading
+from collections import Counter
+from decimal import Decimal, InvalidOperation
+from functools import lru_cache
+from typing import Any, Dict, List, Optional, Tuple
+
+from app.db.schema_registry import ProductTableSchema
+
+logger = logging.getLogger(__name__)
+
+
+class ProductSearchError(ValueError):
+    """产品搜索参数无效（过滤条件、排序字段、游标等）"""
+
+
+# 支持的比较运算符（按匹配优先级排列）
+COMPARISON_OPERATORS = ('>=', '<=', '>', '<', '=')
+
+# 以运算符字符开头的取值，必须是已知运算符
+_OPERATOR_PATTERN = re.compile(r'^([!<>=~]+)(.*)$', re.S)
+
+# 前缀匹配标记，例如 product_name=^国寿
+PREFIX_MARKER = '^'
+
+TRUE_VALUES = {'true', '1', 't', 'yes', 'y', '是', '有'}
+FALSE_VALUES = {'false', '0', 'f', 'no', 'n', '否', '无'}
+
+NUMERIC_TYPES = {'numeric', 'decimal', 'integer', 'smallint', 'bigint', 'real', 'double precision'}
+TEXT_TYPES = {'character varying', 'text', 'character', 'varchar'}
+JSON_TYPES = {'jsonb', 'json'}
+
+# 谓词种类 -> SQL模板（{f}为字段名，{p}为参数名）
+_PREDICATE_TEMPLATES = {
+    'num_gte': "{f} >= :{p}",
+    'num_lte': "{f} <= :{p}",
+    'num_gt': "{f} > :{p}",
+    'num_lt': "{f} < :{p}",
+    'num_eq': "{f} = :{p}",
+    'bool_eq': "{f} = :{p}",
+    'text_eq': "{f} = :{p}",
+    'text_contains': "{f} ILIKE :{p}",
+    'text_prefix': "{f} LIKE :{p}",
+    'json_contains': "{f} @> CAST(:{p} AS JSONB)",
+    'any_text_contains': "{f}::text ILIKE :{p}",
+}
+
+_NUMERIC_KINDS = {'>=': 'num_gte', '<=': 'num_lte', '>': 'num_gt', '<': 'num_lt', '=': 'num_eq'}
+
+# 过滤条件使用统计：(产品类型, 字段, 谓词种类) -> 请求次数，用于索引使用报告
+_filter_usage: Counter = Counter()
+_filter_usage_lock = threading.Lock()
+
+
+def filter_usage_snapshot() -> Dict[Tuple[str, str, str], int]:
+    """获取过滤条件使用统计的快照"""
+    with _filter_usage_lock:
+        return dict(_filter_usage)
+
+
+def type_category(pg_type: Optional[str]) -> str:
+    """
+    将PostgreSQL数据类型归类
+
+    Returns:
+        numeric / boolean / text / json / other
+    """
+    pg_type = (pg_type or '').lower()
+    if pg_type in NUMERIC_TYPES:
+        return 'numeric'
+    if pg_type == 'boolean':
+        return 'boolean'
+    if pg_type in TEXT_TYPES:
+        return 'text'
+    if pg_type in JSON_TYPES:
+        return 'json'
+    return 'other'
+
+
+def parse_bool(value: Any) -> Optional[bool]:
+    """解析布尔取值，无法识别时返回None"""
+    if isinstance(value, bool):
+        return value
+    text_value = str(value).strip().lower()
+    if text_value in TRUE_VALUES:
+        return True
+    if text_value in FALSE_VALUES:
+        return False
+    return None
+
+
+def escape_like(value: str) -> str:
+    """转义LIKE模式中的特殊字符"""
+    return value.replace('\\', '\\\\').replace('%', '\\%').replace('_', '\\_')
+
+
+def parse_filter_terms(filters: Dict[str, Any]) -> List[Tuple[str, str, Any]]:
+    """
+    将请求中的过滤条件解析为 (字段, 运算符, 操作数) 列表，不涉及列类型
+
+    运算符取值：>=、<=、>、<、=、match（模糊匹配）、prefix（前缀匹配）
+
+    Raises:
+        ProductSearchError: 使用了不支持的运算符
+    """
+    terms = []
+    for field, value in filters.items():
+        if value is None or value == '':
+            continue
+
+        # 范围筛选（字典形式）
+        if isinstance(value, dict) and ("min" in value or "max" in value):
+            if value.get("min") not in (None, ''):
+                terms.append((field, '>=', value["min"]))
+            if value.get("max") not in (None, ''):
+                terms.append((field, '<=', value["max"]))
+
+        elif isinstance(value, bool):
+            terms.append((field, '=', value))
+
+        elif isinstance(value, (int, float, Decimal)):
+            terms.append((field, '=', value))
+
+        elif isinstance(value, str):
+            match = _OPERATOR_PATTERN.match(value)
+            if match:
+                operator, operand = match.group(1), match.group(2).strip()
+                if operator not in COMPARISON_OPERATORS:
+                    raise ProductSearchError(f"字段 {field} 使用了不支持的运算符: {operator}")
+                if operand == '':
+                    raise ProductSearchError(f"字段 {field} 的运算符 {operator} 缺少取值")
+                terms.append((field, operator, operand))
+            elif value.startswith(PREFIX_MARKER) and len(value) > 1:
+                terms.append((field, 'prefix', value[1:]))
+            else:
+                terms.append((field, 'match', value))
+
+        else:
+            raise ProductSearchError(f"字段 {field} 的筛选值类型不受支持")
+    return terms
+
+
+def _resolve_term(field: str, pg_type: str, operator: str, operand: Any) -> Tuple[str, Any]:
+    """
+    根据列类型确定谓词种类并转换参数值
+
+    Returns:
+        (谓词种类, 绑定参数值)
+    """
+    category = type_category(pg_type)
+
+    if category == 'numeric':
+        if operator == 'prefix':
+            raise ProductSearchError(f"数值字段 {field} 不支持前缀匹配")
+        try:
+            number = operand if isinstance(operand, Decimal) else Decimal(str(operand).strip())
+        except (InvalidOperation, ValueError):
+            raise ProductSearchError(f"数值字段 {field} 的取值无效: {operand}")
+        kind = _NUMERIC_KINDS['=' if operator == 'match' else operator]
+        return kind, number
+
+    if category == 'boolean':
+        if operator not in ('=', 'match'):
+            raise ProductSearchError(f"布尔字段 {field} 只支持等值筛选")
+        flag = parse_bool(operand)
+        if flag is None:
+            raise ProductSearchError(f"布尔字段 {field} 的取值无效: {operand}")
+        return 'bool_eq', flag
+
+    if category == 'json':
+        if operator in ('>=', '<=', '>', '<'):
+            raise ProductSearchError(f"JSON字段 {field} 不支持比较运算")
+        if operator in ('=', 'match'):
+            # 取值本身是JSON对象/数组时使用包含运算（可走GIN索引）
+            try:
+                parsed = json.loads(operand) if isinstance(operand, str) else operand
+            except ValueError:
+                parsed = None
+            if isinstance(parsed, (dict, list)):
+                return 'json_contains', json.dumps(parsed, ensure_ascii=False)
+        return 'any_text_contains', f"%{escape_like(str(operand))}%"
+
+    if category == 'text':
+        if operator in ('>=', '<=', '>', '<'):
+            raise ProductSearchError(f"文本字段 {field} 不支持比较运算")
+        if operator == '=':
+            return 'text_eq', str(operand)
+        if operator == 'prefix':
+            return 'text_prefix', f"{escape_like(str(operand))}%"
+        return 'text_contains', f"%{escape_like(str(operand))}%"
+
+    # 其他类型只支持按文本模糊匹配
+    if operator != 'match':
+        raise ProductSearchError(f"字段 {field} 的类型 {pg_type} 不支持运算符 {operator}")
+    return 'any_text_contains', f"%{escape_like(str(operand))}%"
+
+
+@lru_cache(maxsize=512)
+def _compile_shape(shape: Tuple[Tuple[str, str], ...]) -> str:
+    """
+    将过滤结构编译为SQL片段，参数按位置命名为 f0、f1 ...
+
+    Args:
+        shape: ((字段, 谓词种类), ...)
+    """
+    clauses = [
+        _PREDICATE_TEMPLATES[kind].format(f=field, p=f"f{idx}")
+        for idx, (field, kind) in enumerate(shape)
+    ]
+    return " AND ".join(clauses)
+
+
+class CompiledFilter:
+    """编译后的过滤条件"""
+
+    def __init__(self, shape: Tuple[Tuple[str, str], ...], sql: str, params: Dict[str, Any]):
+        self.shape = shape
+        self.sql = sql
+        self.params = params
+
+    @property
+    def fields(self) -> List[str]:
+        """参与过滤的字段"""
+        return [field for field, _ in self.shape]
+
+
+def compile_filters(schema: ProductTableSchema, filters: Dict[str, Any]) -> CompiledFilter:
+    """
+    编译产品搜索过滤条件
+
+    Args:
+        schema: 产品表结构
+        filters: 过滤条件 {字段名: 取值}
+
+    Returns:
+        CompiledFilter，sql为空字符串表示没有过滤条件
+
+    Raises:
+        ProductSearchError: 字段不存在、运算符不支持或取值与列类型不符
+    """
+    terms: List[Tuple[str, str]] = []
+    params: Dict[str, Any] = {}
+    for field, operator, operand in parse_filter_terms(filters):
+        if field not in schema.types:
+            raise ProductSearchError(f"无效的筛选字段: {field}")
+        kind, value = _resolve_term(field, schema.types[field], operator, operand)
+        params[f"f{len(terms)}"] = value
+        terms.append((field, kind))
+
+    shape = tuple(terms)
+    sql = _compile_shape(shape) if shape else ""
+
+    with _filter_usage_lock:
+        for field, kind in shape:
+            _filter_usage[(schema.product_type, field, kind)] += 1
+
+    return CompiledFilter(shape, sql, params)
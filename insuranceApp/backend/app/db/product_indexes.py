@@ -0,0 +1,225 @@
+"""
+保险产品表索引管理 - 根据xlsx中声明的字段类型为导入的产品表创建索引，并统计索引使用情况
+"""
+import hashlib
+import logging
+import time
+from typing import Any, Dict, List, Optional
+
+from sqlalchemy import text
+
+from app.db.base import engine
+from app.db.product_filters import filter_usage_snapshot
+
+logger = logging.getLogger(__name__)
+
+# 使用pg_trgm GIN索引支持模糊/前缀匹配的文本列（产品名称、保险公司）
+TRIGRAM_COLUMNS = {'product_name', 'insurer', 'insurance_company'}
+
+# B-tree索引对应的数值类型
+BTREE_BASE_TYPES = {'NUMERIC', 'DECIMAL', 'INTEGER'}
+
+# 各谓词种类可以使用的索引方法
+INDEXABLE_KINDS = {
+    'num_gte': 'btree',
+    'num_lte': 'btree',
+    'num_gt': 'btree',
+    'num_lt': 'btree',
+    'num_eq': 'btree',
+    'text_eq': 'gin',
+    'text_contains': 'gin',
+    'text_prefix': 'gin',
+    'json_contains': 'gin',
+}
+
+# PostgreSQL标识符最大长度
+_MAX_IDENTIFIER_LENGTH = 63
+
+
+def _index_name(table_name: str, column: str, generation: Optional[str] = None) -> str:
+    """
+    生成不超过标识符长度限制的索引名
+
+    表被重命名时索引名不变，在影子表上建索引时附加导入批次标识，避免与当前表的索引重名
+    """
+    name = f"ix_{table_name}_{column}"
+    if generation:
+        name = f"{name}_{generation}"
+    if len(name) <= _MAX_IDENTIFIER_LENGTH:
+        return name
+    digest = hashlib.md5(name.encode("utf-8")).hexdigest()[:8]
+    return f"{name[:_MAX_IDENTIFIER_LENGTH - 9]}_{digest}"
+
+
+def derive_index_specs(
+    table_name: str, fields: List[Dict[str, Any]], generation: Optional[str] = None
+) -> List[Dict[str, str]]:
+    """
+    根据字段类型推导需要创建的索引
+
+    Args:
+        table_name: 完整表名
+        fields: 字段列表，每项包含name和type（导入器解析后的PostgreSQL类型，如 VARCHAR(63)、NUMERIC）
+        generation: 导入批次标识，附加到索引名中
+
+    Returns:
+        索引定义列表，每项包含name、column、method和ddl
+    """
+    specs = []
+    for field in fields:
+        column = field['name']
+        base_type = field['type'].split('(')[0].strip().upper()
+
+        if base_type in BTREE_BASE_TYPES:
+            method, using = 'btree', f"({column})"
+        elif base_type == 'JSONB':
+            method, using = 'gin', f"USING GIN ({column})"
+        elif column in TRIGRAM_COLUMNS and base_type in ('VARCHAR', 'TEXT'):
+            method, using = 'gin_trgm', f"USING GIN ({column} gin_trgm_ops)"
+        else:
+            continue
+
+        name = _index_name(table_name, column, generation)
+        specs.append({
+            'name': name,
+            'column': column,
+            'method': method,
+            'ddl': f"CREATE INDEX IF NOT EXISTS {name} ON {table_name} {using}",
+        })
+    return specs
+
+
+def _ensure_trigram_extension() -> bool:
+    """确保pg_trgm扩展可用，没有权限创建时返回False"""
+    try:
+        with engine.begin() as conn:
+            conn.execute(text("CREATE EXTENSION IF NOT EXISTS pg_trgm"))
+        return True
+    except Exception as e:
+        logger.warning(f"pg_trgm扩展不可用，跳过三元组索引: {e}")
+        return False
+
+
+def create_product_indexes(
+    table_name: str, fields: List[Dict[str, Any]], generation: Optional[str] = None
+) -> List[Dict[str, Any]]:
+    """
+    为产品表创建索引并更新统计信息
+
+    Args:
+        table_name: 完整表名
+        fields: 字段列表（同derive_index_specs）
+        generation: 导入批次标识（同derive_index_specs）
+
+    Returns:
+        成功创建的索引列表，每项包含name、column、method和seconds（耗时）
+    """
+    specs = derive_index_specs(table_name, fields, generation)
+    if any(spec['method'] == 'gin_trgm' for spec in specs) and not _ensure_trigram_extension():
+        specs = [spec for spec in specs if spec['method'] != 'gin_trgm']
+
+    built = []
+    for spec in specs:
+        started = time.perf_counter()
+        try:
+            # 每个索引单独提交，某个索引失败不影响其他索引
+            with engine.begin() as conn:
+                conn.execute(text(spec['ddl']))
+        except Exception as e:
+            logger.warning(f"创建索引失败: {spec['name']}, {e}")
+            continue
+        elapsed = time.perf_counter() - started
+        built.append({
+            'name': spec['name'],
+            'column': spec['column'],
+            'method': spec['method'],
+            'seconds': round(elapsed, 4),
+        })
+        logger.info(f"成功创建索引: {spec['name']} ({spec['method']}, {elapsed * 1000:.1f} ms)")
+
+    # 更新统计信息，使查询计划器能够使用新索引
+    try:
+        with engine.begin() as conn:
+            conn.execute(text(f"ANALYZE {table_name}"))
+    except Exception as e:
+        logger.warning(f"更新表统计信息失败: {table_name}, {e}")
+
+    logger.info(f"表 {table_name} 共创建 {len(built)}/{len(specs)} 个索引")
+    return built
+
+
+_INDEX_STATS_QUERY = text("""
+    SELECT
+        t.relname AS table_name,
+        i.relname AS index_name,
+        a.attname AS column_name,
+        am.amname AS method,
+        COALESCE(s.idx_scan, 0) AS idx_scan,
+        COALESCE(s.idx_tup_read, 0) AS idx_tup_read
+    FROM pg_index x
+    JOIN pg_class t ON t.oid = x.indrelid
+    JOIN pg_class i ON i.oid = x.indexrelid
+    JOIN pg_am am ON am.oid = i.relam
+    LEFT JOIN pg_attribute a
+        ON a.attrelid = t.oid AND a.attnum = x.indkey[0]
+    LEFT JOIN pg_stat_user_indexes s ON s.indexrelid = x.indexrelid
+    WHERE t.relname = ANY(:tables)
+    AND NOT x.indisprimary
+    ORDER BY t.relname, i.relname
+""")
+
+
+def get_index_usage_report(product_types: List[str]) -> List[Dict[str, Any]]:
+    """
+    生成索引使用报告：每个产品表的索引扫描次数，以及搜索过滤条件命中的索引
+
+    Args:
+        product_types: 产品类型（表名后缀）列表
+
+    Returns:
+        每个产品表一项，包含indexes（索引及扫描次数）和filters（过滤字段、请求次数及候选索引）
+
+    候选索引只是启发式判断：过滤字段上有索引且谓词种类与索引方法匹配（见INDEXABLE_KINDS）。
+    计划器是否实际使用该索引还取决于选择率、表大小等，需结合候选索引的扫描次数（idx_scan）判断
+    """
+    table_names = {f"insurance_products_{pt}": pt for pt in product_types}
+    indexes_by_table: Dict[str, List[Dict[str, Any]]] = {name: [] for name in table_names}
+
+    with engine.connect() as conn:
+        for row in conn.execute(_INDEX_STATS_QUERY, {"tables": list(table_names)}):
+            indexes_by_table[row.table_name].append({
+                'index_name': row.index_name,
+                'column': row.column_name,
+                'method': row.method,
+                'scans': row.idx_scan,
+                'tuples_read': row.idx_tup_read,
+            })
+
+    usage = filter_usage_snapshot()
+    report = []
+    for table_name, product_type in table_names.items():
+        indexes = indexes_by_table[table_name]
+        index_by_column = {index['column']: index for index in indexes}
+
+        filters = []
+        for (usage_type, field, kind), requests in sorted(usage.items()):
+            if usage_type != product_type:
+                continue
+            index = index_by_column.get(field)
+            # 只有谓词种类与索引方法匹配时，过滤条件才可能使用该索引
+            candidate = index if index is not None and INDEXABLE_KINDS.get(kind) == index['method'] else None
+            filters.append({
+                'field': field,
+                'kind': kind,
+                'requests': requests,
+                'candidate_index': candidate['index_name'] if candidate else None,
+                'candidate_index_scans': candidate['scans'] if candidate else 0,
+            })
+
+        report.append({
+            'product_type': product_type,
+            'table_name': table_name,
+            'indexes': indexes,
+            'filters': filters,
+        })
+    return report
@@ -0,0 +1,196 @@
+"""
+保险产品搜索字段投影
+
+搜索列表只展示产品名称、保险公司和少量要点，不需要整行数据（定期寿险有几十列长条款文本）。
+- 卡片投影：每个产品类型预先定义列表卡片需要的字段，搜索默认只返回这些字段；
+  导入器把卡片字段物化为窄表 insurance_products_{类型}_card，与基础表一样先建在影子表上再改名切换
+  （见catalog_generations）；查询条件都落在卡片字段上时直接查窄表
+- fields参数：客户端按需指定返回字段（按表结构校验）
+完整的产品数据只由 /product_info 返回。
+"""
+import logging
+import threading
+from typing import Any, Collection, Dict, List, Optional, Sequence, Tuple
+
+from sqlalchemy import text
+
+from app.db.base import engine
+from app.db.product_filters import ProductSearchError
+from app.db.product_indexes import create_product_indexes
+from app.db.schema_registry import ProductTableSchema
+
+logger = logging.getLogger(__name__)
+
+# 列表卡片字段（产品名称、保险公司之后按展示优先级排列，客户端卡片展示前几个非空字段）
+CARD_FIELDS = {
+    'term_life': (
+        'product_name', 'insurer', 'base_sum_insured_text', 'cover_term_type',
+        'entry_age_min_years', 'entry_age_max_years', 'waiting_period', 'has_tpd_cover',
+    ),
+    'non_annuity': (
+        'product_name', 'insurance_company', 'return_type', 'product_guaranteed_yield',
+        'payback_period', 'payment_frequency', 'insured_min_age_years', 'insured_max_age_years',
+    ),
+    'annuity': (
+        'product_name', 'insurance_company', 'return_type', 'product_guaranteed_yield',
+        'annuity_start_age', 'payment_frequency', 'insured_min_entry_age', 'insured_max_entry_age',
+    ),
+    'medical': (
+        'product_name', 'insurance_company', 'coverage_scope', 'guaranteed_renewal',
+        'deductible', 'premium', 'min_entry_age_years', 'max_entry_age_years',
+    ),
+    'critical_illness': (
+        'product_name', 'insurer', 'coverage_term', 'sum_assured_ci',
+        'sample_premium_month', 'payment_term', 'entry_age_min', 'entry_age_max',
+    ),
+}
+
+# 未定义卡片字段的产品类型使用的默认字段
+DEFAULT_CARD_FIELDS = ('product_name', 'insurer', 'insurance_company')
+
+# fields参数最多指定的字段数
+MAX_PROJECTION_FIELDS = 50
+
+# 可用的卡片表：产品类型 -> (基础表结构版本, 卡片表名或None)，由card_table_for在版本变化后重新检查
+_card_tables: Dict[str, Tuple[int, Optional[str]]] = {}
+_card_tables_lock = threading.Lock()
+
+
+def card_table_name(product_type: str) -> str:
+    return f"insurance_products_{product_type}_card"
+
+
+def _card_columns(product_type: str, column_names: Collection[str]) -> List[str]:
+    candidates = CARD_FIELDS.get(product_type, DEFAULT_CARD_FIELDS)
+    return ['product_id'] + [column for column in candidates if column in column_names]
+
+
+def card_columns(schema: ProductTableSchema) -> List[str]:
+    """产品类型的卡片字段（只保留表中实际存在的列，product_id在最前）"""
+    return _card_columns(schema.product_type, schema.types)
+
+
+def resolve_projection(schema: ProductTableSchema, fields: Optional[str]) -> List[str]:
+    """
+    解析搜索返回的字段
+
+    Args:
+        schema: 产品表结构
+        fields: 逗号分隔的字段名，为空则使用卡片字段
+
+    Returns:
+        查询的列名列表（product_id始终在最前）
+
+    Raises:
+        ProductSearchError: 字段不存在或数量过多
+    """
+    if fields is None or not fields.strip():
+        return card_columns(schema)
+
+    columns = ['product_id']
+    for field in fields.split(','):
+        field = field.strip()
+        if not field or field in columns:
+            continue
+        if field not in schema.types:
+            raise ProductSearchError(f"无效的返回字段: {field}")
+        columns.append(field)
+    if len(columns) - 1 > MAX_PROJECTION_FIELDS:
+        raise ProductSearchError(f"返回字段最多{MAX_PROJECTION_FIELDS}个")
+    return columns
+
+
+def with_sort_column(columns: List[str], sort_by: Optional[str]) -> List[str]:
+    """排序字段用于生成游标，不在投影中时追加到末尾"""
+    if sort_by and sort_by not in columns:
+        return columns + [sort_by]
+    return columns
+
+
+def project_rows(
+    source_columns: Sequence[str], rows: Sequence[Sequence[Any]], columns: Sequence[str]
+) -> List[tuple]:
+    """从完整行中取出投影列（内存引擎使用）"""
+    positions = [list(source_columns).index(column) for column in columns]
+    return [tuple(row[i] for i in positions) for row in rows]
+
+
+def build_card_table(
+    product_type: str, source_table: str, table_name: str, fields: List[Dict[str, Any]],
+    generation: Optional[str] = None
+) -> bool:
+    """
+    从基础产品表建立卡片表
+
+    导入器在影子表上建立卡片表；卡片表缓存按表结构版本失效，切换后首次查询时重新检查
+
+    Args:
+        product_type: 产品类型
+        source_table: 基础产品表名
+        table_name: 要建立的卡片表名
+        fields: 导入器解析的字段定义（用于确定卡片列和推导索引）
+        generation: 导入批次标识，附加到索引名中
+
+    Returns:
+        是否成功
+    """
+    columns = _card_columns(product_type, {field['name'] for field in fields})
+    try:
+        with engine.begin() as conn:
+            conn.execute(text(f"DROP TABLE IF EXISTS {table_name}"))
+            conn.execute(text(
+                f"CREATE TABLE {table_name} AS SELECT {', '.join(columns)} FROM {source_table}"
+            ))
+            conn.execute(text(f"ALTER TABLE {table_name} ADD PRIMARY KEY (product_id)"))
+    except Exception as e:
+        logger.error(f"物化卡片表失败: {table_name}, {e}")
+        return False
+
+    create_product_indexes(table_name, [field for field in fields if field['name'] in columns], generation)
+    logger.info(f"已物化卡片表: {table_name} ({len(columns)} 列)")
+    return True
+
+
+def _load_card_table(schema: ProductTableSchema) -> Optional[str]:
+    """检查数据库中已有的卡片表（例如服务重启后）是否包含全部卡片字段"""
+    table_name = card_table_name(schema.product_type)
+    try:
+        with engine.connect() as conn:
+            existing = {
+                row[0] for row in conn.execute(
+                    text("SELECT column_name FROM information_schema.columns WHERE table_name = :table_name"),
+                    {"table_name": table_name}
+                )
+            }
+    except Exception as e:
+        logger.warning(f"检查卡片表失败: {table_name}, {e}")
+        return None
+    return table_name if existing and set(card_columns(schema)) <= existing else None
+
+
+def card_table_for(schema: ProductTableSchema) -> Optional[str]:
+    """获取产品类型可用的卡片表名，没有物化时返回None"""
+    cached = _card_tables.get(schema.product_type)
+    if cached is not None and cached[0] == schema.version:
+        return cached[1]
+
+    table_name = _load_card_table(schema)
+    with _card_tables_lock:
+        _card_tables[schema.product_type] = (schema.version, table_name)
+    return table_name
+
+
+def select_source_table(
+    schema: ProductTableSchema, columns: Sequence[str], filter_fields: Sequence[str], sort_by: Optional[str]
+) -> str:
+    """
+    选择查询的表：投影、筛选和排序字段都在卡片字段内时查询卡片表，否则查询基础表
+    """
+    needed = set(columns) | set(filter_fields)
+    if sort_by:
+        needed.add(sort_by)
+    if needed <= set(card_columns(schema)):
+        table_name = card_table_for(schema)
+        if table_name:
+            return table_name
+    return schema.table_name
@@ -0,0 +1,388 @@
+"""
+基于用户个人信息的保险产品推荐
+
+1. 从user_info（年龄、收入、家庭成员、风险偏好）解析推荐画像
+2. 按画像年龄与各产品表的投保年龄范围（COMMON_COLUMN_CANDIDATES）筛选可投保的产品
+3. 对候选产品的数值指标（收益率、等待期、免赔额、保额、保费等）向量化打分，
+   指标权重按画像调整（如风险厌恶程度高时提高保证收益率的权重），每种产品类型返回得分最高的K个
+
+各产品表的指标矩阵按表结构版本缓存；推荐结果按用户缓存，画像或产品目录变化后重新计算。
+"""
+import hashlib
+import json
+import logging
+import re
+import threading
+from collections import OrderedDict
+from typing import Any, Dict, List, Optional, Tuple
+
+import numpy as np
+from sqlalchemy import Column, select
+
+from app.db.base import engine
+from app.db.crud.insurance_product import PRODUCT_TYPE_MAPPING, resolve_common_columns
+from app.db.schema_registry import ProductTableSchema, product_schema_registry
+from app.models.insurance_product import product_model_registry
+
+logger = logging.getLogger(__name__)
+
+# 打分模型：产品类型 -> [(列名, 基础权重, 方向, 画像调整)]
+# 方向：higher 越大越好 / lower 越小越好；布尔列按0/1参与打分
+# 画像调整：conservative 随风险厌恶程度加权、aggressive 随风险偏好加权、
+#           budget 随预算紧张程度（收入越低）加权、dependents 随家庭成员数量加权
+SCORING_MODELS = {
+    'term_life': [
+        ('waiting_period', 1.0, 'lower', None),
+        ('has_tpd_cover', 1.0, 'higher', 'dependents'),
+        ('grace_days', 0.5, 'higher', None),
+        ('free_look_days', 0.5, 'higher', None),
+        ('cash_value_exists', 0.5, 'higher', 'conservative'),
+    ],
+    'non_annuity': [
+        ('product_guaranteed_yield', 1.5, 'higher', 'conservative'),
+        ('insurer_annual_yield_float', 1.0, 'higher', 'aggressive'),
+        ('payback_period', 1.0, 'lower', None),
+        ('hesitation_period_days', 0.3, 'higher', None),
+    ],
+    'annuity': [
+        ('product_guaranteed_yield', 1.5, 'higher', 'conservative'),
+        ('insurer_yield_float_annual', 1.0, 'higher', 'aggressive'),
+        ('guaranteed_payment_years', 1.0, 'higher', 'conservative'),
+        ('hesitation_period_days', 0.3, 'higher', None),
+    ],
+    'medical': [
+        ('waiting_period_days', 1.0, 'lower', None),
+        ('general_in_patient_max_benefit_10k_cny', 1.0, 'higher', None),
+        ('general_in_patient_deductible_10k_cny', 1.0, 'lower', 'budget'),
+        ('accidental_medical_daily_deductible_cny', 0.5, 'lower', 'budget'),
+        ('guaranteed_renewal', 1.0, 'higher', 'conservative'),
+        ('critical_illness_max_benefit_10k_cny', 0.5, 'higher', None),
+    ],
+    'critical_illness': [
+        ('sum_assured_ci', 1.0, 'higher', 'dependents'),
+        ('waiting_days', 1.0, 'lower', None),
+        ('sample_premium_month', 1.0, 'lower', 'budget'),
+        ('sum_assured_mci', 0.5, 'higher', None),
+        ('sum_assured_mini_ci', 0.5, 'higher', None),
+        ('ci_claims_limit', 0.5, 'higher', None),
+    ],
+}
+
+# 每种产品类型默认/最多返回的产品数
+DEFAULT_TOP_K = 3
+MAX_TOP_K = 20
+
+# 每个产品返回的推荐理由（贡献最大的指标）数量
+MAX_REASONS = 2
+
+# 指标缺失时的归一化得分（低于中位水平：未披露的指标不应优于有明确数据的产品）
+MISSING_VALUE_SCORE = 0.3
+
+# 按用户缓存的推荐结果条目上限
+MAX_CACHED_USERS = 1024
+
+# 参与画像计算的user_info字段
+PROFILE_SECTIONS = ('basic_info', 'financial_info', 'risk_info', 'family_info')
+
+_NUMBER = re.compile(r'\d+(?:\.\d+)?')
+
+
+def _first_number(value: Any) -> Optional[float]:
+    if value is None:
+        return None
+    if isinstance(value, (int, float)):
+        return float(value)
+    match = _NUMBER.search(str(value).replace(',', '').replace('，', ''))
+    return float(match.group()) if match else None
+
+
+def parse_age(value: Any) -> Optional[float]:
+    """解析年龄（如 30、"30岁"、"30周岁"）"""
+    age = _first_number(value)
+    return age if age is not None and 0 <= age <= 120 else None
+
+
+def parse_annual_income(value: Any) -> Optional[float]:
+    """解析年收入（元），支持"20万"、"月入8000"、"1.5万/月"等写法"""
+    amount = _first_number(value)
+    if amount is None:
+        return None
+    text_value = str(value)
+    if '万' in text_value:
+        amount *= 10000
+    if '月' in text_value:
+        amount *= 12
+    return amount
+
+
+def parse_risk_aversion(value: Any) -> Optional[float]:
+    """
+    解析风险厌恶程度（0~1，越大越保守）
+
+    支持文字描述（高/中/低、保守/稳健/激进）和1~5的数字评分
+    """
+    if value is None or not str(value).strip():
+        return None
+    text_value = str(value)
+    if any(word in text_value for word in ('保守', '高', '强', '不能接受')):
+        return 0.8
+    if any(word in text_value for word in ('激进', '进取', '低', '弱')):
+        return 0.2
+    if any(word in text_value for word in ('稳健', '中', '适中', '一般')):
+        return 0.5
+    score = _first_number(text_value)
+    if score is not None and 1 <= score <= 5:
+        return score / 5
+    return None
+
+
+class RecommendationProfile:
+    """推荐画像：从user_info解析出的打分相关信息"""
+
+    def __init__(
+        self,
+        age: Optional[float] = None,
+        annual_income: Optional[float] = None,
+        risk_aversion: Optional[float] = None,
+        dependents: int = 0,
+    ):
+        self.age = age
+        self.annual_income = annual_income
+        self.risk_aversion = risk_aversion
+        self.dependents = dependents
+
+    @classmethod
+    def from_user_info(cls, user_info: Any) -> "RecommendationProfile":
+        """
+        从UserInfo记录解析画像
+
+        Args:
+            user_info: UserInfo模型实例，为None时返回空画像
+        """
+        if user_info is None:
+            return cls()
+        basic_info = user_info.basic_info or {}
+        financial_info = user_info.financial_info or {}
+        risk_info = user_info.risk_info or {}
+        family_members = (user_info.family_info or {}).get('family_members') or []
+        return cls(
+            age=parse_age(basic_info.get('age')),
+            annual_income=parse_annual_income(financial_info.get('income')),
+            risk_aversion=parse_risk_aversion(risk_info.get('risk_aversion')),
+            dependents=len([member for member in family_members if member]),
+        )
+
+    def tilts(self) -> Dict[str, float]:
+        """各画像调整项的权重倍数（缺少对应信息时为1）"""
+        aversion = self.risk_aversion if self.risk_aversion is not None else 0.5
+        budget = 1.0
+        if self.annual_income:
+            budget = float(np.clip(200000 / self.annual_income, 0.5, 2.0))
+        return {
+            'conservative': 0.5 + aversion,
+            'aggressive': 1.5 - aversion,
+            'budget': budget,
+            'dependents': 1.0 + 0.25 * min(self.dependents, 4),
+        }
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {
+            'age': self.age,
+            'annual_income': self.annual_income,
+            'risk_aversion': self.risk_aversion,
+            'dependents': self.dependents,
+        }
+
+
+def profile_hash(user_info: Any) -> str:
+    """user_info中参与画像计算的字段的摘要，字段变化后推荐缓存失效"""
+    payload = {
+        section: getattr(user_info, section, None) or {} for section in PROFILE_SECTIONS
+    } if user_info is not None else {}
+    encoded = json.dumps(payload, ensure_ascii=False, sort_keys=True, default=str)
+    return hashlib.sha1(encoded.encode('utf-8')).hexdigest()
+
+
+def _to_float(value: Any) -> float:
+    if value is None:
+        return np.nan
+    if isinstance(value, bool):
+        return float(value)
+    try:
+        return float(value)
+    except (TypeError, ValueError):
+        return np.nan
+
+
+class ScoringMatrix:
+    """单个产品表的打分矩阵（按全目录归一化到0~1，方向统一为越大越好）"""
+
+    def __init__(self, schema: ProductTableSchema, rows: List[tuple], features: List[Tuple[str, float, str, Optional[str]]]):
+        """
+        Args:
+            schema: 产品表结构
+            rows: (product_id, 产品名称, 保险公司, 最低投保年龄, 最高投保年龄, 指标列...) 行列表
+            features: 表中实际存在的打分指标
+        """
+        self.version = schema.version
+        self.features = features
+        self.descriptions = [schema.desc_map.get(column, column) for column, _, _, _ in features]
+        self.product_ids = [row[0] for row in rows]
+        self.names = [row[1] for row in rows]
+        self.insurers = [row[2] for row in rows]
+        self.age_min = np.array([_to_float(row[3]) for row in rows], dtype=np.float64)
+        self.age_max = np.array([_to_float(row[4]) for row in rows], dtype=np.float64)
+
+        raw = np.array(
+            [[_to_float(value) for value in row[5:]] for row in rows], dtype=np.float64
+        ).reshape(len(rows), len(features))
+        self.present = ~np.isnan(raw)
+        normalized = np.full(raw.shape, MISSING_VALUE_SCORE)
+        for idx, (_, _, direction, _) in enumerate(features):
+            column = raw[:, idx]
+            present = self.present[:, idx]
+            if not present.any():
+                continue
+            low, high = column[present].min(), column[present].max()
+            if high > low:
+                scaled = (column[present] - low) / (high - low)
+                normalized[present, idx] = scaled if direction == 'higher' else 1 - scaled
+            else:
+                normalized[present, idx] = 1.0
+        self.normalized = normalized
+
+    def eligible(self, age: Optional[float]) -> np.ndarray:
+        """可投保的产品（年龄限制为空视为不限）"""
+        if age is None:
+            return np.ones(len(self.product_ids), dtype=bool)
+        return (np.isnan(self.age_min) | (self.age_min <= age)) & (np.isnan(self.age_max) | (self.age_max >= age))
+
+    def rank(self, profile: RecommendationProfile, top_k: int) -> Tuple[int, List[Dict[str, Any]]]:
+        """
+        对可投保的产品打分并取前top_k个
+
+        Returns:
+            (可投保的产品数, 推荐产品列表)
+        """
+        mask = self.eligible(profile.age)
+        candidates = int(mask.sum())
+        if not candidates or not self.features:
+            return candidates, []
+
+        tilts = profile.tilts()
+        weights = np.array([
+            weight * (tilts[tilt] if tilt else 1.0) for _, weight, _, tilt in self.features
+        ])
+        contributions = self.normalized * (weights / weights.sum())
+        scores = contributions.sum(axis=1)
+
+        indices = np.flatnonzero(mask)
+        # 得分降序，同分按product_id升序
+        order = np.lexsort((np.array(self.product_ids)[indices], -scores[indices]))[:top_k]
+
+        products = []
+        for idx in indices[order]:
+            # 推荐理由只取有实际数据的指标
+            explained = np.where(self.present[idx], contributions[idx], 0.0)
+            top_features = np.argsort(-explained, kind='stable')[:MAX_REASONS]
+            products.append({
+                'product_id': self.product_ids[idx],
+                'product_name': self.names[idx],
+                'insurer': self.insurers[idx],
+                'score': round(float(scores[idx]) * 100, 2),
+                'reasons': [self.descriptions[f] for f in top_features if explained[f] > 0],
+            })
+        return candidates, products
+
+
+class ProductRecommender:
+    """产品推荐引擎：打分矩阵按表结构版本缓存，推荐结果按用户缓存"""
+
+    def __init__(self) -> None:
+        self._lock = threading.Lock()
+        self._matrices: Dict[str, ScoringMatrix] = {}
+        # 用户ID -> ((画像摘要, 目录版本, top_k), 推荐结果)
+        self._results: "OrderedDict[str, Tuple[Tuple[str, int, int], Dict[str, Any]]]" = OrderedDict()
+
+    def _matrix(self, product_type: str) -> Optional[ScoringMatrix]:
+        """获取产品表的打分矩阵，表结构版本变化时重新加载"""
+        schema = product_schema_registry.get(product_type)
+        table = product_model_registry.table(product_type)
+        if not schema.exists or table is None:
+            return None
+
+        matrix = self._matrices.get(product_type)
+        if matrix is not None and matrix.version == schema.version:
+            return matrix
+
+        common = resolve_common_columns(schema)
+        features = [feature for feature in SCORING_MODELS.get(product_type, []) if feature[0] in table.c]
+        common_columns = [common[name] for name in ('product_name', 'insurer', 'entry_age_min', 'entry_age_max')]
+        columns: List[Optional[Column]] = [table.c.product_id] + [
+            table.c[column] if column else None for column in common_columns
+        ] + [table.c[column] for column, _, _, _ in features]
+        try:
+            with engine.connect() as conn:
+                rows = conn.execute(
+                    select(*[column for column in columns if column is not None]).order_by(table.c.product_id)
+                ).fetchall()
+        except Exception as e:
+            logger.error(f"加载产品打分数据失败: {schema.table_name}, {e}")
+            return None
+
+        # 表中缺少的通用列补None，保持行结构一致
+        present = [column is not None for column in columns]
+        padded = []
+        for row in rows:
+            values = iter(row)
+            padded.append(tuple(next(values) if flag else None for flag in present))
+
+        matrix = ScoringMatrix(schema, padded, features)
+        with self._lock:
+            self._matrices[product_type] = matrix
+        return matrix
+
+    def recommend(self, user_id: str, user_info: Any, top_k: int = DEFAULT_TOP_K) -> Dict[str, Any]:
+        """
+        为用户推荐各类型的产品
+
+        Args:
+            user_id: 用户ID（缓存键）
+            user_info: UserInfo记录，为None时按空画像推荐
+            top_k: 每种产品类型返回的产品数
+
+        Returns:
+            {'profile': 画像, 'recommendations': [每种产品类型的推荐结果]}
+        """
+        cache_key = (profile_hash(user_info), product_schema_registry.version, top_k)
+        with self._lock:
+            cached = self._results.get(user_id)
+            if cached is not None and cached[0] == cache_key:
+                self._results.move_to_end(user_id)
+                return cached[1]
+
+        profile = RecommendationProfile.from_user_info(user_info)
+        recommendations = []
+        for type_name, product_type in PRODUCT_TYPE_MAPPING.items():
+            matrix = self._matrix(product_type)
+            if matrix is None:
+                continue
+            candidates, products = matrix.rank(profile, top_k)
+            recommendations.append({
+                'product_type': product_type,
+                'product_type_name': type_name,
+                'candidates': candidates,
+                'products': products,
+            })
+        result = {'profile': profile.to_dict(), 'recommendations': recommendations}
+
+        with self._lock:
+            self._results[user_id] = (cache_key, result)
+            self._results.move_to_end(user_id)
+            while len(self._results) > MAX_CACHED_USERS:
+                self._results.popitem(last=False)
+        return result
+
+
+# 全局产品推荐引擎实例
+product_recommender = ProductRecommender()
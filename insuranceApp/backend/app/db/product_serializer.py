@@ -0,0 +1,156 @@
+"""
+保险产品行序列化器
+
+每个产品表按列结构预编译一个序列化器：预先算好中文字段名的顺序和每个字段取值的列位置，
+一行数据（元组）经C实现的itemgetter/zip直接组装，整页交给orjson一次编码为JSON字节，
+跳过逐单元格查中文字段名和响应模型的二次校验。
+输出与原有路径一致（含重复中文名时后列覆盖前列的字典语义）。
+"""
+import json
+import threading
+from datetime import date, datetime
+from decimal import Decimal
+from operator import itemgetter
+from typing import Any, Callable, Dict, List, Optional, Sequence, Tuple
+from uuid import UUID
+
+from fastapi.responses import Response
+
+from app.db.schema_registry import ProductTableSchema
+
+try:
+    import orjson
+except ImportError:  # 未安装orjson时使用标准库
+    orjson = None
+
+
+def _default(value: Any) -> Any:
+    """JSON编码器无法直接编码的类型（与FastAPI jsonable_encoder的转换一致）"""
+    if isinstance(value, Decimal):
+        exponent = value.as_tuple().exponent
+        return int(value) if isinstance(exponent, int) and exponent >= 0 else float(value)
+    if isinstance(value, (datetime, date)):
+        return value.isoformat()
+    if isinstance(value, UUID):
+        return str(value)
+    raise TypeError(f"无法序列化的类型: {type(value).__name__}")
+
+
+def _default_decimal_str(value: Any) -> Any:
+    """Decimal编码为字符串（与Pydantic v2对Decimal的JSON序列化一致）"""
+    if isinstance(value, Decimal):
+        return str(value)
+    return _default(value)
+
+
+def dumps(value: Any, default: Callable[[Any], Any] = _default) -> bytes:
+    """紧凑JSON编码（与FastAPI JSONResponse的输出格式一致）"""
+    if orjson is not None:
+        try:
+            return orjson.dumps(value, default=default)
+        except (orjson.JSONEncodeError, TypeError):
+            # 超出64位的整数、孤立代理字符等交给标准库处理
+            pass
+    return json.dumps(
+        value, ensure_ascii=False, allow_nan=False, separators=(",", ":"), default=default
+    ).encode("utf-8")
+
+
+class ProductRowSerializer:
+    """
+    单个产品表（特定列顺序）的预编译行序列化器
+
+    decimal_as_str: Decimal是否编码为字符串。/search的响应经过Pydantic模型序列化，
+    Decimal输出为字符串；/product_info直接返回字典，Decimal输出为数值。
+    """
+
+    def __init__(self, schema: ProductTableSchema, columns: Sequence[str], decimal_as_str: bool):
+        # 计算最终的键顺序和取值列（与逐列赋值字典的语义一致：键位置取首次出现，取值取最后一次）
+        slots: Dict[str, int] = {}
+        for idx, column in enumerate(columns):
+            slots[schema.desc_map.get(column, column)] = idx
+            # 同时保留product_id的英文版本（作为唯一标识）
+            if column == 'product_id':
+                slots['product_id'] = idx
+
+        self.keys: Tuple[str, ...] = tuple(slots)
+        self.indexes: Tuple[int, ...] = tuple(slots.values())
+        if len(self.indexes) == 1:
+            only = self.indexes[0]
+            self._values = lambda row: (row[only],)
+        else:
+            self._values = itemgetter(*self.indexes)
+        self._default = _default_decimal_str if decimal_as_str else _default
+
+    def to_dict(self, row: Sequence[Any]) -> Dict[str, Any]:
+        """一行数据转换为中文字段名字典"""
+        return dict(zip(self.keys, self._values(row)))
+
+    def encode_row(self, row: Sequence[Any]) -> bytes:
+        """一行数据编码为JSON对象"""
+        return dumps(self.to_dict(row), self._default)
+
+    def encode_fields(self, row: Sequence[Any]) -> bytes:
+        """一行数据编码为JSON对象的成员部分（不含花括号），用于合并到外层对象"""
+        return self.encode_row(row)[1:-1]
+
+    def encode_rows(self, rows: Sequence[Sequence[Any]]) -> bytes:
+        """多行数据编码为JSON数组（整页一次编码）"""
+        keys, values = self.keys, self._values
+        return dumps([dict(zip(keys, values(row))) for row in rows], self._default)
+
+
+_serializers: Dict[Tuple[str, int, Tuple[str, ...], bool], ProductRowSerializer] = {}
+_serializers_lock = threading.Lock()
+
+
+def get_row_serializer(
+    schema: ProductTableSchema, columns: Sequence[str], decimal_as_str: bool = False
+) -> ProductRowSerializer:
+    """
+    获取预编译的行序列化器（按表、表结构版本和列顺序缓存）
+    """
+    key = (schema.product_type, schema.version, tuple(columns), decimal_as_str)
+    serializer = _serializers.get(key)
+    if serializer is None:
+        serializer = ProductRowSerializer(schema, columns, decimal_as_str)
+        with _serializers_lock:
+            # 表结构版本变化后丢弃旧的序列化器
+            for stale in [k for k in _serializers if k[0] == key[0] and k[1] != key[1]]:
+                del _serializers[stale]
+            _serializers[key] = serializer
+    return serializer
+
+
+def encode_envelope(
+    envelope: Dict[str, Any],
+    member_key: Optional[str],
+    member_json: bytes,
+    trailer: Optional[Dict[str, Any]] = None,
+) -> bytes:
+    """
+    将预编码的JSON片段拼接到响应外层对象中
+
+    Args:
+        envelope: 片段之前的外层字段，例如 {"code": 200, "message": "..."}
+        member_key: 片段对应的键；为空时片段是对象成员（encode_fields的结果），直接合并到外层
+        member_json: 预编码的JSON片段
+        trailer: 片段之后的外层字段
+    """
+    parts = [dumps(envelope)[1:-1]] if envelope else []
+    if member_json:
+        parts.append(member_json if member_key is None else dumps(member_key) + b":" + member_json)
+    if trailer:
+        parts.append(dumps(trailer)[1:-1])
+    return b"{" + b",".join(parts) + b"}"
+
+
+class PreEncodedJSONResponse(Response):
+    """内容已编码为JSON字节的响应，不再经过响应模型校验和序列化"""
+
+    media_type = "application/json"
+
+    def render(self, content: Any) -> bytes:
+        if isinstance(content, bytes):
+            return content
+        return dumps(content)
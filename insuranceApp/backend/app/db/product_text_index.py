@@ -0,0 +1,303 @@
+"""
+保险产品全文检索索引
+
+对每个产品表的全部文本列（TEXT/VARCHAR）建立字符n-gram倒排索引（单字 + 相邻二字），
+支持中文关键词（如 恶性肿瘤、终身）跨字段检索。PostgreSQL默认的tsvector不支持中文分词，
+产品目录规模又很小，因此索引放在进程内：导入完成后构建，按表结构版本失效重建。
+
+检索结果按BM25打分排序（产品名称、保险公司字段加权），并返回命中字段的高亮片段。
+"""
+import logging
+import math
+import threading
+import unicodedata
+from typing import Any, Dict, List, Optional, Tuple
+
+import numpy as np
+from sqlalchemy import text
+
+from app.db.base import engine
+from app.db.product_filters import ProductSearchError, type_category
+from app.db.schema_registry import ProductTableSchema, product_schema_registry
+
+logger = logging.getLogger(__name__)
+
+# 字段权重（未列出的文本字段为1.0）
+FIELD_WEIGHTS = {
+    'product_name': 3.0,
+    'insurer': 2.0,
+    'insurance_company': 2.0,
+}
+
+# 关键词数量和长度限制
+MAX_QUERY_TERMS = 8
+MAX_TERM_LENGTH = 64
+
+# 高亮片段长度（字符）及命中位置之前保留的字符数
+SNIPPET_LENGTH = 60
+SNIPPET_LEADING = 15
+
+# BM25参数
+_K1 = 1.2
+_B = 0.75
+
+
+def normalize_text(value: str) -> str:
+    """统一全角/半角和大小写"""
+    return unicodedata.normalize('NFKC', value).lower()
+
+
+def _grams(term: str) -> List[str]:
+    """关键词对应的n-gram：单字关键词用单字，否则用相邻二字"""
+    if len(term) == 1:
+        return [term]
+    return [term[i:i + 2] for i in range(len(term) - 1)]
+
+
+def parse_query(q: str) -> List[str]:
+    """
+    将检索词拆分为关键词（按空白分隔，去重）
+
+    Raises:
+        ProductSearchError: 检索词为空或过长
+    """
+    terms = []
+    for term in normalize_text(q).split():
+        if term not in terms:
+            terms.append(term)
+    if not terms:
+        raise ProductSearchError("检索词不能为空")
+    if len(terms) > MAX_QUERY_TERMS or any(len(term) > MAX_TERM_LENGTH for term in terms):
+        raise ProductSearchError(f"检索词过长（最多{MAX_QUERY_TERMS}个关键词，每个不超过{MAX_TERM_LENGTH}字）")
+    return terms
+
+
+class TextSearchResult:
+    """全文检索结果：按相关度降序、product_id升序排列"""
+
+    def __init__(self, matches: List[Tuple[int, float, List[Dict[str, Any]]]]):
+        self.matches = matches
+        self.ids = [product_id for product_id, _, _ in matches]
+        self._by_id = {product_id: (score, highlights) for product_id, score, highlights in matches}
+
+    def score_of(self, product_id: int) -> Optional[float]:
+        item = self._by_id.get(product_id)
+        return item[0] if item else None
+
+    def highlights_of(self, product_id: int) -> List[Dict[str, Any]]:
+        item = self._by_id.get(product_id)
+        return item[1] if item else []
+
+    def ids_after(self, score: float, product_id: int) -> List[int]:
+        """游标之后的产品ID（保持排序）"""
+        return [
+            pid for pid, s, _ in self.matches
+            if s < score or (s == score and pid > product_id)
+        ]
+
+
+class ProductTextIndex:
+    """单个产品表的n-gram倒排索引"""
+
+    def __init__(self, schema: ProductTableSchema, fields: List[str], rows: List[tuple]):
+        """
+        Args:
+            schema: 产品表结构
+            fields: 建立索引的文本列
+            rows: (product_id, 文本列...) 行列表
+        """
+        self.schema = schema
+        self.version = schema.version
+        self.fields = fields
+        self.weights = np.array([FIELD_WEIGHTS.get(field, 1.0) for field in fields])
+        self.product_ids = [row[0] for row in rows]
+        field_count = len(fields)
+
+        # 文档编号 = 行号 * 字段数 + 字段序号
+        self.originals: List[Optional[str]] = []
+        self.texts: List[str] = []
+        postings: Dict[str, List[int]] = {}
+        lengths = np.zeros((len(rows), field_count), dtype=np.float64)
+        for row_idx, row in enumerate(rows):
+            for field_idx in range(field_count):
+                value = row[field_idx + 1]
+                original = str(value) if value is not None else ''
+                normalized = normalize_text(original)
+                doc = row_idx * field_count + field_idx
+                # 归一化后长度不变时高亮片段使用原文
+                self.originals.append(original if len(original) == len(normalized) else None)
+                self.texts.append(normalized)
+                lengths[row_idx, field_idx] = len(normalized)
+                grams = set(normalized)
+                grams.update(normalized[i:i + 2] for i in range(len(normalized) - 1))
+                for gram in grams:
+                    postings.setdefault(gram, []).append(doc)
+
+        self.postings = {gram: np.array(docs, dtype=np.int64) for gram, docs in postings.items()}
+        self.lengths = lengths
+        self.average_lengths = np.maximum(lengths.mean(axis=0), 1.0) if rows else np.ones(field_count)
+
+    def _term_docs(self, term: str) -> List[int]:
+        """包含关键词的文档：倒排表求交后校验原文确实连续包含"""
+        lists = []
+        for gram in _grams(term):
+            docs = self.postings.get(gram)
+            if docs is None:
+                return []
+            lists.append(docs)
+        lists.sort(key=len)
+        candidates = lists[0]
+        for docs in lists[1:]:
+            candidates = np.intersect1d(candidates, docs, assume_unique=True)
+            if not candidates.size:
+                return []
+        return [int(doc) for doc in candidates if term in self.texts[doc]]
+
+    def _snippet(self, doc: int, terms: List[str]) -> Dict[str, Any]:
+        """命中字段的高亮片段及命中位置（相对片段的 [起始, 结束) 字符偏移）"""
+        normalized = self.texts[doc]
+        original = self.originals[doc]
+        source = original if original is not None else normalized
+        first = min(normalized.find(term) for term in terms if term in normalized)
+        start = max(0, first - SNIPPET_LEADING)
+        end = min(len(normalized), start + SNIPPET_LENGTH)
+        prefix = '…' if start > 0 else ''
+        suffix = '…' if end < len(normalized) else ''
+
+        positions = []
+        for term in terms:
+            pos = normalized.find(term, start)
+            while pos != -1 and pos + len(term) <= end:
+                positions.append([pos - start + len(prefix), pos - start + len(prefix) + len(term)])
+                pos = normalized.find(term, pos + len(term))
+        positions.sort()
+
+        field = self.fields[doc % len(self.fields)]
+        return {
+            'field': field,
+            'description': self.schema.desc_map.get(field, field),
+            'snippet': prefix + source[start:end] + suffix,
+            'positions': positions,
+        }
+
+    def search(self, terms: List[str]) -> TextSearchResult:
+        """
+        检索同时包含全部关键词（可分布在不同字段）的产品
+
+        Returns:
+            按BM25得分降序排列的检索结果
+        """
+        field_count = len(self.fields)
+        row_count = len(self.product_ids)
+        if not field_count or not row_count:
+            return TextSearchResult([])
+
+        scores = np.zeros(row_count, dtype=np.float64)
+        matched_rows: Optional[set] = None
+        matched_docs: Dict[int, List[str]] = {}
+
+        for term in terms:
+            docs = self._term_docs(term)
+            rows = {doc // field_count for doc in docs}
+            matched_rows = rows if matched_rows is None else matched_rows & rows
+            if not matched_rows:
+                return TextSearchResult([])
+
+            idf = math.log(1 + (row_count - len(rows) + 0.5) / (len(rows) + 0.5))
+            for doc in docs:
+                row_idx, field_idx = divmod(doc, field_count)
+                tf = self.texts[doc].count(term)
+                norm = 1 - _B + _B * self.lengths[row_idx, field_idx] / self.average_lengths[field_idx]
+                scores[row_idx] += self.weights[field_idx] * idf * tf * (_K1 + 1) / (tf + _K1 * norm)
+                matched_docs.setdefault(doc, []).append(term)
+
+        # 检索词中没有有效关键词
+        if matched_rows is None:
+            return TextSearchResult([])
+
+        highlights: Dict[int, List[Dict[str, Any]]] = {}
+        for doc in sorted(matched_docs):
+            row_idx = doc // field_count
+            if row_idx in matched_rows:
+                highlights.setdefault(row_idx, []).append(self._snippet(doc, matched_docs[doc]))
+
+        # 得分保留6位小数，保证游标比较稳定
+        matches = [
+            (self.product_ids[row_idx], round(float(scores[row_idx]), 6), highlights[row_idx])
+            for row_idx in matched_rows
+        ]
+        matches.sort(key=lambda item: (-item[1], item[0]))
+        return TextSearchResult(matches)
+
+
+class ProductTextIndexRegistry:
+    """
+    全文检索索引注册表
+
+    与内存产品目录相同，索引记录构建时的表结构版本，导入器使注册表失效后自动重建。
+    """
+
+    def __init__(self) -> None:
+        self._lock = threading.Lock()
+        self._indexes: Dict[str, ProductTextIndex] = {}
+
+    def get(self, product_type: str) -> Optional[ProductTextIndex]:
+        """
+        获取产品表的全文检索索引，版本过期时重新构建
+
+        Returns:
+            索引；表不存在或构建失败时返回None
+        """
+        schema = product_schema_registry.get(product_type)
+        if not schema.exists:
+            return None
+
+        index = self._indexes.get(product_type)
+        if index is not None and index.version == schema.version:
+            return index
+
+        with self._lock:
+            index = self._indexes.get(product_type)
+            if index is None or index.version != schema.version:
+                index = self._build(schema)
+                if index is None:
+                    self._indexes.pop(product_type, None)
+                else:
+                    self._indexes[product_type] = index
+            return index
+
+    def _build(self, schema: ProductTableSchema) -> Optional[ProductTextIndex]:
+        """加载文本列并构建索引"""
+        fields = [f['name'] for f in schema.fields if type_category(f['type']) == 'text']
+        try:
+            with engine.connect() as conn:
+                columns = ", ".join(['product_id'] + fields)
+                rows = [tuple(row) for row in conn.execute(
+                    text(f"SELECT {columns} FROM {schema.table_name} ORDER BY product_id")
+                )]
+            index = ProductTextIndex(schema, fields, rows)
+            logger.info(
+                f"已构建全文检索索引: {schema.table_name} "
+                f"({len(rows)} 条记录, {len(fields)} 个文本字段, {len(index.postings)} 个词项)"
+            )
+            return index
+        except Exception as e:
+            logger.error(f"构建全文检索索引失败: {schema.table_name}, {e}")
+            return None
+
+    def search(self, product_type: str, q: str) -> TextSearchResult:
+        """
+        全文检索
+
+        Raises:
+            ProductSearchError: 检索词无效
+        """
+        terms = parse_query(q)
+        index = self.get(product_type)
+        if index is None:
+            return TextSearchResult([])
+        return index.search(terms)
+
+
+# 全局全文检索索引实例
+product_text_index = ProductTextIndexRegistry()
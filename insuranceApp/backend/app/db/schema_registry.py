@@ -0,0 +1,142 @@
+"""
+保险产品表结构注册表 - 进程内缓存 insurance_products_* 表的字段、类型和中文说明
+"""
+import logging
+import threading
+from typing import Any, Dict, List, Optional
+
+from sqlalchemy import text
+
+from app.db.base import engine
+
+logger = logging.getLogger(__name__)
+
+
+# 查询表字段、数据类型及列注释（中文说明）
+_FIELDS_QUERY = text("""
+    SELECT
+        c.column_name,
+        c.data_type,
+        pgd.description
+    FROM information_schema.columns c
+    LEFT JOIN pg_catalog.pg_statio_all_tables st
+        ON c.table_name = st.relname
+    LEFT JOIN pg_catalog.pg_description pgd
+        ON pgd.objoid = st.relid
+        AND pgd.objsubid = c.ordinal_position
+    WHERE c.table_name = :table_name
+    ORDER BY c.ordinal_position
+""")
+
+
+class ProductTableSchema:
+    """单个产品表的结构快照"""
+
+    def __init__(self, product_type: str, columns: List[Dict[str, Any]], version: int):
+        """
+        Args:
+            product_type: 产品类型（表名后缀）
+            columns: 表的全部列（含product_id），每项包含name、type、description
+            version: 构建该快照时注册表的版本号
+        """
+        self.product_type = product_type
+        self.table_name = f"insurance_products_{product_type}"
+        self.version = version
+        self.columns = columns
+        # 对外暴露的字段列表不包含主键
+        self.fields = [c for c in columns if c['name'] != 'product_id']
+        self.column_names = [c['name'] for c in columns]
+        self.types = {c['name']: c['type'] for c in columns}
+        self.desc_map = {c['name']: c['description'] for c in columns}
+
+    @property
+    def exists(self) -> bool:
+        """表是否存在（存在的表至少有一列）"""
+        return bool(self.columns)
+
+
+class ProductSchemaRegistry:
+    """
+    保险产品表结构注册表
+
+    每个产品表的结构只在首次访问时从数据库加载一次，之后直接读取内存；
+    导入器重建表后调用invalidate使其失效。每次失效都会递增版本号，
+    依赖表结构或目录数据的缓存可以用版本号判断是否过期。
+    """
+
+    def __init__(self) -> None:
+        self._lock = threading.Lock()
+        self._schemas: Dict[str, ProductTableSchema] = {}
+        self._version = 0
+
+    @property
+    def version(self) -> int:
+        """当前目录版本号，每次失效时递增"""
+        return self._version
+
+    def get(self, product_type: str) -> ProductTableSchema:
+        """
+        获取产品表结构，未缓存时从数据库加载
+
+        Args:
+            product_type: 产品类型（表名后缀）
+
+        Returns:
+            表结构快照；表不存在时返回columns为空的快照
+        """
+        schema = self._schemas.get(product_type)
+        if schema is not None:
+            return schema
+
+        with self._lock:
+            schema = self._schemas.get(product_type)
+            if schema is None:
+                schema = self._load(product_type)
+                # 只缓存存在的表，避免导入前的空结果被永久缓存
+                if schema.exists:
+                    self._schemas[product_type] = schema
+            return schema
+
+    def _load(self, product_type: str) -> ProductTableSchema:
+        """从information_schema加载表结构"""
+        table_name = f"insurance_products_{product_type}"
+        columns = []
+        try:
+            with engine.connect() as conn:
+                result = conn.execute(_FIELDS_QUERY, {"table_name": table_name})
+                for field_name, data_type, description in result:
+                    columns.append({
+                        'name': field_name,
+                        'type': data_type,
+                        'description': description if description else field_name
+                    })
+        except Exception as e:
+            logger.error(f"加载表结构失败: {table_name}, {e}")
+            return ProductTableSchema(product_type, [], self._version)
+
+        if columns:
+            logger.info(f"已加载表结构: {table_name} ({len(columns)} 列, 版本 {self._version})")
+        return ProductTableSchema(product_type, columns, self._version)
+
+    def invalidate(self, product_type: Optional[str] = None) -> int:
+        """
+        使表结构缓存失效
+
+        Args:
+            product_type: 产品类型（表名后缀），为空则清空全部
+
+        Returns:
+            失效后的版本号
+        """
+        with self._lock:
+            if product_type is None:
+                self._schemas.clear()
+            else:
+                self._schemas.pop(product_type, None)
+            self._version += 1
+            logger.info(f"产品表结构缓存已失效: {product_type or '全部'} (版本 {self._version})")
+            return self._version
+
+
+# 全局表结构注册表实例
+product_schema_registry = ProductSchemaRegistry()
@@ -1,4 +1,5 @@
 import logging
+from typing import Dict
 from fastapi import FastAPI, Depends
 from fastapi.middleware.cors import CORSMiddleware
 from sqlalchemy.orm import Session
@@ -15,8 +16,12 @@ from app.api.basic_medical_insurance import router as basic_medical_insurance_ro
 from app.api.social_pension_insurance import router as social_pension_insurance_router
 from app.core.config import settings
 from app.core.error_handler import global_exception_handler
+from app.core.response_cache import ResponseCacheMiddleware
+from app.db.async_base import async_engine
 from app.db.base import Base, engine, get_db
+from app.db.crud.insurance_product import InsuranceProductCRUD
 from app.db.init_db import init_db
+from app.db.product_catalog_engine import product_catalog_engine
 
 # 配置日志
 logging.basicConfig(
@@ -35,6 +40,10 @@ app = FastAPI(
     redoc_url="/api/redoc",
 )
 
+# 产品目录接口响应缓存（需在CORS中间件之前注册，使缓存命中的响应也带有CORS头）
+if settings.RESPONSE_CACHE_ENABLED:
+    app.add_middleware(ResponseCacheMiddleware)
+
 # 添加CORS中间件，确保允许跨域请求
 origins = [
     "http://localhost",
@@ -87,13 +96,13 @@ app.include_router(
 
 
 @app.get("/api/health")
-def health_check():
+def health_check() -> Dict[str, str]:
     """健康检查接口"""
     return {"status": "ok"} 
 
 
 @app.on_event("startup")
-def startup_event():
+def startup_event() -> None:
     """应用启动时执行的事件"""
     logger.info("应用启动中...")
     
@@ -107,4 +116,15 @@ def startup_event():
     finally:
         db.close()
     
-    logger.info("应用启动完成") 
\ No newline at end of file
+    # 预加载内存产品目录
+    if settings.PRODUCT_SEARCH_ENGINE == "memory":
+        logger.info("加载内存产品目录...")
+        product_catalog_engine.warm(InsuranceProductCRUD.get_product_types())
+    
+    logger.info("应用启动完成")
+
+
+@app.on_event("shutdown")
+async def shutdown_event() -> None:
+    """应用关闭时释放异步数据库连接池"""
+    await async_engine.dispose()
@@ -1,41 +1,152 @@
+"""
+保险产品表的反射模型注册表
+
+insurance_products_* 表由导入器按Excel动态建表，没有静态模型。注册表在首次访问时
+一次性反射全部产品表（一次MetaData.reflect + 一次automap），之后直接读取内存，
+CRUD可以用其中的Table构建SQLAlchemy Core查询。
+
+每个模型记录反射时产品表结构注册表的版本号；导入器重建表并使表结构注册表失效后，
+下一次访问只重新反射该表，并以整体替换字典项的方式切换，正在使用旧模型的请求不受影响。
+"""
+import logging
+import threading
+from typing import Any, Dict, Optional
+
+from sqlalchemy import MetaData, Table
 from sqlalchemy.ext.automap import automap_base
-from sqlalchemy import inspect, MetaData
 
-from app.db.base import Base, engine
+from app.db.base import engine
+from app.db.schema_registry import product_schema_registry
+
+logger = logging.getLogger(__name__)
+
+PRODUCT_TABLE_PREFIX = "insurance_products_"
+
+
+def _is_product_table(table_name: str) -> bool:
+    """是否为产品基础表（不含卡片表等派生表）"""
+    return (
+        table_name.startswith(PRODUCT_TABLE_PREFIX)
+        and not table_name.endswith("_card")
+        and "__" not in table_name
+    )
+
+
+class ProductModel:
+    """单个产品表的反射结果"""
+
+    def __init__(self, product_type: str, table: Table, model: Optional[Any], version: int):
+        """
+        Args:
+            product_type: 产品类型（表名后缀）
+            table: 反射的Table，用于构建Core查询
+            model: automap生成的ORM类（表没有主键时为None）
+            version: 反射时表结构注册表中该表的版本号
+        """
+        self.product_type = product_type
+        self.table = table
+        self.model = model
+        self.version = version
+
+
+class ProductModelRegistry:
+    """保险产品表反射模型注册表"""
+
+    def __init__(self) -> None:
+        self._lock = threading.Lock()
+        self._models: Dict[str, ProductModel] = {}
+        self._reflected_all = False
+
+    def get(self, product_type: str) -> Optional[ProductModel]:
+        """
+        获取产品表的反射模型，表被重建后重新反射
+
+        Args:
+            product_type: 产品类型（表名后缀）
+
+        Returns:
+            反射模型；表不存在或反射失败时返回None
+        """
+        schema = product_schema_registry.get(product_type)
+        if not schema.exists:
+            return None
+
+        model = self._models.get(product_type)
+        if model is not None and model.version == schema.version:
+            return model
+
+        with self._lock:
+            if not self._reflected_all:
+                self._reflect_all()
+            model = self._models.get(product_type)
+            if model is None or model.version != schema.version:
+                model = self._reflect_one(product_type, schema.version)
+                if model is None:
+                    self._models.pop(product_type, None)
+                else:
+                    self._models[product_type] = model
+            return model
+
+    def table(self, product_type: str) -> Optional[Table]:
+        """获取产品表的Table，表不存在时返回None"""
+        model = self.get(product_type)
+        return model.table if model is not None else None
+
+    @staticmethod
+    def _build(metadata: MetaData) -> Dict[str, Any]:
+        """对MetaData中的表执行automap，返回 表名 -> ORM类"""
+        AutomapBase = automap_base(metadata=metadata)
+        AutomapBase.prepare()
+        return {cls.__table__.name: cls for cls in AutomapBase.classes}
+
+    def _reflect_all(self) -> None:
+        """首次访问时一次性反射全部产品表（调用方持有锁）"""
+        self._reflected_all = True
+        metadata = MetaData()
+        try:
+            metadata.reflect(bind=engine, only=lambda name, _: _is_product_table(name))
+            classes = self._build(metadata)
+        except Exception as e:
+            logger.error(f"反射产品表失败: {e}")
+            return
+
+        for table_name, table in metadata.tables.items():
+            product_type = table_name[len(PRODUCT_TABLE_PREFIX):]
+            # 版本号取自表结构注册表；反射后表又被重建时版本号不一致，下次访问会重新反射
+            version = product_schema_registry.get(product_type).version
+            self._models[product_type] = ProductModel(
+                product_type, table, classes.get(table_name), version
+            )
+        logger.info(f"已反射产品表: {len(metadata.tables)} 个")
+
+    def _reflect_one(self, product_type: str, version: int) -> Optional[ProductModel]:
+        """重新反射单个产品表（使用独立的MetaData，不影响其他表的模型）"""
+        table_name = f"{PRODUCT_TABLE_PREFIX}{product_type}"
+        metadata = MetaData()
+        try:
+            metadata.reflect(bind=engine, only=[table_name])
+            classes = self._build(metadata)
+        except Exception as e:
+            logger.error(f"反射产品表失败: {table_name}, {e}")
+            return None
+        logger.info(f"已反射产品表: {table_name} (版本 {version})")
+        return ProductModel(product_type, metadata.tables[table_name], classes.get(table_name), version)
+
+
+# 全局产品表反射模型注册表实例
+product_model_registry = ProductModelRegistry()
+
 
 # 动态映射函数
-def get_dynamic_model_class(product_type: str):
+def get_dynamic_model_class(product_type: str) -> Any:
     """
     动态获取保险产品模型类
-    
+
     Args:
         product_type: 产品类型名称（表名后缀）
-        
+
     Returns:
-        对应的SQLAlchemy模型类
+        对应的SQLAlchemy模型类，表不存在或没有主键时返回None
     """
-    # 获取表名
-    table_name = f"insurance_products_{product_type}"
-    
-    # 检查表是否存在
-    inspector = inspect(engine)
-    if table_name not in inspector.get_table_names():
-        print(f"警告: 表 {table_name} 不存在")
-        return None
-    
-    # 自动映射基类
-    metadata = MetaData()
-    metadata.reflect(bind=engine, only=[table_name])
-    
-    # 使用automap创建映射
-    AutomapBase = automap_base(metadata=metadata)
-    AutomapBase.prepare()
-    
-    # 返回映射后的类
-    if hasattr(AutomapBase.classes, table_name):
-        return getattr(AutomapBase.classes, table_name)
-    else:
-        # 如果automap没有映射成功，手动创建
-        table = metadata.tables[table_name]
-        class_dict = {"__table__": table}
-        return type(f"{product_type}Product", (Base,), class_dict) 
\ No newline at end of file
+    model = product_model_registry.get(product_type)
+    return model.model if model is not None else None
@@ -1,5 +1,6 @@
-from typing import List
-from pydantic import BaseModel
+from datetime import datetime
+from typing import List, Optional
+from pydantic import BaseModel, Field
 
 
 class UserInfo(BaseModel):
@@ -13,3 +14,105 @@ class UserListResponse(BaseModel):
     code: int
     message: str
     users: List[UserInfo]
+
+
+class ProductIndexInfo(BaseModel):
+    """产品表索引及扫描次数"""
+    index_name: str
+    column: Optional[str] = None
+    method: str
+    scans: int
+    tuples_read: int
+
+
+class ProductFilterIndexUsage(BaseModel):
+    """搜索过滤条件与候选索引"""
+    field: str
+    kind: str
+    requests: int
+    candidate_index: Optional[str] = Field(
+        None, description="谓词种类与索引方法匹配的索引（启发式判断，不代表查询计划实际使用）"
+    )
+    candidate_index_scans: int = Field(0, description="候选索引的累计扫描次数（pg_stat_user_indexes.idx_scan）")
+
+
+class ProductTableIndexReport(BaseModel):
+    """单个产品表的索引使用报告"""
+    product_type: str
+    table_name: str
+    indexes: List[ProductIndexInfo]
+    filters: List[ProductFilterIndexUsage]
+
+
+class ProductIndexReportResponse(BaseModel):
+    """产品表索引使用报告响应"""
+    code: int
+    message: str
+    tables: List[ProductTableIndexReport]
+
+
+class ProductCatalogGeneration(BaseModel):
+    """单个产品类型的当前表、影子表和上一代表记录数"""
+    product_type: str
+    table_name: str
+    current_records: Optional[int] = None
+    next_records: Optional[int] = None
+    prev_records: Optional[int] = None
+    can_rollback: bool
+
+
+class ProductCatalogGenerationResponse(BaseModel):
+    """产品目录版本状态响应"""
+    code: int
+    message: str
+    catalogs: List[ProductCatalogGeneration]
+
+
+class CatalogReloadRequest(BaseModel):
+    """后台重新导入数据目录请求"""
+    files: Optional[List[str]] = None
+    force: bool = False
+
+
+class CatalogReloadFile(BaseModel):
+    """导入任务中单个文件的进度"""
+    name: str
+    file_name: str
+    status: str
+    records: Optional[int] = None
+    parse_seconds: Optional[float] = None
+    load_seconds: Optional[float] = None
+    error: Optional[str] = None
+
+
+class CatalogReloadJobInfo(BaseModel):
+    """后台导入任务状态"""
+    job_id: str
+    status: str
+    phase: str
+    source: str
+    force: bool
+    current_file: Optional[str] = None
+    total_files: int
+    completed_files: int
+    rows_loaded: int
+    files: List[CatalogReloadFile]
+    skipped_files: List[str]
+    errors: List[str]
+    created_at: datetime
+    started_at: Optional[datetime] = None
+    finished_at: Optional[datetime] = None
+
+
+class CatalogReloadResponse(BaseModel):
+    """后台导入任务响应"""
+    code: int
+    message: str
+    job: CatalogReloadJobInfo
+
+
+class CatalogReloadListResponse(BaseModel):
+    """最近的后台导入任务列表响应"""
+    code: int
+    message: str
+    jobs: List[CatalogReloadJobInfo]
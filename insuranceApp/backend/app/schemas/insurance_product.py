@@ -24,11 +24,151 @@ class ProductFieldsResponse(ResponseBase):
     """保险产品字段响应"""
     fields: List[FieldInfo] = []
 
+# 全文检索命中字段
+class HighlightField(BaseModel):
+    """命中字段的高亮片段"""
+    field: str
+    description: str
+    snippet: str
+    positions: List[List[int]] = Field([], description="命中文本在片段中的[起始, 结束)偏移")
+
+# 单个产品的全文检索结果
+class ProductHighlight(BaseModel):
+    """产品的相关度得分及命中字段"""
+    product_id: int
+    score: Optional[float] = None
+    fields: List[HighlightField] = []
+
 # 保险产品搜索响应（使用动态字段）
 class ProductSearchResponse(ResponseBase):
     """保险产品搜索响应"""
+    pages: Optional[int] = 1
+    pages_estimated: Optional[bool] = Field(None, description="count_mode=estimated时，pages是否为估算值")
+    next_cursor: Optional[str] = None
+    products: List[Dict[str, Any]] = []
+    highlights: Optional[List[ProductHighlight]] = Field(None, description="全文检索（q参数）时本页产品的得分和高亮")
+
+# 跨类型搜索结果项
+class UnifiedProductItem(BaseModel):
+    """跨类型搜索结果（各产品类型的通用字段）"""
+    product_type: str
+    product_type_name: Optional[str] = None
+    product_id: int
+    product_name: Optional[str] = None
+    insurer: Optional[str] = None
+    entry_age_min: Optional[float] = None
+    entry_age_max: Optional[float] = None
+
+# 跨类型搜索响应
+class UnifiedSearchResponse(ResponseBase):
+    """跨类型搜索响应"""
     pages: int = 1
+    products: List[UnifiedProductItem] = []
+
+# 批量查询产品的单项
+class ProductRef(BaseModel):
+    """产品标识"""
+    product_id: int = Field(..., description="产品ID")
+    product_type: str = Field(..., description="产品类型")
+
+# 批量查询产品详情请求
+class BatchProductInfoRequest(BaseModel):
+    """批量查询产品详情请求"""
+    items: List[ProductRef] = Field(..., min_length=1, max_length=500, description="产品标识列表")
+
+# 批量查询产品详情响应
+class BatchProductInfoResponse(ResponseBase):
+    """批量查询产品详情响应"""
     products: List[Dict[str, Any]] = []
+    missing: List[ProductRef] = []
+
+# 对比矩阵中的产品
+class CompareProduct(BaseModel):
+    """对比矩阵每列对应的产品"""
+    product_id: int
+    product_name: Optional[str] = None
+    insurer: Optional[str] = None
+
+# 对比矩阵中的字段
+class CompareField(BaseModel):
+    """对比矩阵的一行：字段及各产品的规范化取值（与products顺序对齐）"""
+    field: str
+    description: str
+    type: str
+    differs: bool
+    values: List[Any] = []
+
+# 产品对比响应
+class ProductCompareResponse(ResponseBase):
+    """保险产品对比响应"""
+    product_type: str = ""
+    products: List[CompareProduct] = []
+    fields: List[CompareField] = []
+    differing_fields: int = 0
+    missing: List[int] = []
+
+# 推荐画像
+class RecommendationProfileInfo(BaseModel):
+    """从用户个人信息解析出的推荐画像（无法解析的项为null）"""
+    age: Optional[float] = None
+    annual_income: Optional[float] = Field(None, description="年收入（元）")
+    risk_aversion: Optional[float] = Field(None, description="风险厌恶程度，0~1，越大越保守")
+    dependents: int = Field(0, description="家庭成员数量")
+
+# 推荐的产品
+class RecommendedProduct(BaseModel):
+    """推荐的产品"""
+    product_id: int
+    product_name: Optional[str] = None
+    insurer: Optional[str] = None
+    score: float = Field(..., description="推荐得分（0~100）")
+    reasons: List[str] = Field([], description="得分贡献最大的指标（中文字段名）")
+
+# 单个产品类型的推荐结果
+class TypeRecommendation(BaseModel):
+    """单个产品类型的推荐结果"""
+    product_type: str
+    product_type_name: Optional[str] = None
+    candidates: int = Field(0, description="符合投保年龄的产品数")
+    products: List[RecommendedProduct] = []
+
+# 产品推荐响应
+class ProductRecommendationResponse(ResponseBase):
+    """保险产品推荐响应"""
+    profile: Optional[RecommendationProfileInfo] = None
+    recommendations: List[TypeRecommendation] = []
+
+# 直方图分桶
+class FacetBucket(BaseModel):
+    """直方图分桶（最后一个桶包含上界）"""
+    lower: float
+    upper: float
+    count: int
+
+# 取值分布
+class FacetValue(BaseModel):
+    """字段取值及记录数"""
+    value: Any
+    count: int
+
+# 单个字段的分面统计
+class ProductFacet(BaseModel):
+    """字段分面：数值字段返回范围和直方图，布尔/低基数文本字段返回取值分布"""
+    field: str
+    description: str
+    type: str = Field(..., description="numeric / boolean / text")
+    count: int = Field(0, description="非空记录数")
+    null_count: int = 0
+    min: Optional[float] = None
+    max: Optional[float] = None
+    buckets: List[FacetBucket] = []
+    values: List[FacetValue] = []
+
+# 分面统计响应
+class ProductFacetsResponse(ResponseBase):
+    """保险产品分面统计响应"""
+    total: int = 0
+    facets: List[ProductFacet] = []
 
 # 保险产品详情响应基类
 class ProductDetailBase(ResponseBase):
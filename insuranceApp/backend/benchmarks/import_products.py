@@ -0,0 +1,160 @@
+"""
+保险产品导入性能测试
+
+以 datas/ 中的产品文件为模板生成合成工作簿（字段定义不变，产品列由模板产品循环复制），
+导入到临时产品表 insurance_products_benchmark，统计读取耗时、读取内存峰值、写入耗时和吞吐量。
+
+xlsx每个工作表最多16384列，而产品文件每列一个产品，因此5万个产品拆分为多个工作簿
+（默认4个，每个12500个产品），依次导入同一张表。
+
+--legacy 同时运行逐行INSERT的旧写入方式作为对比（5万行需要较长时间）。
+
+运行方式（需要可写入的PostgreSQL数据库，DATABASE_URL指向测试库）：
+    python -m benchmarks.import_products --products 50000 --template 定期寿险.xlsx --legacy
+"""
+import argparse
+import tempfile
+import time
+from pathlib import Path
+from typing import List, Optional, Tuple
+
+import openpyxl
+from sqlalchemy import text
+
+from app.db.base import engine
+from app.db.importers.insurance_products_importer import InsuranceProductImporter
+from app.db.importers.workbook_reader import ParsedWorkbook, read_workbook
+
+DATA_DIR = Path(__file__).resolve().parent.parent / "datas"
+
+BENCHMARK_TABLE = "benchmark"
+
+# xlsx单个工作表的列数上限为16384，前3列为字段定义
+MAX_PRODUCTS_PER_WORKBOOK = 16384 - 3
+
+
+def _generate_workbooks(template: Path, products: int, per_workbook: int, out_dir: Path) -> List[Path]:
+    """以模板文件生成合成工作簿，返回文件路径列表"""
+    wb = openpyxl.load_workbook(template)
+    ws = wb.active
+    rows = [row for row in ws.iter_rows(values_only=True) if row and row[0]]
+    definitions = [row[:3] for row in rows]
+    samples = [
+        [row[col] if col < len(row) else None for row in rows]
+        for col in range(3, ws.max_column)
+    ]
+    samples = [sample for sample in samples if any(v is not None for v in sample)]
+    name_row = next((i for i, row in enumerate(rows) if str(row[0]).strip() == "product_name"), None)
+
+    paths = []
+    generated = 0
+    while generated < products:
+        count = min(per_workbook, products - generated)
+        out = openpyxl.Workbook(write_only=True)
+        sheet = out.create_sheet()
+        for row_idx, definition in enumerate(definitions):
+            values = []
+            for i in range(generated, generated + count):
+                value = samples[i % len(samples)][row_idx]
+                if row_idx == name_row:
+                    value = f"{value}-{i}"
+                values.append(value)
+            sheet.append([*definition, *values])
+        path = out_dir / f"benchmark_{len(paths)}.xlsx"
+        out.save(path)
+        paths.append(path)
+        generated += count
+    return paths
+
+
+def _legacy_insert(importer: InsuranceProductImporter, workbook: ParsedWorkbook) -> int:
+    """旧写入方式：每个产品构建一条INSERT逐行执行"""
+    field_names = workbook.keys
+    full_table_name = f"insurance_products_{BENCHMARK_TABLE}"
+    field_types = {field['name']: field['type'] for field in importer.table_schemas[BENCHMARK_TABLE]}
+    products, _ = importer._read_products(workbook, field_types)
+    columns = ', '.join(field_names)
+    placeholders = ', '.join(
+        importer._cast_expression(f":val{i}", field_types.get(name)) for i, name in enumerate(field_names)
+    )
+    imported_count = 0
+    with engine.begin() as conn:
+        for _, values in products:
+            conn.execute(
+                text(f"INSERT INTO {full_table_name} ({columns}) VALUES ({placeholders})"),
+                {f"val{i}": value for i, value in enumerate(values)}
+            )
+            imported_count += 1
+    return imported_count
+
+
+def _run(
+    label: str, importer: InsuranceProductImporter, template: Path, paths: List[Path], legacy: bool,
+    trace_memory: bool
+) -> None:
+    importer._create_table_from_xlsx(BENCHMARK_TABLE, BENCHMARK_TABLE, read_workbook(template))
+
+    read_seconds = 0.0
+    write_seconds = 0.0
+    peak_memory_mb = 0.0
+    total = 0
+    for path in paths:
+        workbook = read_workbook(path, trace_memory=trace_memory)
+        read_seconds += workbook.parse_seconds
+        peak_memory_mb = max(peak_memory_mb, workbook.stats['peak_memory_mb'] or workbook.stats['max_rss_mb'] or 0)
+
+        started = time.perf_counter()
+        if legacy:
+            total += _legacy_insert(importer, workbook)
+        else:
+            total += importer._import_data_from_xlsx(BENCHMARK_TABLE, workbook)
+        write_seconds += time.perf_counter() - started
+
+    print(
+        f"{label:>8} {total:>10} {read_seconds + write_seconds:>10.2f} {read_seconds:>10.2f} "
+        f"{peak_memory_mb:>12.1f} {write_seconds:>10.2f} {total / max(write_seconds, 1e-9):>12.0f}"
+    )
+
+
+def _drop_table() -> None:
+    with engine.begin() as conn:
+        conn.execute(text(f"DROP TABLE IF EXISTS insurance_products_{BENCHMARK_TABLE} CASCADE"))
+
+
+def main(argv: Optional[List[str]] = None) -> None:
+    parser = argparse.ArgumentParser(description="保险产品导入性能测试")
+    parser.add_argument("--products", type=int, default=50000, help="合成产品数量")
+    parser.add_argument("--per-workbook", type=int, default=12500, help="每个工作簿的产品数量")
+    parser.add_argument("--template", default="定期寿险.xlsx", help="datas/ 中作为模板的产品文件")
+    parser.add_argument("--legacy", action="store_true", help="同时运行逐行INSERT作为对比")
+    parser.add_argument(
+        "--trace-memory", action="store_true",
+        help="用tracemalloc统计读取内存峰值（读取耗时会明显增加），默认显示进程内存峰值"
+    )
+    args = parser.parse_args(argv)
+
+    per_workbook = min(args.per_workbook, MAX_PRODUCTS_PER_WORKBOOK)
+    template = DATA_DIR / args.template
+    importer = InsuranceProductImporter(None)
+
+    with tempfile.TemporaryDirectory() as tmp:
+        started = time.perf_counter()
+        paths = _generate_workbooks(template, args.products, per_workbook, Path(tmp))
+        print(f"生成 {len(paths)} 个工作簿（{args.products} 个产品）: {time.perf_counter() - started:.2f}s")
+
+        print(
+            f"{'方式':>8} {'记录数':>10} {'总耗时(s)':>10} {'读取(s)':>10} {'内存峰值(MB)':>12} "
+            f"{'写入(s)':>10} {'写入行/s':>12}"
+        )
+        runs: List[Tuple[str, bool]] = [("copy", False)]
+        if args.legacy:
+            runs.append(("insert", True))
+        try:
+            for label, legacy in runs:
+                _run(label, importer, template, paths, legacy, args.trace_memory)
+        finally:
+            _drop_table()
+
+
+if __name__ == "__main__":
+    main()
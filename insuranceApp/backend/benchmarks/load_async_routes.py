@@ -0,0 +1,138 @@
+"""
+async路由并发负载测试
+
+对单个worker的服务发起不同并发度的请求，统计吞吐量和延迟，并同时以固定间隔请求 /api/health：
+async def路由在事件循环中执行同步查询时，健康检查的延迟会随数据库查询一起排队；
+改用异步会话 / 线程池后，健康检查延迟应保持在毫秒级，吞吐量随并发度增长。
+
+测试的接口：
+- /basic_medical_insurance/query、/basic_medical_insurance/cities
+- /social_pension_insurance/query、/social_pension_insurance/provinces
+- /insurance_products/search（附加随机参数绕过响应缓存）
+
+运行方式（需要已导入数据的数据库和httpx）：
+    uvicorn app.main:app --workers 1 --port 8000
+    python -m benchmarks.load_async_routes --base-url http://127.0.0.1:8000 --concurrency 1,8,32,64
+
+在改动前后的代码上各运行一次，对比同一并发度下的req/s和health p95。
+"""
+import argparse
+import asyncio
+import itertools
+import statistics
+import time
+import uuid
+from typing import Dict, List, Tuple
+
+import httpx
+
+API_PREFIX = "/api/v1"
+
+
+def _targets(args: argparse.Namespace) -> List[Tuple[str, Dict[str, str]]]:
+    """每轮请求的接口和参数"""
+    return [
+        (f"{API_PREFIX}/basic_medical_insurance/query", {"city": args.city, "category": "城镇职工"}),
+        (f"{API_PREFIX}/basic_medical_insurance/cities", {}),
+        (f"{API_PREFIX}/social_pension_insurance/query", {"province": args.province}),
+        (f"{API_PREFIX}/social_pension_insurance/provinces", {}),
+        (f"{API_PREFIX}/insurance_products/search", {"product_type": args.product_type, "limit": "20"}),
+    ]
+
+
+def _percentile(values: List[float], pct: float) -> float:
+    if not values:
+        return 0.0
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, int(len(ordered) * pct))]
+
+
+async def _probe_health(client: httpx.AsyncClient, stop: asyncio.Event, latencies: List[float]) -> None:
+    """以固定间隔请求健康检查接口，记录延迟（反映事件循环是否被阻塞）"""
+    while not stop.is_set():
+        start = time.perf_counter()
+        await client.get("/api/health")
+        latencies.append((time.perf_counter() - start) * 1000)
+        await asyncio.sleep(0.05)
+
+
+async def _run_level(
+    client: httpx.AsyncClient, targets: List[Tuple[str, Dict[str, str]]], concurrency: int, requests: int
+) -> Dict[str, float]:
+    """以指定并发度发送requests个请求"""
+    cycle = itertools.cycle(targets)
+    queue: asyncio.Queue = asyncio.Queue()
+    for _ in range(requests):
+        queue.put_nowait(next(cycle))
+
+    latencies: List[float] = []
+    errors = 0
+
+    async def worker() -> None:
+        nonlocal errors
+        while True:
+            try:
+                path, params = queue.get_nowait()
+            except asyncio.QueueEmpty:
+                return
+            if path.endswith("/search"):
+                # 产品搜索接口有响应缓存，附加随机参数使每次请求都查询数据库
+                params = {**params, "_nocache": uuid.uuid4().hex}
+            start = time.perf_counter()
+            try:
+                response = await client.get(path, params=params)
+                if response.status_code >= 500:
+                    errors += 1
+            except httpx.HTTPError:
+                errors += 1
+            latencies.append((time.perf_counter() - start) * 1000)
+
+    health: List[float] = []
+    stop = asyncio.Event()
+    probe = asyncio.create_task(_probe_health(client, stop, health))
+    started = time.perf_counter()
+    await asyncio.gather(*(worker() for _ in range(concurrency)))
+    elapsed = time.perf_counter() - started
+    stop.set()
+    await probe
+
+    return {
+        "rps": requests / elapsed,
+        "p50": statistics.median(latencies),
+        "p95": _percentile(latencies, 0.95),
+        "health_p95": _percentile(health, 0.95),
+        "errors": errors,
+    }
+
+
+async def _main(args: argparse.Namespace) -> None:
+    levels = [int(level) for level in args.concurrency.split(",")]
+    limits = httpx.Limits(max_connections=max(levels) + 1)
+    async with httpx.AsyncClient(base_url=args.base_url, timeout=args.timeout, limits=limits) as client:
+        targets = _targets(args)
+        # 预热：建立连接池，加载表结构注册表
+        await _run_level(client, targets, 1, len(targets))
+
+        print(f"{'并发度':>6} {'req/s':>10} {'p50(ms)':>10} {'p95(ms)':>10} {'health p95(ms)':>15} {'错误':>6}")
+        for concurrency in levels:
+            result = await _run_level(client, targets, concurrency, args.requests)
+            print(
+                f"{concurrency:>6} {result['rps']:>10.1f} {result['p50']:>10.1f} {result['p95']:>10.1f} "
+                f"{result['health_p95']:>15.1f} {result['errors']:>6}"
+            )
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="async路由并发负载测试")
+    parser.add_argument("--base-url", default="http://127.0.0.1:8000", help="服务地址（单worker启动）")
+    parser.add_argument("--concurrency", default="1,8,32,64", help="逗号分隔的并发度")
+    parser.add_argument("--requests", type=int, default=500, help="每个并发度发送的请求数")
+    parser.add_argument("--timeout", type=float, default=30.0, help="单个请求超时（秒）")
+    parser.add_argument("--city", default="北京", help="基本医保查询的城市")
+    parser.add_argument("--province", default="北京", help="社会养老保险查询的省市")
+    parser.add_argument("--product-type", default="term_life", help="产品搜索的产品类型")
+    asyncio.run(_main(parser.parse_args()))
+
+
+if __name__ == "__main__":
+    main()